@@ -1,38 +1,116 @@
+import logging
+import time
+
+# Awal rerun ini, sebelum impor modul aplikasi (lihat fase "imports" di instrumentasi)
+SCRIPT_STARTED = time.perf_counter()
+
 import streamlit as st
-import firebase_admin
 import hashlib
-import smtplib
 import random
-import time
-import re
-import pandas as pd
-import google.generativeai as genai
-from email.mime.text import MIMEText
-from firebase_admin import credentials, db
-from pytz import timezone
 from datetime import datetime
+from chatbot import (
+    CHATBOT_SYSTEM_INSTRUCTION, context_config, trim_stored_messages, build_gemini_history,
+    answer_locally, answer_from_siaran, with_siaran_context, remember_answer, chatbot_stats,
+)
+from database import (
+    DATABASE_URL, CACHE_MAX_ENTRIES, configure_backend, add_write_listener, set_mirror, mirror_version, get_cached, cache_stats,
+    find_username_by_email, username_exists, create_user, update_user,
+    search_user_directory, get_leaderboard_page, get_user_rank, RANK_SCAN_LIMIT, commit_contribution, server_timestamp,
+    get_comments_page, get_comment_counts, new_comment_updates, move_mux_updates, delete_mux,
+)
+from backends import create_backend
+from instrumentation import (
+    InstrumentedBackend, configure as configure_instrumentation, start_rerun, set_rerun_page, mark_phase,
+    finish_rerun, timed, page_stats, call_stats, startup_stats,
+)
+from mirror import Mirror
+from siaran_index import get_siaran_index
+from timestamps import WIB, LEGACY_MUX_FIELDS, format_wib, mux_updated_at
+from mailer import Mailer, QUEUED, SENDING, SENT
+from export import EXPORT_FORMATS, iter_export_rows, write_export, parquet_available
+from validators import normalize_wilayah, validate_siaran_entry, parse_import_file, validate_import_rows, diff_import_rows
 
 # --- KONFIGURASI DAN INISIALISASI ---
 
 st.set_page_config(page_title="KTVDI", page_icon="🇮🇩")
 
+# Modul berat (pandas, google.generativeai, fpdf) diimpor di dalam fungsi yang
+# memakainya, sehingga halaman yang tidak membutuhkannya tidak ikut menanggung
+# waktu impornya saat proses baru mulai. firebase_admin juga diimpor di sini,
+# tetapi backend bawaan membutuhkannya di setiap halaman.
+
+@st.cache_resource
+def get_firebase_app():
+    """Aplikasi Firebase Admin, dibuat sekali per proses."""
+    import firebase_admin
+    from firebase_admin import credentials
+
+    if firebase_admin._apps:
+        return firebase_admin.get_app()
+    cred = credentials.Certificate(dict(st.secrets["FIREBASE"]))
+    return firebase_admin.initialize_app(cred, {
+        "databaseURL": DATABASE_URL
+    })
+
 def initialize_firebase():
     """Menginisialisasi koneksi ke Firebase Realtime Database."""
-    if not firebase_admin._apps:
-        try:
-            cred_dict = dict(st.secrets["FIREBASE"])
-            cred = credentials.Certificate(cred_dict)
-            firebase_admin.initialize_app(cred, {
-                "databaseURL": "https://website-ktvdi-default-rtdb.firebaseio.com/"
-            })
-        except Exception as e:
-            st.error(f"Gagal terhubung ke Firebase: {e}")
-            st.stop()
-            
+    try:
+        get_firebase_app()
+    except Exception as e:
+        st.error(f"Gagal terhubung ke Firebase: {e}")
+        st.stop()
+
+@st.cache_resource
+def get_database_backend(backend_config):
+    """Backend penyimpanan dari bagian [DATABASE] Streamlit Secrets, dibuat sekali per proses."""
+    return InstrumentedBackend(create_backend(dict(backend_config)))
+
+@st.cache_resource
+def get_reference_mirror(backend_config):
+    """
+    Mirror in-memory `provinsi` dan `siaran` (lihat mirror.py), dibuat sekali per proses.
+    Perubahan dari listener juga diteruskan ke indeks siaran.
+
+    Jika listener gagal dipasang, kegagalannya dicatat sekali dan hasilnya None
+    (yang ikut di-cache), sehingga rerun berikutnya tidak mencoba lagi.
+    """
+    mirror = Mirror(get_database_backend(backend_config))
+    try:
+        mirror.start()
+    except Exception:
+        # Tanpa mirror, data referensi tetap dibaca lewat cache biasa
+        mirror.close()
+        logging.getLogger("ktvdi").exception("Mirror data referensi tidak aktif")
+        return None
+    mirror.subscribe(lambda updates: get_siaran_index().apply_updates(updates))
+    add_write_listener(mirror.apply_local)
+    return mirror
+
+def initialize_database():
+    """Memilih backend database: Firebase (bawaan), atau in-memory/SQLite untuk pengembangan lokal."""
+    backend_config = tuple(sorted(dict(st.secrets.get("DATABASE", {})).items()))
+    if dict(backend_config).get("backend", "firebase") == "firebase":
+        initialize_firebase()
+    try:
+        configure_backend(get_database_backend(backend_config))
+    except Exception as e:
+        st.error(f"Gagal menyiapkan database: {e}")
+        st.stop()
+    if dict(backend_config).get("mirror", True):
+        set_mirror(get_reference_mirror(backend_config))
+
+@st.cache_resource
+def configure_gemini(api_key):
+    """Mengonfigurasi klien Gemini sekali per proses (dan per kunci API)."""
+    import google.generativeai as genai
+
+    genai.configure(api_key=api_key)
+    return genai
+
 def initialize_gemini():
-    """Menginisialisasi koneksi ke Gemini API."""
+    """Menginisialisasi koneksi ke Gemini API. Hanya dipanggil oleh halaman chatbot."""
     try:
-        genai.configure(api_key=st.secrets["GEMINI"]["api_key"])
+        return configure_gemini(st.secrets["GEMINI"]["api_key"])
     except KeyError:
         st.error("Kunci API Gemini tidak ditemukan di Streamlit Secrets. Pastikan Anda telah menambahkannya.")
         st.stop()
@@ -46,6 +124,7 @@ def initialize_session_state():
         "login": False,
         "username": "",
         "halaman": "beranda",
+        "halaman_url": None, # Halaman yang terakhir dirender (lihat route_page)
         "mode": "Login", # Untuk selectbox Login/Daftar
         "login_error": "",
         "login_attempted": False,
@@ -55,21 +134,57 @@ def initialize_session_state():
         "reset_username": "",
         "otp_sent_daftar": False,
         "otp_code_daftar": "",
+        "otp_email_job": None, # ID kiriman email OTP terakhir di antrean mailer
         "edit_mode": False, # Menandakan apakah sedang dalam mode edit
         "edit_data": None, # Menyimpan data yang sedang diedit
         "selected_other_user": None, # Menyimpan username pengguna lain yang dipilih untuk dilihat
-        "comment_success_message": "", # Tambahkan ini untuk pesan sukses komentar
+        "flash_messages": [], # Pesan yang ditampilkan sekali pada run berikutnya (lihat flash)
+        "user_summary": None, # Ringkasan nama & poin pengguna login untuk sidebar
+        "leaderboard_cursors": [None], # Cursor setiap halaman leaderboard yang sudah dibuka
+        "user_directory_cursors": {}, # Kata pencarian dan cursor halaman direktori pengguna
+        "comment_cursors": {}, # Cursor halaman komentar yang sudah dimuat, per MUX
         "messages": [],
+        "chat_summary": "", # Ringkasan berjalan dari percakapan chatbot yang sudah dilipat
+        "metrics_rerun": None, # Catatan instrumentasi rerun yang sedang berjalan
+        "mirror_versions": {}, # Versi data mirror yang terakhir ditampilkan, per path
     }
     for key, value in states.items():
         if key not in st.session_state:
             st.session_state[key] = value
 
+def is_admin():
+    """Admin adalah pengguna login yang tercantum di `admins` pada bagian [INSTRUMENTATION] Streamlit Secrets."""
+    admins = st.secrets.get("INSTRUMENTATION", {}).get("admins", [])
+    return bool(st.session_state.get("login")) and st.session_state.get("username") in admins
+
+def start_instrumentation():
+    """
+    Memulai pencatatan rerun ini sejak awal skrip, sehingga waktu impor modul tercatat
+    sebagai fase "imports". Rerun sebelumnya yang terputus oleh st.rerun() ditutup lebih dulu.
+    """
+    configure_instrumentation(st.secrets.get("INSTRUMENTATION"))
+    finish_rerun(st.session_state.get("metrics_rerun"), interrupted=True)
+    st.session_state.metrics_rerun = start_rerun(
+        st.session_state.get("halaman", "beranda"), force_sample=is_admin(), started=SCRIPT_STARTED
+    )
+    mark_phase("imports")
+
+def finish_instrumentation():
+    """Menutup pencatatan rerun ini dan menampilkan panel debug untuk admin."""
+    mark_phase("page")
+    rerun = finish_rerun(st.session_state.metrics_rerun)
+    st.session_state.metrics_rerun = None
+    if is_admin():
+        display_debug_panel(rerun)
+
 # Inisialisasi awal
-initialize_firebase()
+start_instrumentation()
+initialize_database()
 initialize_session_state()
-initialize_gemini()
-WIB = timezone("Asia/Jakarta")
+mark_phase("init")
+IMPORT_BATCH_SIZE = 200  # Jumlah MUX per multi-path update saat impor massal
+CERTIFICATE_BATCH_LIMIT = 50  # Jumlah sertifikat maksimum per unduhan ZIP
+MIRROR_POLL_SECONDS = 5  # Selang pemeriksaan versi mirror oleh setiap sesi
 
 # --- FUNGSI HELPER ---
 
@@ -81,14 +196,17 @@ def generate_otp():
     """Menghasilkan kode OTP 6 digit secara acak."""
     return str(random.randint(100000, 999999))
 
+@st.cache_resource
+def get_mailer():
+    """Membuat pengirim email latar belakang sekali per proses (lihat mailer.py)."""
+    return Mailer.from_config(st.secrets["email"])
+
 def send_otp_email(receiver_email, otp, purpose="reset"):
     """
-    Mengirim email berisi kode OTP.
+    Memasukkan email berisi kode OTP ke antrean pengiriman latar belakang.
     Purpose bisa 'reset' untuk reset password atau 'daftar' untuk pendaftaran.
+    Mengembalikan ID kiriman untuk dipantau dengan display_email_status, atau None jika gagal.
     """
-    sender = st.secrets["email"]["sender"]
-    app_password = st.secrets["email"]["app_password"]
-
     if purpose == "reset":
         subject = "Kode OTP Reset Password KTVDI"
         body = f"Kode OTP untuk reset password Anda adalah: {otp}"
@@ -96,22 +214,57 @@ def send_otp_email(receiver_email, otp, purpose="reset"):
         subject = "Kode OTP Pendaftaran Akun KTVDI"
         body = f"Kode OTP untuk pendaftaran akun Anda adalah: {otp}"
 
-    msg = MIMEText(body)
-    msg["Subject"] = subject
-    msg["From"] = sender
-    msg["To"] = receiver_email
+    job_id = get_mailer().submit(receiver_email, subject, body)
+    if job_id is None:
+        st.error("Gagal mengirim email: antrean email sedang penuh. Coba lagi sebentar lagi.")
+    return job_id
 
-    try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(sender, app_password)
-            server.sendmail(sender, receiver_email, msg.as_string())
-        return True
-    except Exception as e:
-        st.error(f"Gagal mengirim email: {e}")
-        return False
+def display_email_status(job_id):
+    """
+    Menampilkan status pengiriman email. Selama email masih diproses, bagian ini
+    diperbarui sendiri setiap beberapa detik tanpa menjalankan ulang seluruh halaman.
+    """
+    job = get_mailer().status(job_id) if job_id else None
+    pending = job is not None and job["status"] in (QUEUED, SENDING)
+
+    @st.fragment(run_every=2 if pending else None)
+    def email_status():
+        current = get_mailer().status(job_id) if job_id else None
+        if current is None:
+            return
+        if current["status"] in (QUEUED, SENDING):
+            st.caption("📨 Email OTP sedang dikirim...")
+        elif current["status"] == SENT:
+            st.caption("✅ Email OTP sudah terkirim. Periksa juga folder spam.")
+        else:
+            st.error(f"Gagal mengirim email: {current['error']}")
+        if pending and current["status"] not in (QUEUED, SENDING):
+            # Status akhir: jalankan ulang halaman agar pembaruan berkala berhenti
+            st.rerun()
+
+    email_status()
+
+def flash(message, kind="success"):
+    """
+    Menyimpan pesan untuk ditampilkan pada run berikutnya, sehingga aksi bisa
+    langsung memanggil st.rerun() tanpa menunggu pesannya terbaca.
+    `kind`: "success", "toast", atau "balloons" (pesan diabaikan).
+    """
+    st.session_state.flash_messages.append({"kind": kind, "message": message})
+
+def display_flash_messages():
+    """Menampilkan lalu mengosongkan pesan yang disimpan oleh flash."""
+    messages, st.session_state.flash_messages = st.session_state.flash_messages, []
+    for item in messages:
+        if item["kind"] == "balloons":
+            st.balloons()
+        elif item["kind"] == "toast":
+            st.toast(item["message"])
+        else:
+            st.success(item["message"])
 
 def switch_page(page_name):
-    """Fungsi untuk berpindah halaman."""
+    """Fungsi untuk berpindah halaman (kunci PAGES). Diterapkan oleh route_page pada rerun berikutnya."""
     st.session_state.halaman = page_name
 
 def proses_logout():
@@ -120,17 +273,45 @@ def proses_logout():
     st.session_state.username = ""
     st.session_state.selected_other_user = None
     st.session_state.messages = []
+    st.session_state.chat_summary = ""
+    st.session_state.user_summary = None
     switch_page("beranda")
 
+def get_user_summary():
+    """
+    Mengambil ringkasan profil (nama dan poin) pengguna yang login.
+    Hanya membaca users/{username} dan disimpan per sesi agar sidebar tidak membaca ulang setiap rerun.
+    """
+    username = st.session_state.username
+    summary = st.session_state.user_summary
+    if not summary or summary["username"] != username:
+        user_data = get_cached(f"users/{username}") or {}
+        summary = {
+            "username": username,
+            "nama": user_data.get("nama", username),
+            "points": user_data.get("points", 0),
+        }
+        st.session_state.user_summary = summary
+    return summary
+
+def refresh_user_summary(points=None):
+    """
+    Memperbarui ringkasan profil setelah poin diberikan.
+    Jika nilai poin baru diketahui, ringkasan diperbarui langsung tanpa membaca database.
+    """
+    if points is not None and st.session_state.user_summary:
+        st.session_state.user_summary["points"] = points
+    else:
+        st.session_state.user_summary = None
+
 # --- FUNGSI UNTUK MERENDER KOMPONEN UI ---
 
 def display_sidebar():
     """Menampilkan sidebar untuk pengguna yang sudah login."""
     if st.session_state.login:
-        users = db.reference("users").get() or {}
-        user_data = users.get(st.session_state.username, {})
-        nama_pengguna = user_data.get("nama", st.session_state.username)
-        user_points = user_data.get("points", 0)
+        summary = get_user_summary()
+        nama_pengguna = summary["nama"]
+        user_points = summary["points"]
 
         st.sidebar.title(f"Hai, {nama_pengguna}!")
         st.sidebar.markdown(f"**Poin Anda:** {user_points} ⭐")
@@ -151,7 +332,52 @@ def display_sidebar():
             st.rerun()
         st.sidebar.button("🚪 Logout", on_click=proses_logout)
 
-def display_login_form(users):
+def display_cache_stats():
+    """Menampilkan penghitung hit/miss cache Firebase di sidebar (khusus admin, lihat is_admin)."""
+    stats = cache_stats()
+    total = stats["hit"] + stats["miss"] + stats["revalidated"] + stats["refreshed"] + stats["mirror"]
+    hit_rate = (stats["hit"] + stats["revalidated"] + stats["mirror"]) / total * 100 if total else 0
+    with st.sidebar.expander("📊 Statistik Cache"):
+        st.markdown(
+            f"- Hit: **{stats['hit']}**\n"
+            f"- Dari mirror: **{stats['mirror']}**\n"
+            f"- Revalidasi (tidak berubah): **{stats['revalidated']}**\n"
+            f"- Diunduh ulang (berubah): **{stats['refreshed']}**\n"
+            f"- Miss: **{stats['miss']}**\n"
+            f"- Entri tersimpan: **{stats['entries']}** (maks. {CACHE_MAX_ENTRIES}, {stats['evicted']} dibuang)\n"
+            f"- Rasio tanpa unduh ulang: **{hit_rate:.1f}%**"
+        )
+
+def display_debug_panel(rerun):
+    """Panel debug khusus admin: rincian rerun ini dan agregat per halaman serta per panggilan."""
+    import pandas as pd
+
+    with st.sidebar.expander("🛠️ Debug Performa"):
+        if rerun:
+            note = " (terputus)" if rerun.get("interrupted") else ""
+            st.markdown(f"**Rerun ini{note}:** {rerun['total_ms']:.0f} ms di halaman `{rerun['page']}`")
+            st.markdown("\n".join(f"- Fase {name}: **{ms:.0f} ms**" for name, ms in rerun["phases"].items()))
+            st.markdown("\n".join(
+                f"- {kind}: **{kind_stats['count']}** panggilan, **{kind_stats['ms']:.0f} ms**, "
+                f"**{kind_stats['bytes'] / 1024:.1f} KB**"
+                for kind, kind_stats in rerun["kinds"].items()
+            ) or "- Tidak ada panggilan database/eksternal.")
+            if rerun["calls"]:
+                st.dataframe(pd.DataFrame(rerun["calls"])[["kind", "path", "ms", "bytes", "error"]], hide_index=True)
+            if rerun["dropped_calls"]:
+                st.caption(f"{rerun['dropped_calls']} panggilan lain tidak ditampilkan.")
+        startup = startup_stats()
+        if startup:
+            st.markdown(
+                f"**Cold start proses ini:** {startup['ms']:.0f} ms di halaman `{startup['page']}` "
+                f"(impor modul {startup['phases'].get('imports', 0):.0f} ms)"
+            )
+        st.markdown("**Per halaman** (rata-rata per rerun)")
+        st.dataframe(pd.DataFrame(page_stats()).fillna(0).round(1), hide_index=True)
+        st.markdown("**Per panggilan** (hanya rerun yang di-sampling)")
+        st.dataframe(pd.DataFrame(call_stats()).round(1), hide_index=True)
+
+def display_login_form():
     """Menampilkan form untuk login."""
     st.header("🔐 Login Akun KTVDI")
     
@@ -164,9 +390,11 @@ def display_login_form(users):
             return
 
         hashed_pw = hash_password(pw)
-        if user in users and users[user].get("password") == hashed_pw:
+        user_data = get_cached(f"users/{user}") if user.isalnum() else None
+        if user_data and user_data.get("password") == hashed_pw:
             st.session_state.login = True
             st.session_state.username = user
+            st.session_state.user_summary = None
             st.session_state.login_error = ""
             switch_page("beranda")
         else:
@@ -180,7 +408,7 @@ def display_login_form(users):
         st.session_state.lupa_password = True
         st.rerun()
 
-def display_forgot_password_form(users):
+def display_forgot_password_form():
     """Menampilkan form untuk proses lupa password."""
     st.header("🔑 Reset Password")
 
@@ -192,32 +420,27 @@ def display_forgot_password_form(users):
                 st.toast("Email tidak boleh kosong.")
                 return
 
-            # Cari username berdasarkan email
-            found_username = None
-            user_data = None
-            for user_key, data in users.items():
-                if data.get("email", "").strip().lower() == reset_email.strip().lower():
-                    found_username = user_key
-                    user_data = data
-                    break
+            # Cari username melalui indeks users_by_email
+            found_username = find_username_by_email(reset_email)
+            user_data = get_cached(f"users/{found_username}") if found_username else None
 
-            if not found_username:
+            if not user_data:
                 st.toast("❌ Email tidak ditemukan atau tidak terdaftar.")
             else:
                 otp = generate_otp()
-                if send_otp_email(user_data["email"], otp, purpose="reset"):
+                job_id = send_otp_email(user_data["email"], otp, purpose="reset")
+                if job_id:
+                    st.session_state.otp_email_job = job_id
                     st.session_state.otp_code = otp
                     st.session_state.reset_username = found_username # Simpan username yang ditemukan
                     st.session_state.otp_sent = True
-                    st.success(f"OTP berhasil dikirim ke {user_data['email']}.")
-                    # Tampilkan username di sini
-                    st.info(f"Username Anda adalah: **{found_username}**")
-                    time.sleep(2)
+                    flash(f"OTP sedang dikirim ke {user_data['email']}.")
                     st.rerun()
 
     else: # OTP sudah terkirim, tampilkan form untuk input OTP dan password baru
         # Tampilkan username yang disimpan di session_state
         st.info(f"Kode OTP dikirim ke email Anda. Username Anda adalah: **{st.session_state.reset_username}**")
+        display_email_status(st.session_state.otp_email_job)
         
         input_otp = st.text_input("Masukkan Kode OTP", key="reset_otp")
         new_pw = st.text_input("Password Baru", type="password", key="reset_new_pw")
@@ -230,14 +453,13 @@ def display_forgot_password_form(users):
             else:
                 username = st.session_state.reset_username
                 hashed_new_pw = hash_password(new_pw)
-                db.reference("users").child(username).update({"password": hashed_new_pw})
-                st.success("Password berhasil direset. Silakan login kembali.")
-                
+                update_user(username, {"password": hashed_new_pw})
+                flash("Password berhasil direset. Silakan login kembali.")
+
                 st.session_state.lupa_password = False
                 st.session_state.otp_sent = False
                 st.session_state.reset_username = ""
                 st.session_state.otp_code = ""
-                time.sleep(2)
                 st.rerun()
 
     if st.button("❌ Batalkan"):
@@ -247,7 +469,7 @@ def display_forgot_password_form(users):
         st.session_state.otp_code = ""
         st.rerun()
 
-def display_registration_form(users):
+def display_registration_form():
     """Menampilkan form untuk pendaftaran akun baru."""
     st.header("📝 Daftar Akun Baru")
 
@@ -256,36 +478,34 @@ def display_registration_form(users):
         new_email = st.text_input("Email")
         user = st.text_input("Username Baru (huruf kecil/angka tanpa spasi)", placeholder="Contoh: akbar123")
         pw = st.text_input("Password Baru (minimal 6 karakter)", type="password")
-        
-        email_exists = any(u.get("email", "").lower() == new_email.lower() for u in users.values())
 
         submitted = st.form_submit_button("Daftar")
         if submitted:
             if not all([full_name, new_email, user, pw]):
                 st.toast("❌ Semua kolom wajib diisi.")
-            elif user in users:
-                st.toast("❌ Username sudah digunakan.")
-            elif email_exists:
-                st.toast("❌ Email sudah terdaftar.")
             elif not user.isalnum() or not user.islower() or " " in user:
                 st.toast("❌ Username hanya boleh huruf kecil dan angka, tanpa spasi.")
             elif len(pw) < 6:
                 st.toast("❌ Password minimal 6 karakter.")
+            elif username_exists(user):
+                st.toast("❌ Username sudah digunakan.")
+            elif find_username_by_email(new_email):
+                st.toast("❌ Email sudah terdaftar.")
             else:
                 st.session_state.temp_reg_data = {
                     "nama": full_name, "email": new_email, "user": user, "pw": pw
                 }
                 otp = generate_otp()
-                if send_otp_email(new_email, otp, purpose="daftar"):
+                job_id = send_otp_email(new_email, otp, purpose="daftar")
+                if job_id:
                     st.session_state.otp_sent_daftar = True
                     st.session_state.otp_code_daftar = otp
-                    st.success("OTP berhasil dikirim ke email Anda.")
+                    st.session_state.otp_email_job = job_id
                     st.rerun()
-                else:
-                    st.error("Gagal mengirim OTP. Coba lagi nanti.")
 
     if st.session_state.get("otp_sent_daftar"):
         st.info("Masukkan OTP yang telah dikirim ke email Anda untuk menyelesaikan pendaftaran.")
+        display_email_status(st.session_state.otp_email_job)
         input_otp = st.text_input("Masukkan Kode OTP", key="daftar_otp")
         
         if st.button("Verifikasi dan Selesaikan Pendaftaran"):
@@ -293,18 +513,20 @@ def display_registration_form(users):
                 st.error("❌ Kode OTP salah.")
             else:
                 reg_data = st.session_state.temp_reg_data
-                db.reference("users").child(reg_data["user"]).set({
+                if username_exists(reg_data["user"]) or find_username_by_email(reg_data["email"]):
+                    st.error("❌ Username atau email sudah didaftarkan oleh pengguna lain.")
+                    return
+                create_user(reg_data["user"], {
                     "nama": reg_data["nama"],
                     "password": hash_password(reg_data["pw"]),
                     "email": reg_data["email"],
                     "points": 0
                 })
-                st.success("✅ Akun berhasil dibuat! Silakan login.")
-                
+                flash("✅ Akun berhasil dibuat! Silakan login.")
+
                 st.session_state.otp_sent_daftar = False
                 st.session_state.temp_reg_data = {}
                 st.session_state.mode = "Login"
-                time.sleep(2)
                 st.rerun()
 
 def display_add_data_form():
@@ -312,7 +534,7 @@ def display_add_data_form():
     st.markdown("---")
     st.markdown("## ✍️ Tambahkan Data Siaran Baru")
 
-    provinsi_data = db.reference("provinsi").get()
+    provinsi_data = get_cached("provinsi")
     if not provinsi_data:
         st.warning("Data provinsi belum tersedia.")
         return
@@ -336,77 +558,101 @@ def display_add_data_form():
                 st.warning("Harap isi semua kolom.")
                 is_valid = False
             else:
-                wilayah_clean = wilayah.strip()
-                wilayah_clean = re.sub(r'\s*-\s*', '-', wilayah_clean)
-
-                mux_clean = mux.strip()
-                siaran_list = [s.strip() for s in siaran_input.split(",") if s.strip()]
-                
-                is_valid = True 
-                
-                wilayah_pattern = r"^[a-zA-Z\s]+-\d+$" 
-                if not re.fullmatch(wilayah_pattern, wilayah_clean):
-                    st.error("Format **Wilayah Layanan** tidak valid. Harap gunakan format 'Nama Provinsi-Angka'. Contoh: 'Jawa Timur-1', 'DKI Jakarta-2'.")
-                    is_valid = False
-                else:
-                    wilayah_parts = wilayah_clean.split('-')
-                    if len(wilayah_parts) > 1:
-                        provinsi_from_wilayah = '-'.join(wilayah_parts[:-1]).strip()
-                        if provinsi_from_wilayah.lower() != provinsi.lower():
-                            st.error(f"Nama provinsi '{provinsi_from_wilayah}' dalam **Wilayah Layanan** tidak cocok dengan **Provinsi** yang dipilih ('{provinsi}').")
-                            is_valid = False
-                    else:
-                        st.error("Format **Wilayah Layanan** tidak lengkap (tidak ada tanda hubung dan angka).")
-                        is_valid = False
-                
-                mux_pattern = r"^UHF\s+\d{1,3}\s*-\s*.+$"
-                if not re.fullmatch(mux_pattern, mux_clean, re.IGNORECASE):
-                    st.error("Format **Penyelenggara MUX** tidak valid. Harap gunakan format 'UHF XX - Nama MUX'. Contoh: 'UHF 27 - Metro TV'.")
-                    is_valid = False
+                cleaned, errors = validate_siaran_entry(provinsi, wilayah, mux, siaran_input)
+                for message in errors:
+                    st.error(message)
+                is_valid = not errors
+                wilayah_clean, mux_clean, siaran_list = cleaned["wilayah"], cleaned["mux"], cleaned["siaran"]
 
-                if not siaran_list:
-                    st.warning("Daftar **Siaran** tidak boleh kosong.")
-                    is_valid = False
-                else:
-                    for s in siaran_list:
-                        if not re.fullmatch(r"^[a-zA-Z0-9\s&()_.,'-]+$", s): 
-                            st.error(f"Nama siaran '{s}' tidak valid. Hanya boleh huruf, angka, spasi, dan karakter '&()_.,'-'.")
-                            is_valid = False
-                            break
-                            
                 if is_valid:
                     try:
                         updater_username = st.session_state.username
-                        users_ref = db.reference(f"users/{updater_username}")
-                        updater_data = users_ref.get()
-                        updater_name = updater_data.get("nama", updater_username)
-                        
-                        now_wib = datetime.now(WIB)
-                        updated_date = now_wib.strftime("%d-%m-%Y")
-                        updated_time = now_wib.strftime("%H:%M:%S WIB")
+                        summary = get_user_summary()
+                        updater_name = summary["nama"]
 
                         data_to_save = {
-                            "siaran": sorted(siaran_list),
+                            "siaran": siaran_list,
                             "last_updated_by_username": updater_username,
                             "last_updated_by_name": updater_name,
-                            "last_updated_date": updated_date,
-                            "last_updated_time": updated_time
+                            "last_updated_at": server_timestamp(),
                         }
                         
-                        db.reference(f"siaran/{provinsi}/{wilayah_clean}/{mux_clean}").set(data_to_save)
-                        st.success("Data berhasil disimpan!")
-                        st.balloons()
-                        
-                        current_points = updater_data.get("points", 0)
-                        users_ref.update({"points": current_points + 10})
-                        db.reference("app_metadata/last_leaderboard_update_timestamp").set(now_wib.strftime("%Y-%m-%d %H:%M:%S"))
-                        st.toast("Anda mendapatkan 10 poin untuk kontribusi ini!")
-
-                        time.sleep(1)
+                        commit_contribution(
+                            updater_username, updater_name, 10,
+                            {f"siaran/{provinsi}/{wilayah_clean}/{mux_clean}": data_to_save},
+                        )
+                        refresh_user_summary(summary["points"] + 10)
+                        flash("Data berhasil disimpan!")
+                        flash(None, "balloons")
+                        flash("Anda mendapatkan 10 poin untuk kontribusi ini!", "toast")
                         st.rerun()
                     except Exception as e:
                         st.error(f"Gagal menyimpan data: {e}")
 
+def display_bulk_import_form():
+    """Menampilkan impor massal data siaran dari file CSV/JSON (hanya untuk user login)."""
+    with st.expander("📥 Impor Massal dari File CSV/JSON"):
+        st.markdown(
+            "Unggah file **CSV** dengan kolom `provinsi,wilayah,mux,siaran` (siaran dipisah koma dalam satu sel), "
+            "atau **JSON**/**JSON Lines** berisi objek dengan kolom yang sama. "
+            "Data MUX yang sudah ada akan ditimpa; baris yang sama persis dengan data saat ini dilewati "
+            "dan tidak mendapat poin."
+        )
+        uploaded = st.file_uploader("Pilih file", type=["csv", "json", "jsonl"], key="bulk_import_file")
+        if uploaded is None:
+            return
+
+        provinsi_data = get_cached("provinsi") or {}
+        try:
+            rows = parse_import_file(uploaded.name, uploaded.getvalue())
+        except ValueError as e:
+            st.error(str(e))
+            return
+        accepted, errors = validate_import_rows(rows, provinsi_data.values())
+        current = {provinsi: get_cached(f"siaran/{provinsi}") for provinsi in {row["provinsi"] for row in accepted}}
+        new_rows, changed_rows, unchanged_rows = diff_import_rows(accepted, current)
+        to_import = new_rows + changed_rows
+
+        st.write(
+            f"{len(rows)} baris dibaca: **{len(accepted)}** valid, **{len({number for number, _ in errors})}** ditolak. "
+            f"Dari yang valid: **{len(new_rows)}** MUX baru, **{len(changed_rows)}** menimpa data yang berbeda, "
+            f"**{len(unchanged_rows)}** sama dengan data saat ini (dilewati)."
+        )
+        if errors:
+            import pandas as pd
+            errors_df = pd.DataFrame(errors, columns=["Baris", "Kesalahan"])
+            st.dataframe(errors_df, hide_index=True, use_container_width=True)
+
+        if accepted and not to_import:
+            st.info("Semua baris valid sudah sama dengan data saat ini; tidak ada yang perlu diimpor.")
+        if to_import and st.button(f"Impor {len(to_import)} Data", key="bulk_import_submit"):
+            try:
+                updater_username = st.session_state.username
+                summary = get_user_summary()
+                updater_name = summary["nama"]
+
+                metadata = {
+                    "last_updated_by_username": updater_username,
+                    "last_updated_by_name": updater_name,
+                    "last_updated_at": server_timestamp(),
+                }
+                # Satu multi-path update per batch, bukan satu set() per baris
+                progress = st.progress(0.0, text="Menyimpan data...")
+                for start in range(0, len(to_import), IMPORT_BATCH_SIZE):
+                    batch = to_import[start:start + IMPORT_BATCH_SIZE]
+                    updates = {
+                        f"siaran/{row['provinsi']}/{row['wilayah']}/{row['mux']}": {"siaran": row["siaran"], **metadata}
+                        for row in batch
+                    }
+                    commit_contribution(updater_username, updater_name, 10 * len(batch), updates)
+                    progress.progress(min(start + IMPORT_BATCH_SIZE, len(to_import)) / len(to_import))
+                refresh_user_summary(summary["points"] + 10 * len(to_import))
+                flash(f"{len(to_import)} data siaran berhasil diimpor!")
+                flash(f"Anda mendapatkan {10 * len(to_import)} poin untuk kontribusi ini!", "toast")
+                st.rerun()
+            except Exception as e:
+                st.error(f"Gagal mengimpor data: {e}")
+
 def handle_edit_delete_actions(provinsi, wilayah, mux_key, mux_details_full, current_selected_mux_filter=None):
     """
     Menampilkan tombol edit/delete dan memicu aksi terkait.
@@ -416,16 +662,13 @@ def handle_edit_delete_actions(provinsi, wilayah, mux_key, mux_details_full, cur
         current_siaran_list = mux_details_full
         current_updated_by_username = None
         current_updated_by_name = "Belum Diperbarui"
-        current_updated_date = "N/A"
-        current_updated_time = "N/A"
     else:
         current_siaran_list = mux_details_full.get("siaran", [])
         current_updated_by_username = mux_details_full.get("last_updated_by_username")
         current_updated_by_name = mux_details_full.get("last_updated_by_name", "N/A")
-        current_updated_date = mux_details_full.get("last_updated_date", "N/A")
-        current_updated_time = mux_details_full.get("last_updated_time", "N/A")
+    current_updated_at = mux_updated_at(mux_details_full)
 
-    st.markdown(f"<p style='font-size: small; color: grey;'>Diperbarui oleh: <b>{current_updated_by_name}</b> pada {current_updated_date} pukul {current_updated_time}</p>", unsafe_allow_html=True)
+    display_update_info(mux_details_full)
 
     col_edit_del_1, col_edit_del_2 = st.columns(2)
     with col_edit_del_1:
@@ -438,8 +681,7 @@ def handle_edit_delete_actions(provinsi, wilayah, mux_key, mux_details_full, cur
                 "siaran": current_siaran_list,
                 "last_updated_by_username": current_updated_by_username,
                 "last_updated_by_name": current_updated_by_name,
-                "last_updated_date": current_updated_date,
-                "last_updated_time": current_updated_time,
+                "last_updated_at": current_updated_at,
                 "parent_selected_mux_filter": current_selected_mux_filter
             }
             switch_page("edit_data")
@@ -447,9 +689,8 @@ def handle_edit_delete_actions(provinsi, wilayah, mux_key, mux_details_full, cur
     with col_edit_del_2:
         if st.button(f"🗑️ Hapus {mux_key}", key=f"delete_{provinsi}_{wilayah}_{mux_key}"):
             try:
-                db.reference(f"siaran/{provinsi}/{wilayah}/{mux_key}").delete()
-                st.success(f"Data {mux_key} berhasil dihapus!")
-                time.sleep(2)
+                delete_mux(provinsi, wilayah, mux_key)
+                flash(f"Data {mux_key} berhasil dihapus!")
                 st.rerun()
             except Exception as e:
                 st.error(f"Gagal menghapus data: {e}")
@@ -478,7 +719,7 @@ def display_edit_data_page():
     default_siaran_list = edit_data.get("siaran", [])
     default_siaran = ", ".join(default_siaran_list)
 
-    provinsi_data = db.reference("provinsi").get()
+    provinsi_data = get_cached("provinsi")
     provinsi_list = sorted(provinsi_data.values()) if provinsi_data else []
 
     st.info(f"Anda sedang mengedit data untuk **{default_mux}** di **{default_wilayah}, {selected_provinsi}**.")
@@ -501,83 +742,48 @@ def display_edit_data_page():
                     st.warning("Harap isi semua kolom.")
                     is_valid = False
                 else:
-                    new_wilayah_clean = new_wilayah.strip()
-                    new_wilayah_clean = re.sub(r'\s*-\s*', '-', new_wilayah_clean)
-
-                    new_mux_clean = new_mux.strip()
-                    new_siaran_list = [s.strip() for s in new_siaran_input.split(",") if s.strip()]
-                    
-                    is_valid = True 
-                    
-                    wilayah_pattern = r"^[a-zA-Z\s]+-\d+$" 
-                    if not re.fullmatch(wilayah_pattern, new_wilayah_clean):
-                        st.error("Format **Wilayah Layanan** tidak valid. Harap gunakan format 'Nama Provinsi-Angka'. Contoh: 'Jawa Timur-1', 'DKI Jakarta-2'.")
-                        is_valid = False
-                    else:
-                        wilayah_parts = new_wilayah_clean.split('-')
-                        if len(wilayah_parts) > 1:
-                            provinsi_from_wilayah = '-'.join(wilayah_parts[:-1]).strip()
-                            if provinsi_from_wilayah.lower() != selected_provinsi.lower():
-                                st.error(f"Nama provinsi '{provinsi_from_wilayah}' dalam **Wilayah Layanan** tidak cocok dengan **Provinsi** yang dipilih ('{selected_provinsi}').")
-                                is_valid = False
-                        else:
-                            st.error("Format **Wilayah Layanan** tidak lengkap (tidak ada tanda hubung dan angka).")
-                            is_valid = False
-                            
-                    mux_pattern = r"^UHF\s+\d{1,3}\s*-\s*.+$"
-                    if not re.fullmatch(mux_pattern, new_mux_clean, re.IGNORECASE):
-                        st.error("Format **Penyelenggara MUX** tidak valid. Harap gunakan format 'UHF XX - Nama MUX'. Contoh: 'UHF 27 - Metro TV'.")
-                        is_valid = False
-
-                    if not new_siaran_list:
-                        st.warning("Daftar **Siaran** tidak boleh kosong.")
-                        is_valid = False
-                    else:
-                        for s in new_siaran_list:
-                            if not re.fullmatch(r"^[a-zA-Z0-9\s&()_.,'-]+$", s): 
-                                st.error(f"Nama siaran '{s}' tidak valid. Hanya boleh huruf, angka, spasi, dan karakter '&()_.,'-'.")
-                                is_valid = False
-                                break
-                                
+                    cleaned, errors = validate_siaran_entry(selected_provinsi, new_wilayah, new_mux, new_siaran_input)
+                    for message in errors:
+                        st.error(message)
+                    is_valid = not errors
+                    new_wilayah_clean, new_mux_clean, new_siaran_list = cleaned["wilayah"], cleaned["mux"], cleaned["siaran"]
+
                     if is_valid:
                         try:
                             updater_username = st.session_state.username
-                            users_ref = db.reference(f"users/{updater_username}")
-                            updater_data = users_ref.get()
-                            updater_name = updater_data.get("nama", updater_username)
-                            
-                            now_wib = datetime.now(WIB)
-                            updated_date = now_wib.strftime("%d-%m-%Y")
-                            updated_time = now_wib.strftime("%H:%M:%S WIB")
+                            summary = get_user_summary()
+                            updater_name = summary["nama"]
 
                             data_to_update = {
-                                "siaran": sorted(new_siaran_list),
+                                "siaran": new_siaran_list,
                                 "last_updated_by_username": updater_username,
                                 "last_updated_by_name": updater_name,
-                                "last_updated_date": updated_date,
-                                "last_updated_time": updated_time
+                                "last_updated_at": server_timestamp(),
                             }
 
-                            default_wilayah_normalized = re.sub(r'\s*-\s*', '-', default_wilayah)
+                            default_wilayah_normalized = normalize_wilayah(default_wilayah)
+                            new_path = f"siaran/{selected_provinsi}/{new_wilayah_clean}/{new_mux_clean}"
                             
+                            # Field tanggal/jam lama digantikan last_updated_at
+                            data_to_update.update({field: None for field in LEGACY_MUX_FIELDS})
+
                             if default_wilayah_normalized != new_wilayah_clean or default_mux != new_mux_clean:
-                                db.reference(f"siaran/{selected_provinsi}/{default_wilayah}/{default_mux}").delete()
-                                st.toast("Data lama dihapus.")
-                                db.reference(f"siaran/{selected_provinsi}/{new_wilayah_clean}/{new_mux_clean}").set(data_to_update)
+                                # Pindahkan MUX beserta komentar dan metadatanya dalam satu multi-path update
+                                updates = move_mux_updates(
+                                    selected_provinsi, default_wilayah, default_mux,
+                                    new_wilayah_clean, new_mux_clean, data_to_update,
+                                )
                             else:
-                                db.reference(f"siaran/{selected_provinsi}/{new_wilayah_clean}/{new_mux_clean}").update(data_to_update)
-                                
-                            st.success("Data berhasil diperbarui!")
-                            st.balloons()
-                            
-                            current_points = updater_data.get("points", 0)
-                            users_ref.update({"points": current_points + 5})
-                            db.reference("app_metadata/last_leaderboard_update_timestamp").set(now_wib.strftime("%Y-%m-%d %H:%M:%S"))
-                            st.toast("Anda mendapatkan 5 poin untuk pembaruan ini!")
+                                updates = {f"{new_path}/{field}": value for field, value in data_to_update.items()}
+
+                            commit_contribution(updater_username, updater_name, 5, updates)
+                            refresh_user_summary(summary["points"] + 5)
+                            flash("Data berhasil diperbarui!")
+                            flash(None, "balloons")
+                            flash("Anda mendapatkan 5 poin untuk pembaruan ini!", "toast")
 
                             st.session_state.edit_mode = False
                             st.session_state.edit_data = None
-                            time.sleep(1)
                             switch_page("beranda")
                             st.rerun()
                         except Exception as e:
@@ -599,8 +805,7 @@ def display_profile_page():
         return
 
     username = st.session_state.username
-    user_ref = db.reference(f"users/{username}")
-    user_data = user_ref.get()
+    user_data = get_cached(f"users/{username}")
 
     if not user_data:
         st.error("Data profil tidak ditemukan.")
@@ -615,7 +820,7 @@ def display_profile_page():
     st.markdown("---")
     st.subheader("Informasi Lokasi dan Perangkat TV Digital")
 
-    provinsi_data = db.reference("provinsi").get()
+    provinsi_data = get_cached("provinsi")
     provinsi_list = sorted(provinsi_data.values()) if provinsi_data else []
     
     current_provinsi = user_data.get('provinsi', None)
@@ -645,9 +850,8 @@ def display_profile_page():
                 "antenna_brand": new_antenna_brand.strip()
             }
             try:
-                user_ref.update(updates)
-                st.success("Profil berhasil diperbarui!")
-                time.sleep(1)
+                update_user(username, updates)
+                flash("Profil berhasil diperbarui!")
                 st.rerun()
             except Exception as e:
                 st.error(f"Gagal memperbarui profil: {e}")
@@ -665,43 +869,47 @@ def display_other_users_page():
         switch_page("login")
         return
 
-    all_users = db.reference("users").get() or {}
-    
-    other_users = {
-        username: data for username, data in all_users.items() 
-        if username != st.session_state.username
-    }
-
-    if not other_users:
-        st.info("Tidak ada pengguna lain yang terdaftar saat ini.")
-        if st.button("⬅️ Kembali ke Beranda"):
-            switch_page("beranda")
-        return
+    query = st.text_input("Cari nama pengguna", key="user_directory_query", placeholder="Ketik awal nama...")
+    # Cursor halaman direktori yang sudah dibuka; diulang dari awal jika kata pencarian berubah
+    if st.session_state.user_directory_cursors.get("query") != query:
+        st.session_state.user_directory_cursors = {"query": query, "cursors": [None]}
+        st.session_state.selected_other_user = None
+    cursors = st.session_state.user_directory_cursors["cursors"]
 
-    user_display_names = ["Pilih Pengguna"] + sorted([data.get('nama', username) for username, data in other_users.items()])
-    
-    selected_display_name = st.selectbox(
-        "Pilih Pengguna untuk Dilihat Profilnya", 
-        user_display_names,
-        key="select_other_user"
-    )
+    entries, next_key = search_user_directory(query, cursors[-1])
+    entries = [entry for entry in entries if entry["username"] != st.session_state.username]
 
-    selected_username = None
-    if selected_display_name != "Pilih Pengguna":
-        for username, data in other_users.items():
-            if data.get('nama', username) == selected_display_name:
-                selected_username = username
-                break
+    if not entries:
+        st.info("Tidak ada pengguna lain yang cocok." if query else "Tidak ada pengguna lain yang terdaftar saat ini.")
+    else:
+        names = {entry["username"]: entry["nama"] for entry in entries}
+        selected_username = st.radio(
+            "Pilih Pengguna untuk Dilihat Profilnya",
+            list(names),
+            index=list(names).index(st.session_state.selected_other_user) if st.session_state.selected_other_user in names else None,
+            format_func=lambda username: f"{names[username]} (@{username})",
+            key=f"select_other_user_{len(cursors)}",
+        )
+        if selected_username:
+            st.session_state.selected_other_user = selected_username
 
-    st.session_state.selected_other_user = selected_username
+    col_prev, col_next = st.columns(2)
+    with col_prev:
+        if len(cursors) > 1 and st.button("⬅️ Sebelumnya", key="user_directory_prev"):
+            cursors.pop()
+            st.rerun()
+    with col_next:
+        if next_key and st.button("Berikutnya ➡️", key="user_directory_next"):
+            cursors.append(next_key)
+            st.rerun()
 
     if st.session_state.selected_other_user:
         st.markdown("---")
-        st.subheader(f"Profil dari {selected_display_name}")
-        
-        selected_user_data = all_users.get(st.session_state.selected_other_user)
+        # Hanya profil yang dipilih yang dibaca, bukan seluruh node `users`
+        selected_user_data = get_cached(f"users/{st.session_state.selected_other_user}")
 
         if selected_user_data:
+            st.subheader(f"Profil dari {selected_user_data.get('nama', st.session_state.selected_other_user)}")
             st.write(f"**Nama:** {selected_user_data.get('nama', 'N/A')}")
             st.write(f"**Poin:** {selected_user_data.get('points', 0)} ⭐")
             st.write(f"**Provinsi:** {selected_user_data.get('provinsi', 'N/A')}")
@@ -722,26 +930,23 @@ def display_comments_section(provinsi, wilayah, mux_key):
     """
     Menampilkan bagian komentar untuk MUX tertentu dan memungkinkan pengguna menambah komentar.
     """
-    st.subheader("💬 Komentar Pengguna")
-
-    comments_ref = db.reference(f"siaran/{provinsi}/{wilayah}/{mux_key}/comments")
-    comments_data = comments_ref.get() or {}
+    comment_count = get_comment_counts(provinsi).get(wilayah, {}).get(mux_key, 0)
+    st.subheader(f"💬 Komentar Pengguna ({comment_count})")
 
+    # Komentar dimuat per halaman (terbaru lebih dulu); cursor halaman yang sudah dibuka disimpan per MUX
+    cursors = st.session_state.comment_cursors.setdefault(f"{provinsi}/{wilayah}/{mux_key}", [None])
     comments_list = []
-    for comment_id, comment_details in comments_data.items():
-        comments_list.append({
-            "id": comment_id,
-            "username": comment_details.get("username", "Anonim"),
-            "nama_pengguna": comment_details.get("nama_pengguna", "Anonim"),
-            "timestamp": comment_details.get("timestamp", "N/A"),
-            "text": comment_details.get("text", "")
-        })
-    
-    comments_list.sort(key=lambda x: x["timestamp"], reverse=True)
-
-    if st.session_state.comment_success_message:
-        st.success(st.session_state.comment_success_message)
-        st.session_state.comment_success_message = ""
+    older_key = None
+    for before_key in cursors:
+        page, older_key = get_comments_page(provinsi, wilayah, mux_key, before_key)
+        for comment_details in page:
+            comments_list.append({
+                "id": comment_details["id"],
+                "username": comment_details.get("username", "Anonim"),
+                "nama_pengguna": comment_details.get("nama_pengguna", "Anonim"),
+                "timestamp": format_wib(comment_details.get("timestamp")),
+                "text": comment_details.get("text", "")
+            })
 
     # MODIFIKASI DIMULAI DI SINI
     if st.session_state.login:
@@ -753,27 +958,25 @@ def display_comments_section(provinsi, wilayah, mux_key):
                 if new_comment_text.strip():
                     try:
                         current_username = st.session_state.username
-                        user_data = db.reference(f"users/{current_username}").get()
-                        current_user_name = user_data.get("nama", current_username)
-                        
-                        now_wib = datetime.now(WIB)
-                        comment_timestamp = now_wib.strftime("%Y-%m-%d %H:%M:%S WIB")
+                        summary = get_user_summary()
+                        current_user_name = summary["nama"]
 
                         comment_data = {
                             "username": current_username,
                             "nama_pengguna": current_user_name,
-                            "timestamp": comment_timestamp,
+                            "timestamp": server_timestamp(),
                             "text": new_comment_text.strip()
                         }
                         
-                        comments_ref.push().set(comment_data)
+                        commit_contribution(
+                            current_username, current_user_name, 1,
+                            new_comment_updates(provinsi, wilayah, mux_key, comment_data),
+                        )
+                        refresh_user_summary(summary["points"] + 1)
+                        # Mulai lagi dari halaman terbaru agar komentar baru tampil di urutan yang benar
+                        st.session_state.comment_cursors.pop(f"{provinsi}/{wilayah}/{mux_key}", None)
                         
-                        user_ref = db.reference(f"users/{current_username}")
-                        current_points = user_ref.child("points").get() or 0
-                        user_ref.update({"points": current_points + 1})
-                        db.reference("app_metadata/last_leaderboard_update_timestamp").set(now_wib.strftime("%Y-%m-%d %H:%M:%S"))
-                        
-                        st.session_state.comment_success_message = "Komentar berhasil dikirim dan Anda mendapatkan 1 poin!"
+                        flash("Komentar berhasil dikirim dan Anda mendapatkan 1 poin!", "toast")
                         st.rerun()
                     except Exception as e:
                         st.error(f"Gagal mengirim komentar: {e}")
@@ -793,58 +996,136 @@ def display_comments_section(provinsi, wilayah, mux_key):
             st.markdown(f"**{comment['nama_pengguna']}** ({comment['timestamp']}):")
             st.write(comment['text'])
             st.markdown("---")
+        if older_key and st.button("⬇️ Muat komentar lebih lama", key=f"older_comments_{provinsi}_{wilayah}_{mux_key}"):
+            cursors.append(older_key)
+            st.rerun()
+
+def watch_mirror(path):
+    """
+    Menjalankan ulang halaman saat data `path` di mirror berubah. Streamlit tidak bisa
+    memicu rerun sesi dari thread listener, jadi setiap sesi memeriksa nomor versi
+    mirror secara berkala; pemeriksaan ini hanya membaca memori, tanpa panggilan jaringan.
+    """
+    version = mirror_version(path)
+    if version is None:
+        return
+    st.session_state.mirror_versions[path] = version
+
+    @st.fragment(run_every=MIRROR_POLL_SECONDS)
+    def mirror_watcher():
+        if mirror_version(path) != st.session_state.mirror_versions.get(path):
+            st.rerun()
+
+    mirror_watcher()
+
+def display_channel_search():
+    """Kotak pencarian siaran di seluruh provinsi, dilayani indeks siaran di memori."""
+    query = st.text_input("🔍 Cari Siaran di Seluruh Indonesia", placeholder="Contoh: Metro TV", key="channel_search")
+    if not query.strip():
+        return
+
+    results = get_siaran_index().search(query)
+    if not results:
+        st.info(f"Tidak ditemukan siaran yang cocok dengan \"{query}\".")
+        return
+
+    import pandas as pd
+    for result in results:
+        rows = result["rows"]
+        with st.expander(f"📺 {result['name']} — {len(rows)} MUX", expanded=len(results) == 1):
+            results_df = pd.DataFrame(rows)[["provinsi", "wilayah", "mux", "uhf"]]
+            st.dataframe(
+                results_df.rename(columns={"provinsi": "Provinsi", "wilayah": "Wilayah Layanan", "mux": "MUX", "uhf": "UHF"}),
+                hide_index=True,
+                use_container_width=True,
+            )
+    st.markdown("---")
+
+def display_export_section(selected_provinsi):
+    """Menampilkan tombol unduh data siaran satu provinsi atau seluruh Indonesia."""
+    with st.expander("📤 Ekspor Data Siaran"):
+        scope = st.radio(
+            "Cakupan", [f"Provinsi {selected_provinsi}", "Seluruh Indonesia"], horizontal=True, key="export_scope"
+        )
+        formats = [name for name in EXPORT_FORMATS if name != "Parquet" or parquet_available()]
+        export_format = st.radio("Format", formats, horizontal=True, key="export_format")
+        whole_country = scope == "Seluruh Indonesia"
+        extension, mime = EXPORT_FORMATS[export_format]
+
+        def build_export():
+            # Dijalankan saat tombol diklik; memakai snapshot cache yang sama dengan halaman lain
+            if whole_country:
+                rows = iter_export_rows(get_cached("siaran"))
+            else:
+                rows = iter_export_rows(get_cached(f"siaran/{selected_provinsi}"), selected_provinsi)
+            # Streamlit menyimpan isi unduhan sebagai bytes; ini satu-satunya salinan utuhnya
+            with write_export(rows, export_format) as output:
+                return output.read()
+
+        file_stem = "siaran_indonesia" if whole_country else f"siaran_{selected_provinsi.lower().replace(' ', '_')}"
+        st.download_button(
+            f"⬇️ Unduh {export_format}",
+            data=build_export,
+            file_name=f"{file_stem}.{extension}",
+            mime=mime,
+            on_click="ignore",
+            key="export_download",
+        )
+
+def display_siaran_list(siaran_list):
+    """Menampilkan daftar siaran sebagai satu elemen markdown, bukan satu elemen per siaran."""
+    st.markdown("\n".join(f"- {tv}" for tv in siaran_list))
+
+def display_update_info(mux_details):
+    """Menampilkan keterangan siapa dan kapan data MUX terakhir diperbarui."""
+    if isinstance(mux_details, dict):
+        last_updated_by_name = mux_details.get("last_updated_by_name", "N/A")
+        updated_at = mux_updated_at(mux_details)
+        last_updated_date = format_wib(updated_at, "%d-%m-%Y")
+        last_updated_time = format_wib(updated_at, "%H:%M:%S WIB")
+        st.markdown(f"<p style='font-size: small; color: grey;'>Diperbarui oleh: <b>{last_updated_by_name}</b> pada {last_updated_date} pukul {last_updated_time}</p>", unsafe_allow_html=True)
+    else:
+        st.markdown(f"<p style='font-size: small; color: grey;'>Diperbarui oleh: <b>Belum Diperbarui</b> pada N/A pukul N/A</p>", unsafe_allow_html=True)
+
+def display_mux_details(provinsi, wilayah, mux_key, mux_details, selected_mux_filter):
+    """Menampilkan keterangan update, tombol edit/hapus (jika login), dan komentar satu MUX."""
+    if st.session_state.login:
+        handle_edit_delete_actions(provinsi, wilayah, mux_key, mux_details, selected_mux_filter)
+    else:
+        display_update_info(mux_details)
+    display_comments_section(provinsi, wilayah, mux_key)
 
 def display_leaderboard_page():
     """Menampilkan halaman leaderboard kontributor."""
-    st.header("🏆 Leaderboard Kontributor")
+    import pandas as pd
+    from certificate import get_certificate
 
-    all_users = db.reference("users").get() or {}
-    
-    leaderboard_data = []
-    for username, data in all_users.items():
-        if data.get("points", 0) > 0:
-            leaderboard_data.append({
-                "nama": data.get("nama", username),
-                "username": username,
-                "points": data.get("points", 0)
-            })
-    
-    leaderboard_data.sort(key=lambda x: x["points"], reverse=True)
+    st.header("🏆 Leaderboard Kontributor")
 
-    # --- Bagian yang dimodifikasi untuk membaca timestamp dari Firebase ---
-    last_update_timestamp_str = db.reference("app_metadata/last_leaderboard_update_timestamp").get()
-    
-    # Konversi string timestamp menjadi objek datetime, lalu format ulang ke WIB
-    display_update_time_str = "Belum ada update poin tercatat"
-    if last_update_timestamp_str:
-        try:
-            # Parse string timestamp dari Firebase
-            # Asumsi format: "YYYY-MM-DD HH:MM:SS"
-            dt_object = datetime.strptime(last_update_timestamp_str, "%Y-%m-%d %H:%M:%S")
-            # Firebase tidak menyimpan timezone, jadi kita asumsikan UTC atau waktu server
-            # Kemudian konversi ke WIB untuk tampilan
-            
-            # Jika Anda menyimpan waktu server Firebase (biasanya UTC)
-            # dt_object_utc = pytz.utc.localize(dt_object)
-            # dt_object_wib = dt_object_utc.astimezone(WIB)
-            
-            # Jika Anda menyimpan waktu WIB langsung (seperti di kode sebelumnya)
-            # Maka tidak perlu konversi timezone, cukup lokalisaai untuk memastikan
-            dt_object_wib = WIB.localize(dt_object) # Atau dt_object.astimezone(WIB) jika dt_object sudah ada timezone
+    cursors = st.session_state.leaderboard_cursors
+    leaderboard_data, next_cursor = get_leaderboard_page(cursors[-1])
 
-            display_update_time_str = dt_object_wib.strftime("%d-%m-%Y %H:%M:%S WIB")
-        except ValueError:
-            display_update_time_str = f"Waktu update tidak valid: {last_update_timestamp_str}"
-        except Exception as e:
-            display_update_time_str = f"Error waktu: {e}"
-    # --- Akhir bagian yang dimodifikasi ---
+    # Waktu server (epoch milidetik), diformat ke WIB hanya untuk tampilan
+    display_update_time_str = format_wib(
+        get_cached("app_metadata/last_leaderboard_update_timestamp"), default="Belum ada update poin tercatat"
+    )
 
     if leaderboard_data:
         st.write("Berikut adalah daftar kontributor teratas berdasarkan poin:")
         
-        leaderboard_df = pd.DataFrame(leaderboard_data)
-        leaderboard_df.index = leaderboard_df.index + 1
+        leaderboard_df = pd.DataFrame(leaderboard_data).set_index("rank")
+        leaderboard_df.index.name = "Peringkat"
         st.dataframe(leaderboard_df[["nama", "points"]].rename(columns={"nama": "Nama Kontributor", "points": "Poin"}), use_container_width=True)
+
+        col_prev, col_next = st.columns(2)
+        with col_prev:
+            if len(cursors) > 1 and st.button("⬅️ Halaman Sebelumnya"):
+                cursors.pop()
+                st.rerun()
+        with col_next:
+            if next_cursor and st.button("Halaman Berikutnya ➡️"):
+                cursors.append(next_cursor)
+                st.rerun()
         
         # Tampilkan keterangan waktu update yang baru
         st.markdown(f"<p style='font-size: small; color: grey;'>Data diperbarui pada: {display_update_time_str}</p>", unsafe_allow_html=True)
@@ -853,47 +1134,137 @@ def display_leaderboard_page():
         # Tampilkan juga keterangan waktu jika tidak ada data
         st.markdown(f"<p style='font-size: small; color: grey;'>Terakhir diperbarui: {display_update_time_str}</p>", unsafe_allow_html=True) # Tambahkan ini
 
+    if st.session_state.login:
+        my_rank = get_user_rank(st.session_state.username)
+        if my_rank:
+            rank, points = my_rank
+            # Di luar RANK_SCAN_LIMIT besar peringkat pastinya tidak dihitung
+            rank_label = rank if rank is not None else f"{RANK_SCAN_LIMIT}+"
+            st.success(f"Peringkat Anda: **#{rank_label}** dengan {points} poin.")
+            username, summary = st.session_state.username, get_user_summary()
+            issued_date = datetime.now(WIB).strftime("%d-%m-%Y")
+            st.download_button(
+                "📄 Unduh Sertifikat Kontributor",
+                # Dibuat saat tombol diklik, di luar thread skrip; jangan akses session_state di sini
+                data=lambda: get_certificate(username, summary["nama"], points, rank_label, issued_date),
+                file_name=f"sertifikat_ktvdi_{username}.pdf",
+                mime="application/pdf",
+                on_click="ignore",
+                key="download_my_certificate",
+            )
+        else:
+            st.info("Anda belum memiliki poin. Ayo berkontribusi!")
+
+    display_batch_certificates()
+
     st.markdown("---")
     if st.button("⬅️ Kembali ke Beranda"):
+        st.session_state.leaderboard_cursors = [None]
         switch_page("beranda")
         st.rerun()
         
+@st.cache_data(max_entries=8, show_spinner=False)
+def get_batch_certificates_zip(top_n, issued_date, leaderboard_version, _rows):
+    """
+    ZIP sertifikat N kontributor teratas, dibuat sekali per (N, tanggal, versi leaderboard).
+    `_rows` tidak ikut di-hash; isinya sudah ditentukan oleh tiga argumen lainnya.
+    """
+    from certificate import render_batch
+    return render_batch(_rows, issued_date)
+
+def display_batch_certificates():
+    """Menampilkan unduhan sertifikat (ZIP) untuk N kontributor teratas."""
+    with st.expander("📄 Sertifikat Kontributor Teratas"):
+        top_n = st.number_input("Jumlah kontributor teratas", min_value=1, max_value=CERTIFICATE_BATCH_LIMIT, value=10, key="certificate_top_n")
+        top_rows, _ = get_leaderboard_page(page_size=int(top_n))
+        if not top_rows:
+            st.info("Belum ada kontributor dengan poin yang tercatat.")
+            return
+        issued_date = datetime.now(WIB).strftime("%d-%m-%Y")
+        leaderboard_version = get_cached("app_metadata/last_leaderboard_update_timestamp")
+        st.download_button(
+            f"⬇️ Unduh {len(top_rows)} Sertifikat (ZIP)",
+            data=lambda: get_batch_certificates_zip(len(top_rows), issued_date, leaderboard_version, top_rows),
+            file_name=f"sertifikat_ktvdi_top{len(top_rows)}.zip",
+            mime="application/zip",
+            on_click="ignore",
+            key="download_batch_certificates",
+        )
+
+@st.cache_resource
+def get_chatbot_model():
+    """Membuat model generatif chatbot sekali per proses, bukan di setiap rerun."""
+    import google.generativeai as genai
+
+    return genai.GenerativeModel(
+        model_name="gemini-2.5-flash",
+        system_instruction=CHATBOT_SYSTEM_INSTRUCTION,
+    )
+
+def stream_response_text(response):
+    """Menghasilkan potongan teks dari respons Gemini yang di-stream."""
+    for chunk in response:
+        try:
+            yield chunk.text
+        except ValueError:
+            # Potongan tanpa teks (misalnya hanya metadata keamanan) dilewati
+            continue
+
+def ask_gemini(model, prompt, chat_config, siaran_context=None):
+    """
+    Mengirim prompt ke Gemini dan menampilkan jawabannya secara streaming.
+    `siaran_context` berisi baris data siaran yang relevan untuk disisipkan ke prompt.
+    """
+    try:
+        # Siapkan riwayat chat untuk Gemini: giliran terakhir utuh, sisanya diringkas
+        # Jangan masukkan prompt saat ini ke riwayat yang diberikan ke start_chat
+        gemini_prompt = with_siaran_context(prompt, siaran_context)
+        chat_history_for_gemini = build_gemini_history(
+            st.session_state.messages[:-1], st.session_state.chat_summary, chat_config, gemini_prompt
+        )
+
+        # Mulai chat dengan model dan tampilkan jawaban sedikit demi sedikit
+        started = time.perf_counter()
+        with timed("gemini", model.model_name) as span:
+            chat = model.start_chat(history=chat_history_for_gemini)
+            timeout = st.secrets["GEMINI"].get("timeout", 30)
+            response = chat.send_message(gemini_prompt, stream=True, request_options={"timeout": timeout})
+
+            full_response = st.write_stream(stream_response_text(response))
+            if span["sampled"]:
+                span["bytes"] = len(gemini_prompt.encode("utf-8")) + len(str(full_response).encode("utf-8"))
+        remember_answer(
+            prompt, full_response, chat_config, time.perf_counter() - started, cacheable=not siaran_context
+        )
+        st.session_state.messages.append({"role": "assistant", "content": full_response})
+    except Exception as e:
+        st.error(f"Maaf, terjadi kesalahan saat menghubungi chatbot: {e}. Silakan coba lagi nanti.")
+        st.session_state.messages.append({"role": "assistant", "content": "Maaf, terjadi kesalahan saat memproses permintaan Anda. Silakan coba lagi."})
+
+def display_chatbot_stats():
+    """Menampilkan berapa pertanyaan yang dijawab lokal dan berapa yang memanggil Gemini."""
+    stats = chatbot_stats()
+    with st.expander("📊 Statistik Chatbot"):
+        st.markdown(
+            f"- Dijawab dari FAQ: **{stats['faq']}**\n"
+            f"- Dijawab dari cache: **{stats['cache']}**\n"
+            f"- Dijawab dari data siaran: **{stats['data']}**\n"
+            f"- Panggilan Gemini: **{stats['api']}**\n"
+            f"- Rasio jawaban lokal: **{stats['hit_rate'] * 100:.1f}%**\n"
+            f"- Perkiraan waktu yang dihemat: **{stats['saved_seconds']:.1f} detik**"
+        )
+
 def display_chatbot_page():
     """Menampilkan halaman FAQ Chatbot."""
     st.header("🤖 Chatbot KTVDI")
     st.info("Ajukan pertanyaan seputar TV Digital Indonesia. Saya akan bantu menjawab!")
 
-    # Inisialisasi model generatif dengan instruksi sistem (pengetahuan dasar FAQ)
-    model = genai.GenerativeModel(
-        model_name="gemini-2.5-flash",
-        system_instruction=(
-            "Anda adalah Chatbot AI KTVDI untuk website Komunitas TV Digital Indonesia (KTVDI). "
-            "Tugas Anda adalah menjawab pertanyaan pengguna seputar aplikasi KTVDI, "
-            "fungsi-fungsinya (login, daftar, tambah data, edit data, hapus data, poin, leaderboard, profil, komentar), "
-            "serta pertanyaan umum tentang TV Digital di Indonesia (DVB-T2, MUX, mencari siaran, antena, STB, merk TV). "
-            "Jawab dengan ramah, informatif, dan ringkas. "
-            "Gunakan bahasa Indonesia formal. "
-            "Jika pertanyaan di luar cakupan Anda atau memerlukan informasi real-time yang tidak Anda miliki, "
-            "arahkan pengguna untuk mencari informasi lebih lanjut di sumber resmi atau bertanya di forum/komunitas terkait TV Digital."
-            "\n\nBerikut adalah beberapa contoh FAQ yang bisa Anda jawab dan informasi yang harus Anda pertimbangkan:"
-            "\n- **Apa itu KTVDI?** KTVDI adalah platform komunitas online tempat pengguna dapat berbagi, menambahkan, memperbarui, dan melihat data siaran TV Digital (DVB-T2) di berbagai provinsi dan wilayah di Indonesia."
-            "\n- **Bagaimana cara menambahkan data siaran?** Anda perlu login ke akun KTVDI Anda. Setelah login, Anda akan melihat bagian 'Tambahkan Data Siaran Baru' di halaman utama. Isi detail provinsi, wilayah, penyelenggara MUX, dan daftar siaran yang tersedia."
-            "\n- **Bagaimana cara mendapatkan poin?** Anda mendapatkan 10 poin setiap kali Anda berhasil menambahkan data siaran baru. Anda mendapatkan 5 poin saat memperbarui data siaran yang sudah ada. Anda juga mendapatkan 1 poin setiap kali Anda mengirimkan komentar pada data MUX tertentu."
-            "\n- **Apa itu MUX?** MUX adalah singkatan dari Multiplex. Dalam konteks TV Digital, MUX adalah teknologi yang memungkinkan beberapa saluran televisi digital disiarkan secara bersamaan melalui satu frekuensi atau kanal UHF. Setiap MUX biasanya dikelola oleh satu penyelenggara (misalnya, Metro TV, SCTV, Trans TV, TVRI)."
-            "\n- **Bagaimana cara mencari siaran TV digital?** Anda dapat mencari siaran TV digital dengan melakukan pemindaian otomatis (auto scan) pada televisi digital Anda atau Set Top Box (STB) DVB-T2. Pastikan antena Anda terpasang dengan benar dan mengarah ke pemancar terdekat."
-            "\n- **Apa itu DVB-T2?** DVB-T2 adalah standar penyiaran televisi digital terestrial generasi kedua yang digunakan di Indonesia. Standar ini memungkinkan kualitas gambar dan suara yang lebih baik serta efisiensi frekuensi yang lebih tinggi dibandingkan siaran analog."
-            "\n- **Apakah saya bisa mengedit data yang diinput orang lain?** Tidak, Anda hanya bisa mengedit data siaran yang Anda tambahkan sendiri. Jika ada data yang salah atau perlu diperbarui yang diinput oleh pengguna lain, Anda dapat melaporkan atau menunggu kontributor yang bersangkutan untuk memperbaruinya."
-            "\n- **Bagaimana cara melihat profil pengguna lain?** Di sidebar aplikasi, terdapat tombol 'Lihat Profil Pengguna Lain'. Anda bisa memilih username dari daftar untuk melihat informasi profil publik mereka seperti nama, poin, provinsi, wilayah, dan merk perangkat TV digital mereka."
-            "\n- **Bagaimana cara reset password?** Jika Anda lupa password, di halaman login, klik tombol 'Lupa Password?'. Masukkan email yang terdaftar, dan Anda akan menerima kode OTP untuk mereset password Anda."
-            "\n- **Bisakah saya menghapus komentar saya?** Saat ini, tidak ada fitur langsung untuk menghapus komentar setelah dikirim. Harap berhati-hati dalam menulis komentar Anda."
-            "\n- **Poin untuk apa?** Poin adalah bentuk apresiasi atas kontribusi Anda dalam berbagi dan memperbarui data siaran. Pengguna dengan poin tertinggi akan ditampilkan di halaman Leaderboard."
-            "\n- **Apakah harus login untuk melihat data siaran?** Tidak, Anda dapat melihat data siaran tanpa login. Login hanya diperlukan untuk menambahkan, mengedit, menghapus data, memberi komentar, melihat profil Anda, dan mengakses leaderboard."
-            "\n- **Format apa untuk Wilayah Layanan?** Formatnya adalah 'Nama Provinsi-Angka'. Contoh: 'Jawa Timur-1', 'DKI Jakarta-2'."
-            "\n- **Format apa untuk Penyelenggara MUX?** Formatnya adalah 'UHF XX - Nama MUX'. Contoh: 'UHF 27 - Metro TV'."
-            "\n- **Bagaimana cara kerja poin?** Poin diberikan secara otomatis setiap kali Anda berkontribusi. Tambah data (10 poin), edit data (5 poin), komentar (1 poin)."
-            "\n- **Apa yang harus saya lakukan jika siaran tidak muncul?** Pastikan TV/STB Anda mendukung DVB-T2, antena terpasang benar dan mengarah ke pemancar, serta lakukan scan ulang saluran."
-        )
-    )
+    initialize_gemini()
+    model = get_chatbot_model()
+    chat_config = context_config(st.secrets.get("CHATBOT"))
+
+    if st.session_state.chat_summary:
+        st.caption("Percakapan yang lebih lama telah diringkas untuk menghemat konteks chatbot.")
 
     # Tampilkan pesan chat dari riwayat saat aplikasi dijalankan ulang
     for message in st.session_state.messages:
@@ -909,45 +1280,45 @@ def display_chatbot_page():
 
         # Tampilkan respons asisten di kontainer pesan chat
         with st.chat_message("assistant"):
-            with st.spinner("Mencari jawaban..."):
-                try:
-                    # Siapkan riwayat chat untuk Gemini (berbasis giliran)
-                    # Jangan masukkan prompt saat ini ke riwayat yang diberikan ke start_chat
-                    chat_history_for_gemini = [
-                        {"role": "user" if msg["role"] == "user" else "model", "parts": [msg["content"]]}
-                        for msg in st.session_state.messages[:-1] # Semua pesan kecuali yang terakhir (prompt saat ini)
-                    ]
-
-                    # Mulai chat dengan model
-                    chat = model.start_chat(history=chat_history_for_gemini)
-                    response = chat.send_message(prompt)
-
-                    full_response = response.text
-                    st.markdown(full_response)
-                    st.session_state.messages.append({"role": "assistant", "content": full_response})
-                except Exception as e:
-                    st.error(f"Maaf, terjadi kesalahan saat menghubungi chatbot: {e}. Silakan coba lagi nanti.")
-                    st.session_state.messages.append({"role": "assistant", "content": "Maaf, terjadi kesalahan saat memproses permintaan Anda. Silakan coba lagi."})
+            data_answer, siaran_context = answer_from_siaran(prompt, get_siaran_index(), chat_config)
+            local_answer, source = (data_answer, "data") if data_answer else answer_locally(prompt, chat_config)
+            if local_answer:
+                # Dijawab dari FAQ atau cache tanpa memanggil Gemini
+                st.markdown(local_answer)
+                st.caption({
+                    "faq": "Jawaban dari FAQ KTVDI.",
+                    "cache": "Jawaban dari cache.",
+                    "data": "Jawaban dari data siaran KTVDI.",
+                }[source])
+                st.session_state.messages.append({"role": "assistant", "content": local_answer})
+            else:
+                ask_gemini(model, prompt, chat_config, siaran_context)
+
+        st.session_state.messages, st.session_state.chat_summary = trim_stored_messages(
+            st.session_state.messages, st.session_state.chat_summary, chat_config
+        )
 
     st.markdown("---")
+    display_chatbot_stats()
     if st.button("⬅️ Kembali ke Beranda"):
         switch_page("beranda")
         st.rerun()
 
 # --- ROUTING HALAMAN UTAMA APLIKASI ---
 
-st.title("🇮🇩 KOMUNITAS TV DIGITAL INDONESIA 🇮🇩")
-display_sidebar()
-
-if st.session_state.halaman == "beranda":
+def display_home_page():
+    """Menampilkan beranda: pencarian siaran dan data siaran per provinsi."""
     st.header("📺 Data Siaran TV Digital di Indonesia")
-    provinsi_data = db.reference("provinsi").get()
+    display_channel_search()
+    provinsi_data = get_cached("provinsi")
     
     if provinsi_data:
         provinsi_list = sorted(provinsi_data.values())
         selected_provinsi = st.selectbox("Pilih Provinsi", provinsi_list, key="select_provinsi")
+        display_export_section(selected_provinsi)
         
-        siaran_data_prov = db.reference(f"siaran/{selected_provinsi}").get()
+        siaran_data_prov = get_cached(f"siaran/{selected_provinsi}")
+        watch_mirror(f"siaran/{selected_provinsi}")
         if siaran_data_prov:
             wilayah_list = sorted(siaran_data_prov.keys())
             selected_wilayah = st.selectbox("Pilih Wilayah Layanan", wilayah_list, key="select_wilayah")
@@ -958,52 +1329,27 @@ if st.session_state.halaman == "beranda":
             selected_mux_filter = st.selectbox("Pilih Penyelenggara MUX", ["Semua MUX"] + mux_list, key="select_mux_filter")
 
             if selected_mux_filter == "Semua MUX":
-                for mux_key, mux_details in mux_data.items():
-                    st.subheader(f"📡 {mux_key}")
-                    if isinstance(mux_details, list):
-                        siaran_list = mux_details
-                    else:
-                        siaran_list = mux_details.get("siaran", [])
-
-                    for tv in siaran_list:
-                        st.write(f"- {tv}")
-                    
-                    if st.session_state.login:
-                        handle_edit_delete_actions(selected_provinsi, selected_wilayah, mux_key, mux_details, selected_mux_filter)
-                    else:
-                        if isinstance(mux_details, dict):
-                            last_updated_by_name = mux_details.get("last_updated_by_name", "N/A")
-                            last_updated_date = mux_details.get("last_updated_date", "N/A")
-                            last_updated_time = mux_details.get("last_updated_time", "N/A")
-                            st.markdown(f"<p style='font-size: small; color: grey;'>Diperbarui oleh: <b>{last_updated_by_name}</b> pada {last_updated_date} pukul {last_updated_time}</p>", unsafe_allow_html=True)
+                # Mode lazy: setiap MUX berupa expander; aksi dan komentar baru diambil saat dibuka
+                comment_counts = get_comment_counts(selected_provinsi).get(selected_wilayah, {})
+                for mux_key in mux_list:
+                    mux_details = mux_data[mux_key]
+                    siaran_list = mux_details if isinstance(mux_details, list) else mux_details.get("siaran", [])
+                    label = f"📡 {mux_key} — {len(siaran_list)} siaran, {comment_counts.get(mux_key, 0)} komentar"
+                    with st.expander(label):
+                        display_siaran_list(siaran_list)
+                        if st.toggle("Tampilkan detail & komentar", key=f"detail_{selected_provinsi}_{selected_wilayah}_{mux_key}"):
+                            display_mux_details(selected_provinsi, selected_wilayah, mux_key, mux_details, selected_mux_filter)
                         else:
-                            st.markdown(f"<p style='font-size: small; color: grey;'>Diperbarui oleh: <b>Belum Diperbarui</b> pada N/A pukul N/A</p>", unsafe_allow_html=True)
-                    display_comments_section(selected_provinsi, selected_wilayah, mux_key)
-                    st.markdown("---")
+                            display_update_info(mux_details)
 
             else: # Specific MUX selected
                 mux_details = mux_data.get(selected_mux_filter, {})
-                if isinstance(mux_details, list):
-                    siaran_list = mux_details
-                else:
-                    siaran_list = mux_details.get("siaran", [])
+                siaran_list = mux_details if isinstance(mux_details, list) else mux_details.get("siaran", [])
 
                 if siaran_list:
                     st.subheader(f"📡 {selected_mux_filter}")
-                    for tv in siaran_list:
-                        st.write(f"- {tv}")
-                    
-                    if st.session_state.login:
-                        handle_edit_delete_actions(selected_provinsi, selected_wilayah, selected_mux_filter, mux_details, selected_mux_filter)
-                    else:
-                        if isinstance(mux_details, dict):
-                            last_updated_by_name = mux_details.get("last_updated_by_name", "N/A")
-                            last_updated_date = mux_details.get("last_updated_date", "N/A")
-                            last_updated_time = mux_details.get("last_updated_time", "N/A")
-                            st.markdown(f"<p style='font-size: small; color: grey;'>Diperbarui oleh: <b>{last_updated_by_name}</b> pada {last_updated_date} pukul {last_updated_time}</p>", unsafe_allow_html=True)
-                        else:
-                            st.markdown(f"<p style='font-size: small; color: grey;'>Diperbarui oleh: <b>Belum Diperbarui</b> pada N/A pukul N/A</p>", unsafe_allow_html=True)
-                    display_comments_section(selected_provinsi, selected_wilayah, selected_mux_filter)
+                    display_siaran_list(siaran_list)
+                    display_mux_details(selected_provinsi, selected_wilayah, selected_mux_filter, mux_details, selected_mux_filter)
                     st.markdown("---")
                 else:
                     st.info("Tidak ada data siaran untuk MUX ini.")
@@ -1015,16 +1361,15 @@ if st.session_state.halaman == "beranda":
 
     if st.session_state.login:
         display_add_data_form()
+        display_bulk_import_form()
     else:
         st.info("Untuk menambahkan, memperbarui, atau menghapus data, silakan login terlebih dahulu.")
         if st.button("🔐 Login / Daftar Akun"):
             switch_page("login")
             st.rerun()
 
-elif st.session_state.halaman == "login":
-    users_ref = db.reference("users")
-    users = users_ref.get() or {}
-
+def display_login_page():
+    """Menampilkan halaman login, pendaftaran, dan lupa password."""
     if st.session_state.mode == "Daftar Akun":
         st.session_state.lupa_password = False
     
@@ -1034,31 +1379,51 @@ elif st.session_state.halaman == "login":
         )
 
     if st.session_state.lupa_password:
-        display_forgot_password_form(users)
+        display_forgot_password_form()
     elif st.session_state.mode == "Login":
-        display_login_form(users)
+        display_login_form()
     else: # Daftar Akun
-        display_registration_form(users)
+        display_registration_form()
 
     if st.button("⬅️ Kembali ke Beranda"):
         switch_page("beranda")
         st.rerun()
 
-elif st.session_state.halaman == "edit_data":
-    if not st.session_state.login:
-        st.warning("Anda harus login untuk mengakses halaman ini.")
-        switch_page("login")
-    else:
-        display_edit_data_page()
-
-elif st.session_state.halaman == "profile":
-    display_profile_page()
-
-elif st.session_state.halaman == "other_users":
-    display_other_users_page()
-
-elif st.session_state.halaman == "leaderboard":
-    display_leaderboard_page()
+# Setiap halaman punya URL sendiri; navigasi bawaan Streamlit disembunyikan karena
+# perpindahan halaman tetap lewat tombol di sidebar dan switch_page.
+PAGES = {
+    "beranda": st.Page(display_home_page, title="Beranda", icon="📺", url_path="beranda", default=True),
+    "login": st.Page(display_login_page, title="Login", icon="🔐", url_path="login"),
+    "edit_data": st.Page(display_edit_data_page, title="Edit Data", icon="✏️", url_path="edit"),
+    "profile": st.Page(display_profile_page, title="Profil", icon="👤", url_path="profil"),
+    "other_users": st.Page(display_other_users_page, title="Profil Pengguna", icon="👥", url_path="pengguna"),
+    "leaderboard": st.Page(display_leaderboard_page, title="Leaderboard", icon="🏆", url_path="leaderboard"),
+    "chatbot": st.Page(display_chatbot_page, title="Chatbot", icon="🤖", url_path="chatbot"),
+}
+
+def route_page():
+    """
+    Menentukan halaman yang dirender. Halaman yang dibuka lewat URL (tautan langsung,
+    tombol back/forward browser) menjadi `halaman` aktif; sebaliknya, halaman yang
+    dipilih aplikasi lewat switch_page diterapkan di sini dengan st.switch_page.
+    """
+    page = st.navigation(list(PAGES.values()), position="hidden")
+    page_name = next(name for name, candidate in PAGES.items() if candidate.url_path == page.url_path)
+    if page_name != st.session_state.halaman_url:
+        st.session_state.halaman = page_name
+    elif st.session_state.halaman != page_name:
+        st.switch_page(PAGES[st.session_state.halaman])
+    st.session_state.halaman_url = page_name
+    set_rerun_page(page_name)
+    return page
+
+page = route_page()
+st.title("🇮🇩 KOMUNITAS TV DIGITAL INDONESIA 🇮🇩")
+display_flash_messages()
+display_sidebar()
+if is_admin():
+    display_cache_stats()
+mark_phase("sidebar")
+page.run()
 
-elif st.session_state.halaman == "chatbot":
-    display_chatbot_page()
+finish_instrumentation()
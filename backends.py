@@ -0,0 +1,360 @@
+"""
+Backend penyimpanan untuk lapisan data KTVDI (lihat database.py).
+
+Semua backend menyimpan pohon JSON yang sama dengan Realtime Database dan
+menyediakan operasi yang dipakai database.py:
+
+- read(path), read_with_etag(path), read_if_changed(path, etag), exists(path)
+- query(path, order_by, start_at, end_at, limit_to_last, limit_to_first) -> [(key, nilai), ...]
+- update(updates): multi-path update atomik dari root (None menghapus), termasuk
+  nilai server {".sv": {"increment": n}} dan {".sv": "timestamp"}
+- listen(path, callback): callback(event_type, path relatif, data) untuk setiap
+  perubahan di bawah `path`, diawali satu event "put" berisi seluruh isinya;
+  mengembalikan objek dengan close()
+
+FirebaseBackend meneruskan semuanya ke firebase_admin. MemoryBackend dan
+SQLiteBackend berjalan lokal tanpa proyek Firebase, untuk pengembangan,
+benchmark, dan uji beban.
+"""
+import copy
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+def split_path(path):
+    """'a/b/c' -> ['a', 'b', 'c']; root -> []."""
+    return [part for part in path.strip("/").split("/") if part]
+
+def compute_etag(value):
+    """ETag lokal: hash isi JSON (urutan key diseragamkan)."""
+    return hashlib.md5(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+def resolve_server_values(value, current):
+    """Mengganti nilai server Firebase (increment/timestamp) dengan nilai sebenarnya."""
+    if isinstance(value, dict):
+        server_value = value.get(".sv")
+        if server_value == "timestamp":
+            return int(time.time() * 1000)
+        if isinstance(server_value, dict) and "increment" in server_value:
+            base = current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0
+            return base + server_value["increment"]
+        current = current if isinstance(current, dict) else {}
+        return {key: resolve_server_values(child, current.get(key)) for key, child in value.items()}
+    return value
+
+def prune(value):
+    """Membuang dict kosong dan None, seperti Realtime Database yang tidak menyimpan node kosong."""
+    if isinstance(value, dict):
+        pruned = {key: prune(child) for key, child in value.items()}
+        pruned = {key: child for key, child in pruned.items() if child is not None}
+        return pruned or None
+    return value
+
+def _sort_key(order_by, key, value):
+    if order_by is None:
+        return (key,)
+    child = value.get(order_by) if isinstance(value, dict) else None
+    # Urutan Firebase: null, boolean, angka, string, objek
+    if child is None:
+        rank = 0
+    elif isinstance(child, bool):
+        rank = 1
+    elif isinstance(child, (int, float)):
+        rank = 2
+    elif isinstance(child, str):
+        rank = 3
+    else:
+        rank = 4
+        child = key
+    return (rank, child, key)
+
+def apply_query(children, order_by=None, start_at=None, end_at=None, limit_to_last=None, limit_to_first=None):
+    """Menjalankan query ala Firebase di atas dict anak; mengembalikan list (key, nilai) terurut."""
+    items = sorted((children or {}).items(), key=lambda item: _sort_key(order_by, *item))
+    if start_at is not None or end_at is not None:
+        def compared(item):
+            return item[0] if order_by is None else (item[1].get(order_by) if isinstance(item[1], dict) else None)
+        if start_at is not None:
+            items = [item for item in items if compared(item) is not None and compared(item) >= start_at]
+        if end_at is not None:
+            items = [item for item in items if compared(item) is not None and compared(item) <= end_at]
+    if limit_to_last is not None:
+        items = items[-limit_to_last:] if limit_to_last else []
+    if limit_to_first is not None:
+        items = items[:limit_to_first]
+    return items
+
+class LocalListeners:
+    """Listener untuk backend lokal, meniru event "put" dari `Reference.listen()` Firebase."""
+
+    def __init__(self, backend):
+        self._backend = backend
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def add(self, path, callback):
+        entry = (split_path(path), callback)
+        with self._lock:
+            self._listeners.append(entry)
+        callback("put", "/", self._backend.read(path))
+        return _LocalRegistration(self, entry)
+
+    def remove(self, entry):
+        with self._lock:
+            if entry in self._listeners:
+                self._listeners.remove(entry)
+
+    def notify(self, updates):
+        """Dipanggil setelah `update` selesai, di luar lock backend."""
+        with self._lock:
+            listeners = list(self._listeners)
+        for listen_parts, callback in listeners:
+            for path in updates:
+                parts = split_path(path)
+                if parts[:len(listen_parts)] == listen_parts:
+                    relative = parts[len(listen_parts):]
+                    callback("put", "/" + "/".join(relative), self._backend.read("/".join(parts)))
+                elif listen_parts[:len(parts)] == parts:
+                    # Update di leluhur path yang didengarkan: kirim ulang seluruh isinya
+                    callback("put", "/", self._backend.read("/".join(listen_parts)))
+
+class _LocalRegistration:
+    def __init__(self, listeners, entry):
+        self._listeners = listeners
+        self._entry = entry
+
+    def close(self):
+        self._listeners.remove(self._entry)
+
+class FirebaseBackend:
+    """Realtime Database lewat firebase_admin (aplikasi Firebase harus sudah diinisialisasi)."""
+
+    def __init__(self):
+        from firebase_admin import db
+        self._db = db
+
+    def read(self, path):
+        return self._db.reference(path or "/").get()
+
+    def read_with_etag(self, path):
+        return self._db.reference(path or "/").get(etag=True)
+
+    def read_if_changed(self, path, etag):
+        return self._db.reference(path or "/").get_if_changed(etag)
+
+    def exists(self, path):
+        return self._db.reference(path).get(shallow=True) is not None
+
+    def query(self, path, order_by=None, start_at=None, end_at=None, limit_to_last=None, limit_to_first=None):
+        ref = self._db.reference(path)
+        query = ref.order_by_key() if order_by is None else ref.order_by_child(order_by)
+        if start_at is not None:
+            query = query.start_at(start_at)
+        if end_at is not None:
+            query = query.end_at(end_at)
+        if limit_to_last is not None:
+            query = query.limit_to_last(limit_to_last)
+        if limit_to_first is not None:
+            query = query.limit_to_first(limit_to_first)
+        return list((query.get() or {}).items())
+
+    def update(self, updates):
+        self._db.reference("/").update(updates)
+
+    def listen(self, path, callback):
+        # Listener Firebase berjalan di thread milik SDK dan menerima event put/patch dari server
+        return self._db.reference(path).listen(lambda event: callback(event.event_type, event.path, event.data))
+
+class MemoryBackend:
+    """Pohon JSON di memori proses. `seed` adalah isi awal (misalnya hasil ekspor Firebase)."""
+
+    def __init__(self, seed=None):
+        self._root = prune(copy.deepcopy(seed)) or {}
+        self._lock = threading.RLock()
+        self._listeners = LocalListeners(self)
+
+    def _node(self, parts):
+        node = self._root
+        for part in parts:
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return node
+
+    def read(self, path):
+        with self._lock:
+            return copy.deepcopy(self._node(split_path(path)))
+
+    def read_with_etag(self, path):
+        value = self.read(path)
+        return value, compute_etag(value)
+
+    def read_if_changed(self, path, etag):
+        value, new_etag = self.read_with_etag(path)
+        if new_etag == etag:
+            return False, None, etag
+        return True, value, new_etag
+
+    def exists(self, path):
+        with self._lock:
+            return self._node(split_path(path)) is not None
+
+    def query(self, path, order_by=None, start_at=None, end_at=None, limit_to_last=None, limit_to_first=None):
+        with self._lock:
+            children = self._node(split_path(path))
+            items = apply_query(
+                children if isinstance(children, dict) else {}, order_by, start_at, end_at, limit_to_last, limit_to_first
+            )
+            return copy.deepcopy(items)
+
+    def update(self, updates):
+        with self._lock:
+            for path, value in updates.items():
+                parts = split_path(path)
+                value = prune(resolve_server_values(copy.deepcopy(value), self._node(parts)))
+                self._set(parts, value)
+        self._listeners.notify(updates)
+
+    def listen(self, path, callback):
+        return self._listeners.add(path, callback)
+
+    def _set(self, parts, value):
+        if not parts:
+            self._root = value or {}
+            return
+        node = self._root
+        trail = []
+        for part in parts[:-1]:
+            if not isinstance(node.get(part), dict):
+                if value is None:
+                    return
+                node[part] = {}
+            trail.append((node, part))
+            node = node[part]
+        if value is None:
+            node.pop(parts[-1], None)
+            # Hapus leluhur yang menjadi kosong
+            for parent, key in reversed(trail):
+                if parent[key]:
+                    break
+                del parent[key]
+        else:
+            node[parts[-1]] = value
+
+class SQLiteBackend:
+    """
+    Pohon JSON di file SQLite: satu baris per nilai daun (path -> JSON).
+    Subpohon dibaca dengan satu range scan pada primary key path.
+    """
+
+    def __init__(self, filename, seed=None):
+        self._conn = sqlite3.connect(filename, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._listeners = LocalListeners(self)
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS nodes (path TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            empty = self._conn.execute("SELECT 1 FROM nodes LIMIT 1").fetchone() is None
+        if seed and empty:
+            self.update({"/": seed})
+
+    def _rows(self, parts):
+        path = "/".join(parts)
+        if not path:
+            return self._conn.execute("SELECT path, value FROM nodes").fetchall()
+        # '/' diikuti '0' dalam urutan byte, jadi [path/, path0) berisi semua turunan
+        return self._conn.execute(
+            "SELECT path, value FROM nodes WHERE path = ? OR (path >= ? AND path < ?)",
+            (path, path + "/", path + "0"),
+        ).fetchall()
+
+    def _read(self, parts):
+        rows = self._rows(parts)
+        if not rows:
+            return None
+        depth = len(parts)
+        tree = {}
+        for row_path, row_value in rows:
+            row_parts = row_path.split("/")[depth:]
+            value = json.loads(row_value)
+            if not row_parts:
+                return value
+            node = tree
+            for part in row_parts[:-1]:
+                node = node.setdefault(part, {})
+            node[row_parts[-1]] = value
+        return tree
+
+    def read(self, path):
+        with self._lock:
+            return self._read(split_path(path))
+
+    def read_with_etag(self, path):
+        value = self.read(path)
+        return value, compute_etag(value)
+
+    def read_if_changed(self, path, etag):
+        value, new_etag = self.read_with_etag(path)
+        if new_etag == etag:
+            return False, None, etag
+        return True, value, new_etag
+
+    def exists(self, path):
+        with self._lock:
+            return bool(self._rows(split_path(path)))
+
+    def query(self, path, order_by=None, start_at=None, end_at=None, limit_to_last=None, limit_to_first=None):
+        children = self.read(path)
+        return apply_query(
+            children if isinstance(children, dict) else {}, order_by, start_at, end_at, limit_to_last, limit_to_first
+        )
+
+    def _leaves(self, prefix, value):
+        if isinstance(value, dict):
+            for key, child in value.items():
+                yield from self._leaves(prefix + [key], child)
+        elif value is not None:
+            yield "/".join(prefix), json.dumps(value)
+
+    def update(self, updates):
+        with self._lock, self._conn:
+            for path, value in updates.items():
+                parts = split_path(path)
+                value = prune(resolve_server_values(value, self._read(parts)))
+                joined = "/".join(parts)
+                if joined:
+                    self._conn.execute(
+                        "DELETE FROM nodes WHERE path = ? OR (path >= ? AND path < ?)",
+                        (joined, joined + "/", joined + "0"),
+                    )
+                    # Nilai daun di leluhur (jika ada) tertimpa oleh node baru ini
+                    for i in range(1, len(parts)):
+                        self._conn.execute("DELETE FROM nodes WHERE path = ?", ("/".join(parts[:i]),))
+                else:
+                    self._conn.execute("DELETE FROM nodes")
+                self._conn.executemany("INSERT INTO nodes (path, value) VALUES (?, ?)", self._leaves(parts, value))
+        self._listeners.notify(updates)
+
+    def listen(self, path, callback):
+        return self._listeners.add(path, callback)
+
+def create_backend(config):
+    """
+    Membuat backend dari konfigurasi [DATABASE] (dict):
+    backend = "firebase" (bawaan), "memory", atau "sqlite";
+    path = file SQLite (bawaan "ktvdi.sqlite3"); seed = file JSON isi awal untuk backend lokal.
+    """
+    config = dict(config or {})
+    kind = config.get("backend", "firebase")
+    if kind == "firebase":
+        return FirebaseBackend()
+    seed = None
+    if config.get("seed"):
+        with open(config["seed"], encoding="utf-8") as seed_file:
+            seed = json.load(seed_file)
+    if kind == "memory":
+        return MemoryBackend(seed)
+    if kind == "sqlite":
+        return SQLiteBackend(config.get("path", "ktvdi.sqlite3"), seed)
+    raise ValueError(f"Backend database tidak dikenal: {kind}")
@@ -0,0 +1,216 @@
+"""
+Microbenchmark jalur panas KTVDI di atas data sintetis (synthetic.py).
+
+Setiap benchmark dijalankan pada backend in-memory (backends.MemoryBackend)
+untuk beberapa skala data, tanpa Streamlit dan tanpa Firebase, lalu
+dibandingkan dengan baseline yang tersimpan di BASELINE_PATH:
+
+    python bench.py                      # bandingkan dengan baseline
+    python bench.py --scales small large
+    python bench.py --save               # simpan hasil sebagai baseline baru
+
+Keluar dengan status 1 jika ada benchmark yang lebih lambat dari baseline
+melebihi toleransi. Baseline bergantung pada mesin; simpan ulang setelah
+berpindah mesin atau setelah perubahan yang memang disengaja.
+"""
+import argparse
+import json
+import os
+import time
+
+import database
+from backends import MemoryBackend
+from export import iter_export_rows
+from siaran_index import SiaranIndex
+from synthetic import SCALES, HOT_MUX, generate_dataset
+from validators import MAX_IMPORT_ROWS, validate_import_rows
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+DEFAULT_SCALES = ("small", "medium")
+DEFAULT_TOLERANCE = 0.5  # Lambat lebih dari 50% dari baseline dianggap regresi
+MIN_REPEAT = 5
+TARGET_SECONDS = 0.5  # Perkiraan waktu total per benchmark
+
+BENCHMARKS = {}
+
+def benchmark(name):
+    """Mendaftarkan fungsi benchmark; fungsi menerima data dan mengembalikan fungsi yang diukur."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+@benchmark("leaderboard_pages")
+def bench_leaderboard_pages(data):
+    def run():
+        cursor = None
+        for _ in range(5):
+            _, cursor = database._fetch_leaderboard_page(cursor, database.LEADERBOARD_PAGE_SIZE)
+            if cursor is None:
+                break
+    return run
+
+@benchmark("user_rank")
+def bench_user_rank(data):
+    usernames = sorted(data["leaderboard"])[:20]
+    def run():
+        for username in usernames:
+            database._fetch_user_rank(username)
+    return run
+
+@benchmark("email_lookup")
+def bench_email_lookup(data):
+    emails = [user["email"].upper() for user in list(data["users"].values())[:200]]
+    def run():
+        for email in emails:
+            database.find_username_by_email(email)
+    return run
+
+@benchmark("user_directory")
+def bench_user_directory(data):
+    prefixes = ["", "bu", "siti k", "zz"]
+    def run():
+        for prefix in prefixes:
+            _, next_key = database._fetch_user_directory_page(prefix, None, database.USER_DIRECTORY_PAGE_SIZE)
+            if next_key:
+                database._fetch_user_directory_page(prefix, next_key, database.USER_DIRECTORY_PAGE_SIZE)
+    return run
+
+@benchmark("comments_pages")
+def bench_comments_pages(data):
+    provinsi, wilayah = HOT_MUX
+    mux = next(iter(data["comments"][provinsi][wilayah]))
+    path = database.comments_path(provinsi, wilayah, mux)
+    def run():
+        before_key = None
+        for _ in range(3):
+            _, before_key = database._fetch_comments_page(path, before_key, database.COMMENTS_PAGE_SIZE)
+    return run
+
+@benchmark("validate_siaran")
+def bench_validate_siaran(data):
+    rows = list(iter_export_rows(data["siaran"]))[:MAX_IMPORT_ROWS]
+    provinsi_list = sorted(data["provinsi"].values())
+    def run():
+        validate_import_rows(rows, provinsi_list)
+    return run
+
+@benchmark("home_page_shaping")
+def bench_home_page_shaping(data):
+    backend = database.get_backend()
+    provinsi = HOT_MUX[0]
+    def run():
+        # Sama seperti beranda dengan "Semua MUX" untuk setiap wilayah di satu provinsi
+        sorted(backend.read("provinsi").values())
+        siaran_prov = backend.read(f"siaran/{provinsi}") or {}
+        counts = backend.read(f"comment_counts/{provinsi}") or {}
+        labels = []
+        for wilayah in sorted(siaran_prov):
+            mux_data = siaran_prov[wilayah]
+            wilayah_counts = counts.get(wilayah, {})
+            for mux in sorted(mux_data):
+                details = mux_data[mux]
+                siaran_list = details if isinstance(details, list) else details.get("siaran", [])
+                labels.append(f"📡 {mux} — {len(siaran_list)} siaran, {wilayah_counts.get(mux, 0)} komentar")
+        return labels
+    return run
+
+@benchmark("siaran_index_build")
+def bench_siaran_index_build(data):
+    def run():
+        SiaranIndex().build(data["siaran"])
+    return run
+
+@benchmark("siaran_search")
+def bench_siaran_search(data):
+    index = SiaranIndex()
+    index.build(data["siaran"])
+    queries = ["metro", "trans7", "tvri jatim", "kompas", "metor tv", "uhf 27", "jawa timur"]
+    def run():
+        for query in queries:
+            index.search(query)
+    return run
+
+def measure(run):
+    """
+    Waktu tercepat (ms) satu panggilan `run`, diulang hingga kira-kira TARGET_SECONDS.
+    Seperti timeit, nilai minimum dipakai karena paling sedikit terganggu proses lain.
+    """
+    start = time.perf_counter()
+    run()
+    first = time.perf_counter() - start
+    repeat = max(MIN_REPEAT, int(TARGET_SECONDS / max(first, 1e-6)))
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+def run_benchmarks(scales, names=None):
+    """Menjalankan benchmark untuk setiap skala. Mengembalikan {skala: {nama: ms}}."""
+    results = {}
+    for scale in scales:
+        data = generate_dataset(scale)
+        database.configure_backend(MemoryBackend(data))
+        results[scale] = {}
+        for name, setup in BENCHMARKS.items():
+            if names and name not in names:
+                continue
+            results[scale][name] = round(measure(setup(data)), 4)
+            print(f"{scale:>7} {name:<20} {results[scale][name]:10.3f} ms")
+    return results
+
+def compare(results, baseline, tolerance):
+    """Membandingkan hasil dengan baseline. Mengembalikan daftar (skala, nama, ms, baseline_ms)."""
+    regressions = []
+    for scale, timings in results.items():
+        for name, ms in timings.items():
+            base = baseline.get(scale, {}).get(name)
+            if base is None:
+                print(f"{scale:>7} {name:<20} tidak ada di baseline")
+                continue
+            ratio = ms / base if base else float("inf")
+            marker = "REGRESI" if ratio > 1 + tolerance else ""
+            print(f"{scale:>7} {name:<20} {ms:10.3f} ms  baseline {base:10.3f} ms  x{ratio:5.2f} {marker}")
+            if marker:
+                regressions.append((scale, name, ms, base))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark jalur panas KTVDI di atas data sintetis.")
+    parser.add_argument("--scales", nargs="+", choices=sorted(SCALES), default=list(DEFAULT_SCALES))
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Hanya benchmark ini")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--save", action="store_true", help="Simpan hasil sebagai baseline")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.scales, args.only)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+
+    if args.save:
+        for scale, timings in results.items():
+            baseline.setdefault(scale, {}).update(timings)
+        with open(args.baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+        print(f"Baseline disimpan ke {args.baseline}")
+        return
+
+    if not baseline:
+        print("Belum ada baseline; jalankan dengan --save untuk membuatnya.")
+        return
+    print()
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} benchmark lebih lambat dari baseline.")
+        raise SystemExit(1)
+    print("Tidak ada regresi.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Sertifikat PDF untuk kontributor leaderboard KTVDI.
+
+Template (assets/template.jpg) dan font (font/PoetsenOne-Regular.ttf) dimuat
+sekali ke dokumen dasar; setiap sertifikat adalah salinan dokumen dasar itu
+yang diberi teks nama, poin, dan peringkat. Hasilnya disimpan di memo LRU
+sehingga sertifikat yang sama tidak dibuat ulang.
+"""
+import copy
+import io
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+
+from fpdf import FPDF, set_global
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_PATH = os.path.join(BASE_DIR, "assets", "template.jpg")
+FONT_PATH = os.path.join(BASE_DIR, "font", "PoetsenOne-Regular.ttf")
+FONT_FAMILY = "PoetsenOne"
+PAGE_SIZE = (216, 270)  # mm; rasio sama dengan template 1080x1350 px
+TEXT_COLOR = (23, 54, 93)
+MEMO_SIZE = 256  # Jumlah PDF yang disimpan di memo
+
+# Metrik font tidak perlu ditulis ke file .pkl di samping font; dokumen dasar sudah di-cache di memori.
+set_global("FPDF_CACHE_MODE", 1)
+
+_base_document = None
+_base_lock = threading.Lock()
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+def _get_base_document():
+    """Dokumen satu halaman berisi template dan font, dibuat sekali per proses."""
+    global _base_document
+    with _base_lock:
+        if _base_document is None:
+            pdf = FPDF("P", "mm", PAGE_SIZE)
+            pdf.set_auto_page_break(False)
+            pdf.set_margins(0, 0, 0)
+            pdf.add_font(FONT_FAMILY, "", FONT_PATH, uni=True)
+            pdf.add_page()
+            pdf.image(TEMPLATE_PATH, 0, 0, PAGE_SIZE[0], PAGE_SIZE[1])
+            _base_document = pdf
+        return _base_document
+
+def _centered(pdf, y, size, text):
+    pdf.set_font(FONT_FAMILY, "", size)
+    pdf.set_xy(0, y)
+    pdf.cell(PAGE_SIZE[0], size * 0.5, text, 0, 0, "C")
+
+def render_certificate(nama, points, rank, issued_date):
+    """Membuat PDF sertifikat dan mengembalikannya sebagai bytes (tanpa memo)."""
+    pdf = copy.deepcopy(_get_base_document())
+    pdf.set_text_color(*TEXT_COLOR)
+    _centered(pdf, 28, 30, "SERTIFIKAT KONTRIBUTOR")
+    _centered(pdf, 45, 14, "Komunitas TV Digital Indonesia dengan bangga diberikan kepada")
+    _centered(pdf, 120, 36 if len(nama) <= 24 else 26, nama)
+    _centered(pdf, 145, 16, f"atas kontribusi data siaran TV digital sebanyak {points} poin")
+    _centered(pdf, 158, 16, f"Peringkat #{rank} Leaderboard KTVDI")
+    _centered(pdf, 245, 12, f"Diterbitkan {issued_date}")
+    return pdf.output(dest="S").encode("latin-1")
+
+def get_certificate(username, nama, points, rank, issued_date):
+    """
+    Sertifikat satu kontributor, dari memo jika sudah pernah dibuat.
+    Kunci memo adalah (username, points) beserta isi lain yang tercetak
+    (nama, peringkat, tanggal) agar sertifikat tidak pernah basi.
+    """
+    key = (username, points, nama, rank, issued_date)
+    with _memo_lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            return _memo[key]
+    pdf_bytes = render_certificate(nama, points, rank, issued_date)
+    _remember(key, pdf_bytes)
+    return pdf_bytes
+
+def _remember(key, pdf_bytes):
+    with _memo_lock:
+        _memo[key] = pdf_bytes
+        _memo.move_to_end(key)
+        while len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+
+def render_batch(entries, issued_date):
+    """
+    Membuat sertifikat untuk banyak kontributor sekaligus.
+    `entries` berisi dict username, nama, points, rank (misalnya baris leaderboard).
+    Mengembalikan file ZIP (bytes) berisi satu PDF per kontributor.
+
+    Sertifikat dibuat berurutan di proses ini: setiap PDF hanya salinan dokumen
+    dasar yang sudah dimuat, jadi process pool baru per unduhan justru lebih
+    lambat karena setiap pekerja harus memuat template dan font lagi.
+    """
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_STORED) as zip_file:
+        for entry in entries:
+            pdf_bytes = get_certificate(entry["username"], entry["nama"], entry["points"], entry["rank"], issued_date)
+            zip_file.writestr(f"{entry['rank']:03d}_{entry['username']}.pdf", pdf_bytes)
+    return archive.getvalue()
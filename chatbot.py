@@ -0,0 +1,406 @@
+"""
+Logika chatbot KTVDI yang tidak bergantung pada Streamlit.
+
+Modul ini mengatur konteks percakapan yang dikirim ke Gemini: hanya beberapa
+giliran terakhir yang dikirim utuh, giliran yang lebih lama dilipat menjadi
+ringkasan berjalan, dan total konteks dibatasi oleh anggaran karakter.
+Pertanyaan FAQ dan pertanyaan yang pernah dijawab dilayani secara lokal
+tanpa memanggil Gemini. Pertanyaan data siaran ("MUX mana yang membawa X")
+dijawab dari indeks siaran, atau hanya baris yang relevan disisipkan ke prompt.
+"""
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+
+# Nilai bawaan, dapat ditimpa lewat bagian [CHATBOT] di Streamlit Secrets.
+DEFAULT_CONTEXT_CONFIG = {
+    "recent_turns": 4,            # Jumlah giliran (pertanyaan + jawaban) terakhir yang dikirim utuh
+    "max_context_chars": 6000,    # Anggaran karakter riwayat + ringkasan per permintaan
+    "summary_chars": 1500,        # Panjang maksimum ringkasan berjalan
+    "turn_summary_chars": 200,    # Panjang maksimum ringkasan satu giliran
+    "max_stored_messages": 40,    # Batas pesan yang disimpan per sesi
+    "faq_threshold_percent": 55,  # Skor kemiripan minimum (0-100) untuk menjawab langsung dari FAQ
+    "response_cache_size": 256,   # Jumlah jawaban Gemini yang disimpan di cache LRU
+    "max_direct_rows": 12,        # Jumlah MUX maksimum yang masih dijawab langsung dari data siaran
+    "max_context_rows": 15,       # Jumlah baris data siaran maksimum yang disisipkan ke prompt Gemini
+}
+
+# Daftar FAQ yang menjadi pengetahuan dasar chatbot sekaligus sumber jawaban lokal.
+# `keywords` berisi sinonim tambahan untuk pencocokan pertanyaan.
+FAQ_ITEMS = [
+    {
+        "question": "Apa itu KTVDI?",
+        "answer": "KTVDI adalah platform komunitas online tempat pengguna dapat berbagi, menambahkan, memperbarui, dan melihat data siaran TV Digital (DVB-T2) di berbagai provinsi dan wilayah di Indonesia.",
+        "keywords": ["ktvdi", "komunitas", "website"],
+    },
+    {
+        "question": "Bagaimana cara menambahkan data siaran?",
+        "answer": "Anda perlu login ke akun KTVDI Anda. Setelah login, Anda akan melihat bagian 'Tambahkan Data Siaran Baru' di halaman utama. Isi detail provinsi, wilayah, penyelenggara MUX, dan daftar siaran yang tersedia.",
+        "keywords": ["tambah", "input", "kontribusi"],
+    },
+    {
+        "question": "Bagaimana cara mendapatkan poin?",
+        "answer": "Anda mendapatkan 10 poin setiap kali Anda berhasil menambahkan data siaran baru. Anda mendapatkan 5 poin saat memperbarui data siaran yang sudah ada. Anda juga mendapatkan 1 poin setiap kali Anda mengirimkan komentar pada data MUX tertentu.",
+        "keywords": ["dapat", "poin"],
+    },
+    {
+        "question": "Apa itu MUX?",
+        "answer": "MUX adalah singkatan dari Multiplex. Dalam konteks TV Digital, MUX adalah teknologi yang memungkinkan beberapa saluran televisi digital disiarkan secara bersamaan melalui satu frekuensi atau kanal UHF. Setiap MUX biasanya dikelola oleh satu penyelenggara (misalnya, Metro TV, SCTV, Trans TV, TVRI).",
+        "keywords": ["mux", "multiplex"],
+    },
+    {
+        "question": "Bagaimana cara mencari siaran TV digital?",
+        "answer": "Anda dapat mencari siaran TV digital dengan melakukan pemindaian otomatis (auto scan) pada televisi digital Anda atau Set Top Box (STB) DVB-T2. Pastikan antena Anda terpasang dengan benar dan mengarah ke pemancar terdekat.",
+        "keywords": ["cari", "scan", "channel"],
+    },
+    {
+        "question": "Apa itu DVB-T2?",
+        "answer": "DVB-T2 adalah standar penyiaran televisi digital terestrial generasi kedua yang digunakan di Indonesia. Standar ini memungkinkan kualitas gambar dan suara yang lebih baik serta efisiensi frekuensi yang lebih tinggi dibandingkan siaran analog.",
+        "keywords": ["dvb", "t2", "standar"],
+    },
+    {
+        "question": "Apakah saya bisa mengedit data yang diinput orang lain?",
+        "answer": "Tidak, Anda hanya bisa mengedit data siaran yang Anda tambahkan sendiri. Jika ada data yang salah atau perlu diperbarui yang diinput oleh pengguna lain, Anda dapat melaporkan atau menunggu kontributor yang bersangkutan untuk memperbaruinya.",
+        "keywords": ["edit", "ubah", "orang lain"],
+    },
+    {
+        "question": "Bagaimana cara melihat profil pengguna lain?",
+        "answer": "Di sidebar aplikasi, terdapat tombol 'Lihat Profil Pengguna Lain'. Anda bisa memilih username dari daftar untuk melihat informasi profil publik mereka seperti nama, poin, provinsi, wilayah, dan merk perangkat TV digital mereka.",
+        "keywords": ["profil", "pengguna lain"],
+    },
+    {
+        "question": "Bagaimana cara reset password?",
+        "answer": "Jika Anda lupa password, di halaman login, klik tombol 'Lupa Password?'. Masukkan email yang terdaftar, dan Anda akan menerima kode OTP untuk mereset password Anda.",
+        "keywords": ["lupa", "password", "reset"],
+    },
+    {
+        "question": "Bisakah saya menghapus komentar saya?",
+        "answer": "Saat ini, tidak ada fitur langsung untuk menghapus komentar setelah dikirim. Harap berhati-hati dalam menulis komentar Anda.",
+        "keywords": ["hapus", "komentar"],
+    },
+    {
+        "question": "Poin untuk apa?",
+        "answer": "Poin adalah bentuk apresiasi atas kontribusi Anda dalam berbagi dan memperbarui data siaran. Pengguna dengan poin tertinggi akan ditampilkan di halaman Leaderboard.",
+        "keywords": ["poin", "fungsi"],
+    },
+    {
+        "question": "Apakah harus login untuk melihat data siaran?",
+        "answer": "Tidak, Anda dapat melihat data siaran tanpa login. Login hanya diperlukan untuk menambahkan, mengedit, menghapus data, memberi komentar, melihat profil Anda, dan mengakses leaderboard.",
+        "keywords": ["login", "lihat", "wajib"],
+    },
+    {
+        "question": "Format apa untuk Wilayah Layanan?",
+        "answer": "Formatnya adalah 'Nama Provinsi-Angka'. Contoh: 'Jawa Timur-1', 'DKI Jakarta-2'.",
+        "keywords": ["format", "wilayah"],
+    },
+    {
+        "question": "Format apa untuk Penyelenggara MUX?",
+        "answer": "Formatnya adalah 'UHF XX - Nama MUX'. Contoh: 'UHF 27 - Metro TV'.",
+        "keywords": ["format", "mux", "uhf"],
+    },
+    {
+        "question": "Bagaimana cara kerja poin?",
+        "answer": "Poin diberikan secara otomatis setiap kali Anda berkontribusi. Tambah data (10 poin), edit data (5 poin), komentar (1 poin).",
+        "keywords": ["kerja", "poin"],
+    },
+    {
+        "question": "Apa yang harus saya lakukan jika siaran tidak muncul?",
+        "answer": "Pastikan TV/STB Anda mendukung DVB-T2, antena terpasang benar dan mengarah ke pemancar, serta lakukan scan ulang saluran.",
+        "keywords": ["siaran", "hilang", "tidak muncul"],
+    },
+]
+
+# Instruksi sistem untuk model chatbot, dibangun dari FAQ di atas
+CHATBOT_SYSTEM_INSTRUCTION = (
+    "Anda adalah Chatbot AI KTVDI untuk website Komunitas TV Digital Indonesia (KTVDI). "
+    "Tugas Anda adalah menjawab pertanyaan pengguna seputar aplikasi KTVDI, "
+    "fungsi-fungsinya (login, daftar, tambah data, edit data, hapus data, poin, leaderboard, profil, komentar), "
+    "serta pertanyaan umum tentang TV Digital di Indonesia (DVB-T2, MUX, mencari siaran, antena, STB, merk TV). "
+    "Jawab dengan ramah, informatif, dan ringkas. "
+    "Gunakan bahasa Indonesia formal. "
+    "Jika pertanyaan di luar cakupan Anda atau memerlukan informasi real-time yang tidak Anda miliki, "
+    "arahkan pengguna untuk mencari informasi lebih lanjut di sumber resmi atau bertanya di forum/komunitas terkait TV Digital."
+    "\n\nBerikut adalah beberapa contoh FAQ yang bisa Anda jawab dan informasi yang harus Anda pertimbangkan:"
+) + "".join(f"\n- **{item['question']}** {item['answer']}" for item in FAQ_ITEMS)
+
+SUMMARY_PREFIX = "Ringkasan percakapan sebelumnya:\n"
+SUMMARY_ACK = "Baik, saya akan memperhatikan ringkasan tersebut."
+
+# --- KONTEKS PERCAKAPAN ---
+
+def context_config(overrides=None):
+    """Menggabungkan konfigurasi konteks bawaan dengan nilai dari secrets."""
+    config = dict(DEFAULT_CONTEXT_CONFIG)
+    for key, value in dict(overrides or {}).items():
+        if key in config:
+            config[key] = int(value)
+    return config
+
+def _shorten(text, limit):
+    """Mengambil kalimat pertama `text` dan memotongnya hingga `limit` karakter."""
+    text = " ".join(text.split())
+    first_sentence = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+    if len(first_sentence) <= limit:
+        return first_sentence
+    return first_sentence[:limit - 1].rstrip() + "…"
+
+def summarize_messages(messages, config):
+    """Meringkas pesan secara lokal (tanpa panggilan API), satu baris per pesan."""
+    limit = config["turn_summary_chars"]
+    lines = []
+    for message in messages:
+        speaker = "Pengguna" if message["role"] == "user" else "Asisten"
+        lines.append(f"- {speaker}: {_shorten(message['content'], limit)}")
+    return "\n".join(lines)
+
+def merge_summary(summary, addition, config):
+    """Menambahkan `addition` ke ringkasan dan membuang baris terlama jika melebihi batas."""
+    merged = "\n".join(part for part in (summary, addition) if part)
+    limit = config["summary_chars"]
+    while len(merged) > limit and "\n" in merged:
+        merged = merged.split("\n", 1)[1]
+    return merged[-limit:]
+
+def trim_stored_messages(messages, summary, config):
+    """
+    Membatasi riwayat yang disimpan per sesi.
+
+    Pesan terlama di luar `max_stored_messages` dilipat ke ringkasan lalu
+    dibuang. Jumlah pesan yang dibuang selalu genap agar pasangan
+    pertanyaan-jawaban tidak terpotong. Mengembalikan (messages, summary).
+    """
+    overflow = len(messages) - config["max_stored_messages"]
+    if overflow <= 0:
+        return messages, summary
+    overflow += overflow % 2
+    dropped, kept = messages[:overflow], messages[overflow:]
+    return kept, merge_summary(summary, summarize_messages(dropped, config), config)
+
+def build_gemini_history(messages, summary, config, prompt=""):
+    """
+    Menyusun riwayat untuk `start_chat` dari pesan sebelumnya (tanpa prompt saat ini).
+
+    Giliran terakhir dikirim utuh, sisanya masuk ringkasan. Jika riwayat
+    melebihi anggaran karakter, giliran terlama ikut dilipat ke ringkasan
+    hingga muat; ringkasan sendiri dipotong bila masih terlalu panjang.
+    """
+    budget = max(config["max_context_chars"] - len(prompt), 0)
+    split = max(len(messages) - config["recent_turns"] * 2, 0)
+    older, recent = messages[:split], messages[split:]
+    context_summary = merge_summary(summary, summarize_messages(older, config), config)
+
+    def size(summary_text, turns):
+        summary_size = len(SUMMARY_PREFIX) + len(summary_text) + len(SUMMARY_ACK) if summary_text else 0
+        return summary_size + sum(len(message["content"]) for message in turns)
+
+    while recent and size(context_summary, recent) > budget:
+        folded, recent = recent[:2], recent[2:]
+        context_summary = merge_summary(context_summary, summarize_messages(folded, config), config)
+
+    if context_summary and size(context_summary, recent) > budget:
+        room = budget - len(SUMMARY_PREFIX) - len(SUMMARY_ACK)
+        context_summary = context_summary[-room:] if room > 0 else ""
+
+    history = []
+    if context_summary:
+        history.append({"role": "user", "parts": [SUMMARY_PREFIX + context_summary]})
+        history.append({"role": "model", "parts": [SUMMARY_ACK]})
+    for message in recent:
+        history.append({"role": "user" if message["role"] == "user" else "model", "parts": [message["content"]]})
+    return history
+
+# --- MESIN JAWABAN LOKAL (FAQ & CACHE) ---
+
+# Kata umum bahasa Indonesia yang diabaikan saat mencocokkan pertanyaan.
+STOPWORDS = {
+    "apa", "apakah", "itu", "ini", "yang", "dan", "atau", "di", "ke", "dari", "untuk",
+    "saya", "aku", "anda", "kamu", "bagaimana", "gimana", "cara", "caranya", "adalah",
+    "bisa", "bisakah", "dengan", "pada", "ya", "kah", "tolong", "mohon", "dong", "sih",
+    "harus", "jika", "kalau", "kok", "tidak", "ga", "gak", "nya", "the",
+}
+MIN_CACHEABLE_TOKENS = 2  # Pertanyaan yang lebih pendek biasanya lanjutan percakapan, tidak di-cache
+
+def normalize_question(text):
+    """Menyeragamkan pertanyaan: huruf kecil, tanpa tanda baca, spasi tunggal."""
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+def tokenize(text):
+    """Memecah teks menjadi token yang bermakna (tanpa stopword)."""
+    return [token for token in normalize_question(text).split() if token not in STOPWORDS]
+
+class FaqIndex:
+    """Indeks TF-IDF sederhana di atas pertanyaan FAQ untuk pencocokan tanpa jaringan."""
+
+    def __init__(self, items):
+        self.items = items
+        documents = [tokenize(item["question"] + " " + " ".join(item.get("keywords", []))) for item in items]
+        document_frequency = Counter(token for document in documents for token in set(document))
+        total = len(documents)
+        self.idf = {
+            token: math.log((1 + total) / (1 + count)) + 1
+            for token, count in document_frequency.items()
+        }
+        # Token yang tidak dikenal diberi bobot tertinggi agar menurunkan skor kecocokan.
+        self.unknown_idf = math.log(1 + total) + 1
+        self.vectors = [self._vector(document) for document in documents]
+
+    def _vector(self, tokens):
+        counts = Counter(tokens)
+        vector = {token: count * self.idf.get(token, self.unknown_idf) for token, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {token: weight / norm for token, weight in vector.items()} if norm else {}
+
+    def match(self, question):
+        """Mengembalikan (item FAQ, skor 0-1) yang paling mirip dengan `question`."""
+        query = self._vector(tokenize(question))
+        best_item, best_score = None, 0.0
+        for item, vector in zip(self.items, self.vectors):
+            score = sum(weight * vector.get(token, 0.0) for token, weight in query.items())
+            if score > best_score:
+                best_item, best_score = item, score
+        return best_item, best_score
+
+class ResponseCache:
+    """Cache LRU jawaban Gemini tingkat proses, dengan kunci pertanyaan yang dinormalisasi."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+_faq_index = FaqIndex(FAQ_ITEMS)
+_response_cache = None
+_stats_lock = threading.Lock()
+_chatbot_stats = {"faq": 0, "cache": 0, "data": 0, "api": 0, "api_seconds": 0.0}
+
+def _get_response_cache(config):
+    global _response_cache
+    if _response_cache is None or _response_cache.capacity != config["response_cache_size"]:
+        _response_cache = ResponseCache(config["response_cache_size"])
+    return _response_cache
+
+def answer_locally(prompt, config):
+    """
+    Mencoba menjawab tanpa Gemini: dari FAQ jika skornya di atas ambang,
+    lalu dari cache jawaban. Mengembalikan (jawaban, sumber) atau (None, None).
+    """
+    item, score = _faq_index.match(prompt)
+    if item and score * 100 >= config["faq_threshold_percent"]:
+        _record("faq")
+        return item["answer"], "faq"
+
+    answer = _get_response_cache(config).get(normalize_question(prompt))
+    if answer is not None:
+        _record("cache")
+        return answer, "cache"
+    return None, None
+
+def remember_answer(prompt, answer, config, seconds, cacheable=True):
+    """
+    Mencatat satu panggilan Gemini beserta durasinya dan menyimpan jawabannya di cache.
+    Jawaban yang memakai data siaran (`cacheable=False`) tidak di-cache karena datanya bisa berubah.
+    """
+    _record("api", seconds)
+    if cacheable and len(tokenize(prompt)) >= MIN_CACHEABLE_TOKENS:
+        _get_response_cache(config).put(normalize_question(prompt), answer)
+
+# --- PENCARIAN DATA SIARAN ---
+
+# Kata yang menandakan pertanyaan pencarian data ("ada di MUX mana", "UHF berapa").
+LOOKUP_WORDS = {"mux", "uhf", "kanal", "frekuensi", "mana", "dimana", "berapa", "ada", "tersedia", "daftar", "siaran"}
+
+def _format_row(row, with_siaran=True):
+    text = f"{row['provinsi']} / {row['wilayah']} / {row['mux']}"
+    if row["uhf"] is not None:
+        text += f" (UHF {row['uhf']})"
+    if with_siaran:
+        text += ": " + ", ".join(row["siaran"])
+    return text
+
+def _relevant_rows(index, mentions):
+    """Baris MUX yang relevan dengan nama siaran/wilayah/provinsi yang disebut."""
+    locations = mentions["wilayah"]
+    provinces = mentions["provinsi"]
+    rows = []
+    if mentions["channels"]:
+        for channel in mentions["channels"]:
+            for row in index.rows_for_channel(channel):
+                in_wilayah = (row["provinsi"], row["wilayah"]) in locations
+                in_provinsi = row["provinsi"] in provinces
+                if (not locations and not provinces) or in_wilayah or in_provinsi:
+                    rows.append(row)
+    else:
+        for provinsi, wilayah in locations:
+            rows.extend(index.rows_for_wilayah(provinsi, wilayah))
+        for provinsi in provinces:
+            rows.extend(index.rows_for_provinsi(provinsi))
+    return rows
+
+def answer_from_siaran(prompt, index, config):
+    """
+    Menjawab pertanyaan data siaran memakai `index` (lihat siaran_index.py).
+
+    Mengembalikan (jawaban, konteks). Jawaban langsung diberikan bila pertanyaan
+    menyebut nama siaran, berbentuk pencarian, dan hasilnya cukup sedikit.
+    Selain itu, bila ada data yang relevan, `konteks` berisi paling banyak
+    `max_context_rows` baris untuk disisipkan ke prompt Gemini.
+    """
+    mentions = index.find_mentions(prompt)
+    rows = _relevant_rows(index, mentions)
+    if not rows:
+        return None, None
+
+    is_lookup = bool(LOOKUP_WORDS & set(normalize_question(prompt).split()))
+    if mentions["channels"] and is_lookup and len(rows) <= config["max_direct_rows"]:
+        _record("data")
+        names = ", ".join(f"**{index.display_name(channel)}**" for channel in mentions["channels"])
+        lines = [f"{names} dapat diterima di MUX berikut (data komunitas KTVDI):", ""]
+        lines += [f"- {_format_row(row, with_siaran=len(mentions['channels']) > 1)}" for row in rows]
+        return "\n".join(lines), None
+
+    shown = rows[:config["max_context_rows"]]
+    lines = ["Data siaran KTVDI yang relevan (provinsi / wilayah / MUX: siaran):"]
+    lines += [f"- {_format_row(row)}" for row in shown]
+    if len(rows) > len(shown):
+        lines.append(f"- ... dan {len(rows) - len(shown)} MUX lainnya.")
+    return None, "\n".join(lines)
+
+def with_siaran_context(prompt, context):
+    """Menyisipkan konteks data siaran sebelum pertanyaan pengguna."""
+    if not context:
+        return prompt
+    return f"{context}\n\nJawab berdasarkan data di atas bila relevan.\nPertanyaan: {prompt}"
+
+def _record(kind, seconds=0.0):
+    with _stats_lock:
+        _chatbot_stats[kind] += 1
+        _chatbot_stats["api_seconds"] += seconds
+
+def chatbot_stats():
+    """
+    Mengembalikan penghitung jawaban lokal vs panggilan API, rasio hit, dan
+    perkiraan waktu yang dihemat (jumlah jawaban lokal x rata-rata latensi API).
+    """
+    with _stats_lock:
+        stats = dict(_chatbot_stats)
+    local = stats["faq"] + stats["cache"] + stats["data"]
+    total = local + stats["api"]
+    average_latency = stats["api_seconds"] / stats["api"] if stats["api"] else 0.0
+    stats["hit_rate"] = local / total if total else 0.0
+    stats["saved_seconds"] = local * average_latency
+    return stats
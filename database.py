@@ -0,0 +1,532 @@
+"""
+Lapisan akses data untuk aplikasi KTVDI.
+
+Semua pembacaan data dari aplikasi melewati cache read-through tingkat proses
+di modul ini, sehingga rerun Streamlit tidak lagi melakukan round-trip penuh
+ke Firebase untuk data yang belum berubah.
+
+Penyimpanan sebenarnya ditangani backend (lihat backends.py): Firebase
+Realtime Database secara bawaan, atau backend lokal in-memory/SQLite yang
+dipilih lewat `configure_backend`.
+"""
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from backends import FirebaseBackend
+
+DATABASE_URL = "https://website-ktvdi-default-rtdb.firebaseio.com/"
+
+# --- KONFIGURASI CACHE ---
+
+# Masa berlaku (detik) data di cache, berdasarkan segmen pertama path.
+CACHE_TTL = {
+    "provinsi": 3600,
+    "siaran": 300,
+    "users": 60,
+    "users_by_name": 60,
+    "app_metadata": 30,
+    "leaderboard": 30,
+    "comments": 60,
+    "comment_counts": 60,
+}
+DEFAULT_CACHE_TTL = 60
+# Jumlah entri cache maksimum; entri yang paling lama tidak dipakai dibuang lebih dulu.
+# Key query (awalan direktori, peringkat per pengguna, cursor komentar) tidak terbatas
+# jumlahnya, jadi tanpa batas ini cache terus tumbuh selama proses hidup.
+CACHE_MAX_ENTRIES = 2000
+
+_cache = OrderedDict()  # path -> {"value": ..., "etag": ..., "fetched_at": ...}, urutan LRU
+_cache_lock = threading.Lock()
+_cache_generation = 0  # Dinaikkan setiap invalidasi agar hasil fetch yang basi tidak disimpan
+_cache_stats = {"hit": 0, "miss": 0, "revalidated": 0, "refreshed": 0, "mirror": 0, "evicted": 0}
+_write_listeners = []
+_backend = None
+_mirror = None  # Mirror in-memory data referensi (lihat mirror.py), jika diaktifkan
+
+# --- BACKEND ---
+
+def configure_backend(backend):
+    """Memilih backend penyimpanan dan mengosongkan cache milik backend sebelumnya."""
+    global _backend, _cache_generation
+    with _cache_lock:
+        if backend is _backend:
+            return
+        _backend = backend
+        _cache_generation += 1
+        _cache.clear()
+
+def get_backend():
+    """Backend aktif; bawaannya Firebase (aplikasi Firebase harus sudah diinisialisasi)."""
+    global _backend
+    if _backend is None:
+        _backend = FirebaseBackend()
+    return _backend
+
+def set_mirror(mirror):
+    """Memakai `mirror` untuk melayani pembacaan path yang di-mirror (None untuk menonaktifkan)."""
+    global _mirror
+    _mirror = mirror
+
+def mirror_version(path):
+    """Versi data `path` di mirror (berubah setiap kali datanya berubah), atau None tanpa mirror."""
+    return _mirror.version(path) if _mirror is not None else None
+
+# --- FUNGSI CACHE ---
+
+def _normalize_path(path):
+    """Menyeragamkan path Firebase tanpa garis miring di awal/akhir."""
+    return path.strip("/")
+
+def _ttl_for(path):
+    """Mengembalikan TTL (detik) untuk path berdasarkan segmen pertamanya."""
+    return CACHE_TTL.get(path.split("/", 1)[0], DEFAULT_CACHE_TTL)
+
+def _count(kind):
+    with _cache_lock:
+        _cache_stats[kind] += 1
+
+def _lookup(cache_key):
+    """Entri cache untuk `cache_key` (ditandai baru dipakai) beserta generasi cache saat ini."""
+    with _cache_lock:
+        entry = _cache.get(cache_key)
+        if entry is not None:
+            _cache.move_to_end(cache_key)
+        return entry, _cache_generation
+
+def _store(cache_key, entry, generation):
+    """Menyimpan entri jika cache belum diinvalidasi sejak fetch dimulai, lalu membuang entri LRU berlebih."""
+    with _cache_lock:
+        if generation != _cache_generation:
+            return
+        _cache[cache_key] = entry
+        _cache.move_to_end(cache_key)
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+            _cache_stats["evicted"] += 1
+
+def get_cached(path):
+    """
+    Membaca data di `path` melalui cache read-through.
+
+    Data yang masih dalam TTL dikembalikan langsung dari memori. Data yang
+    sudah kedaluwarsa divalidasi ulang dengan ETag (`get_if_changed`) sehingga
+    Firebase hanya mengirim ulang payload jika memang berubah.
+    Path yang di-mirror (lihat `set_mirror`) langsung dibaca dari memori.
+    Nilai yang dikembalikan dipakai bersama oleh semua sesi, jangan dimodifikasi.
+    """
+    path = _normalize_path(path)
+    if _mirror is not None:
+        mirrored, value = _mirror.get(path)
+        if mirrored:
+            _count("mirror")
+            return value
+
+    entry, generation = _lookup(path)
+    now = time.monotonic()
+    if entry and now - entry["fetched_at"] < _ttl_for(path):
+        _count("hit")
+        return entry["value"]
+
+    backend = get_backend()
+    if entry and entry["etag"]:
+        changed, value, etag = backend.read_if_changed(path, entry["etag"])
+        if not changed:
+            _count("revalidated")
+            value, etag = entry["value"], entry["etag"]
+        else:
+            _count("refreshed")
+    else:
+        _count("miss")
+        value, etag = backend.read_with_etag(path)
+
+    _store(path, {"value": value, "etag": etag, "fetched_at": time.monotonic()}, generation)
+    return value
+
+def get_cached_query(path, query_key, fetch):
+    """
+    Seperti `get_cached`, tetapi untuk hasil query (order/limit) di bawah `path`.
+
+    `query_key` membedakan query yang berbeda pada path yang sama dan `fetch`
+    dipanggil untuk menjalankan query saat entri belum ada atau kedaluwarsa.
+    Hasil query ikut terbuang ketika `path` atau turunannya diinvalidasi.
+    """
+    path = _normalize_path(path)
+    cache_key = f"{path}#{query_key}"
+    entry, generation = _lookup(cache_key)
+
+    if entry and time.monotonic() - entry["fetched_at"] < _ttl_for(path):
+        _count("hit")
+        return entry["value"]
+
+    _count("miss")
+    value = fetch()
+    _store(cache_key, {"value": value, "etag": None, "fetched_at": time.monotonic()}, generation)
+    return value
+
+def invalidate_cache(*paths):
+    """
+    Menghapus entri cache yang terpengaruh oleh penulisan ke `paths`.
+
+    Entri untuk path itu sendiri, semua turunannya, dan semua leluhurnya
+    (yang snapshot-nya memuat path tersebut) ikut dibuang.
+    """
+    global _cache_generation
+    with _cache_lock:
+        _cache_generation += 1
+        for path in paths:
+            path = _normalize_path(path)
+            for cache_key in list(_cache):
+                cached_path = cache_key.split("#", 1)[0]
+                if (
+                    cached_path == path
+                    or cached_path.startswith(path + "/")
+                    or path.startswith(cached_path + "/")
+                    or cached_path == ""
+                ):
+                    del _cache[cache_key]
+
+def add_write_listener(listener):
+    """
+    Mendaftarkan fungsi yang dipanggil dengan dict multi-path update
+    (path -> nilai) setiap kali aplikasi menulis lewat `commit_updates`.
+    Dipakai indeks in-memory agar bisa diperbarui secara inkremental.
+    """
+    _write_listeners.append(listener)
+
+def commit_updates(updates):
+    """Menulis multi-path update ke root database, menginvalidasi cache, dan memberi tahu listener."""
+    get_backend().update(updates)
+    invalidate_cache(*updates)
+    for listener in _write_listeners:
+        listener(updates)
+
+def cache_stats():
+    """Mengembalikan salinan penghitung hit/miss cache beserta jumlah entri."""
+    with _cache_lock:
+        stats = dict(_cache_stats)
+        stats["entries"] = len(_cache)
+    return stats
+
+# --- INDEKS EMAIL PENGGUNA ---
+
+# Karakter yang tidak boleh dipakai di key Firebase beserta penggantinya.
+_EMAIL_KEY_ESCAPES = {
+    "%": "%25",
+    ".": ",",
+    "$": "%24",
+    "#": "%23",
+    "[": "%5B",
+    "]": "%5D",
+    "/": "%2F",
+}
+
+def _escape_key(text):
+    return "".join(_EMAIL_KEY_ESCAPES.get(ch, ch) for ch in text)
+
+def email_key(email):
+    """Mengubah email menjadi key indeks `users_by_email` (huruf kecil, karakter terlarang di-escape)."""
+    return _escape_key(email.strip().lower())
+
+def find_username_by_email(email):
+    """Mencari username pemilik `email` dengan membaca satu key di `users_by_email`."""
+    return get_backend().read(f"users_by_email/{email_key(email)}")
+
+def username_exists(username):
+    """Memeriksa apakah `users/{username}` sudah ada tanpa mengunduh isinya."""
+    return get_backend().exists(f"users/{username}")
+
+def create_user(username, user_data):
+    """Membuat akun baru beserta entri `users_by_email` dan `users_by_name` dalam satu multi-path update."""
+    commit_updates({
+        f"users/{username}": user_data,
+        f"users_by_email/{email_key(user_data['email'])}": username,
+        f"users_by_name/{name_key(user_data.get('nama', username), username)}": directory_entry(username, user_data),
+    })
+
+def update_user(username, fields):
+    """Memperbarui sebagian field `users/{username}` (misalnya password atau profil)."""
+    commit_updates({f"users/{username}/{field}": value for field, value in fields.items()})
+
+# --- DIREKTORI PENGGUNA ---
+
+# Node `users_by_name/{nama huruf kecil}~{username}` berisi {"username", "nama"}.
+# Key diurutkan menurut nama lalu username, sehingga pencarian awalan nama dan
+# paginasi cukup memakai query `order_by_key()` tanpa mengunduh seluruh `users`.
+USER_DIRECTORY_PAGE_SIZE = 20
+_NAME_KEY_SEPARATOR = "~"
+_KEY_RANGE_END = "\uf8ff"  # Karakter tinggi untuk batas akhir query awalan
+
+def normalize_user_name(nama):
+    """Nama untuk indeks: huruf kecil dengan spasi berlebih dirapikan."""
+    return " ".join(str(nama or "").lower().split())
+
+def name_key(nama, username):
+    """Key `users_by_name` untuk satu pengguna; username di akhir membuat nama kembar tetap unik."""
+    return f"{_escape_key(normalize_user_name(nama))}{_NAME_KEY_SEPARATOR}{username}"
+
+def directory_entry(username, user_data):
+    """Isi entri `users_by_name` untuk satu pengguna."""
+    return {"username": username, "nama": user_data.get("nama") or username}
+
+def _fetch_user_directory_page(prefix, after_key, page_size):
+    prefix_key = _escape_key(normalize_user_name(prefix))
+    # Ambil satu entri lebih untuk mengetahui apakah masih ada halaman berikutnya
+    # (ditambah satu lagi karena `start_at` ikut mengembalikan `after_key` itu sendiri).
+    result = get_backend().query(
+        "users_by_name", start_at=after_key or prefix_key or None,
+        end_at=prefix_key + _KEY_RANGE_END if prefix_key else None,
+        limit_to_first=page_size + (2 if after_key else 1),
+    )
+    items = [(key, entry) for key, entry in result if key != after_key]
+    next_key = items[page_size - 1][0] if len(items) > page_size else None
+    return [entry for _, entry in items[:page_size]], next_key
+
+def search_user_directory(prefix="", after_key=None, page_size=USER_DIRECTORY_PAGE_SIZE):
+    """
+    Mencari pengguna yang namanya diawali `prefix` (tanpa membedakan huruf besar/kecil),
+    urut menurut nama. `after_key` adalah `next_key` dari halaman sebelumnya.
+    Mengembalikan (entries, next_key); setiap entri berisi username dan nama.
+    """
+    return get_cached_query(
+        "users_by_name", f"{normalize_user_name(prefix)}:{after_key or ''}:{page_size}",
+        lambda: _fetch_user_directory_page(prefix, after_key, page_size),
+    )
+
+# --- LEADERBOARD ---
+
+# Node `leaderboard/{username}` berisi proyeksi {"nama", "points"} milik pengguna
+# yang pernah mendapat poin, diindeks pada `points` (lihat database.rules.json).
+LEADERBOARD_PAGE_SIZE = 20
+
+def _fetch_leaderboard_page(cursor, page_size):
+    # Urutan halaman: poin menurun, poin sama diurutkan username menurun (kebalikan
+    # urutan Firebase). Cursor adalah (poin, username) entri terakhir yang ditampilkan,
+    # ditambah jumlah entri berpoin sama yang sudah tampil (`ties`) untuk ukuran query.
+    def after_cursor(username, points):
+        return cursor is None or points < cursor["points"] or username < cursor["username"]
+
+    # Ambil satu entri lebih untuk mengetahui apakah masih ada halaman berikutnya.
+    limit = page_size + (cursor["ties"] if cursor else 0) + 1
+    while True:
+        result = get_backend().query(
+            "leaderboard", order_by="points", start_at=1,
+            end_at=cursor["points"] if cursor else None,
+            limit_to_last=limit,
+        )
+        entries = [
+            {"username": username, "nama": data.get("nama", username), "points": data.get("points", 0)}
+            for username, data in reversed(result)
+            if after_cursor(username, data.get("points", 0))
+        ]
+        if len(entries) > page_size or len(result) < limit:
+            break
+        # Leaderboard berubah sejak cursor dibuat: perbesar jendela query
+        limit *= 2
+
+    rows = entries[:page_size]
+    offset = cursor["offset"] if cursor else 0
+    for i, row in enumerate(rows):
+        row["rank"] = offset + i + 1
+
+    next_cursor = None
+    if len(entries) > page_size:
+        last = rows[-1]
+        ties = sum(1 for row in rows if row["points"] == last["points"])
+        if cursor and cursor["points"] == last["points"]:
+            ties += cursor["ties"]
+        next_cursor = {"points": last["points"], "username": last["username"], "ties": ties, "offset": offset + len(rows)}
+    return rows, next_cursor
+
+def get_leaderboard_page(cursor=None, page_size=LEADERBOARD_PAGE_SIZE):
+    """
+    Mengambil satu halaman leaderboard (poin tertinggi lebih dulu) dari node `leaderboard`.
+
+    `cursor` adalah nilai `next_cursor` dari halaman sebelumnya (None untuk
+    halaman pertama), berisi poin dan username entri terakhir sehingga
+    ukurannya tetap walaupun banyak pengguna berpoin sama. Mengembalikan (rows, next_cursor).
+    """
+    query_key = "top" if cursor is None else f"{cursor['points']}:{cursor['username']}:{cursor['offset']}"
+    return get_cached_query(
+        "leaderboard", f"{query_key}:{page_size}",
+        lambda: _fetch_leaderboard_page(cursor, page_size),
+    )
+
+RANK_SCAN_LIMIT = 1000  # Jumlah entri maksimum yang dibaca untuk menghitung peringkat satu pengguna
+
+def _fetch_user_rank(username):
+    entry = get_backend().read(f"leaderboard/{username}")
+    if not entry or entry.get("points", 0) <= 0:
+        return None
+    points = entry["points"]
+    # Urutan query (poin naik, poin sama diurutkan key naik) adalah kebalikan urutan
+    # halaman leaderboard, jadi peringkat = jumlah entri sesudah pengguna + 1.
+    # Hanya RANK_SCAN_LIMIT entri teratas yang dibaca.
+    result = get_backend().query("leaderboard", order_by="points", start_at=points, limit_to_last=RANK_SCAN_LIMIT)
+    keys = [key for key, _ in result]
+    if username not in keys:
+        return None, points
+    return len(keys) - keys.index(username), points
+
+def get_user_rank(username):
+    """
+    Mengembalikan (peringkat, poin) pengguna, atau None jika belum punya poin.
+
+    Peringkat memakai aturan yang sama dengan `get_leaderboard_page` (poin sama
+    diurutkan menurut username), sehingga tabel, "Peringkat Anda" dan sertifikat
+    selalu sama. Paling banyak RANK_SCAN_LIMIT entri teratas yang dibaca; pengguna
+    di luar itu mendapat peringkat None (tampilkan sebagai "RANK_SCAN_LIMIT+").
+    Hasilnya di-cache dengan TTL leaderboard dan ikut terbuang saat leaderboard berubah.
+    """
+    return get_cached_query("leaderboard", f"rank:{username}", lambda: _fetch_user_rank(username))
+
+# --- KONTRIBUSI ---
+
+PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+_push_lock = threading.Lock()
+_last_push_time = 0
+_last_push_random = [0] * 12
+
+def generate_push_id(timestamp_ms=None):
+    """
+    Membuat key unik yang terurut kronologis seperti `push()` Firebase,
+    tetapi tanpa round-trip ke server sehingga bisa ikut multi-path update.
+    """
+    global _last_push_time
+    now = int(time.time() * 1000) if timestamp_ms is None else int(timestamp_ms)
+    with _push_lock:
+        if now == _last_push_time:
+            # Waktu sama: naikkan bagian acak agar urutan tetap terjaga.
+            for i in range(11, -1, -1):
+                if _last_push_random[i] < 63:
+                    _last_push_random[i] += 1
+                    break
+                _last_push_random[i] = 0
+        else:
+            _last_push_time = now
+            for i in range(12):
+                _last_push_random[i] = random.randrange(64)
+        random_part = "".join(PUSH_CHARS[i] for i in _last_push_random)
+
+    time_part = ""
+    for _ in range(8):
+        time_part = PUSH_CHARS[now % 64] + time_part
+        now //= 64
+    return time_part + random_part
+
+def server_increment(amount):
+    """Nilai server Realtime Database untuk menambah angka secara atomik di server."""
+    return {".sv": {"increment": amount}}
+
+def server_timestamp():
+    """Nilai server Realtime Database untuk waktu server saat ditulis (epoch milidetik)."""
+    return {".sv": "timestamp"}
+
+def commit_contribution(username, nama, points, updates):
+    """
+    Menyimpan satu kontribusi dalam satu multi-path update ke root database.
+
+    `updates` berisi data kontribusi (path -> nilai, None untuk menghapus).
+    Poin di `users` dan `leaderboard` ditambah dengan increment server sehingga
+    tidak ada update yang hilang saat kontribusi terjadi bersamaan, dan waktu
+    update leaderboard (waktu server) ikut ditulis pada round-trip yang sama.
+    """
+    all_updates = dict(updates)
+    all_updates.update({
+        f"users/{username}/points": server_increment(points),
+        f"leaderboard/{username}/points": server_increment(points),
+        f"leaderboard/{username}/nama": nama,
+        "app_metadata/last_leaderboard_update_timestamp": server_timestamp(),
+    })
+    commit_updates(all_updates)
+
+# --- KOMENTAR ---
+
+# Komentar disimpan terpisah dari pohon `siaran` di `comments/{provinsi}/{wilayah}/{mux}/{push_id}`
+# agar payload provinsi tidak ikut membesar; jumlahnya ada di `comment_counts/...`.
+COMMENTS_PAGE_SIZE = 10
+
+def comments_path(provinsi, wilayah, mux):
+    """Path komentar untuk satu MUX."""
+    return f"comments/{provinsi}/{wilayah}/{mux}"
+
+def comment_counts_path(provinsi, wilayah, mux):
+    """Path jumlah komentar untuk satu MUX."""
+    return f"comment_counts/{provinsi}/{wilayah}/{mux}"
+
+def _fetch_comments_page(path, before_key, page_size):
+    # Ambil satu komentar lebih untuk mengetahui apakah masih ada yang lebih lama
+    # (ditambah satu lagi karena `end_at` ikut mengembalikan `before_key` itu sendiri).
+    result = get_backend().query(path, end_at=before_key, limit_to_last=page_size + (2 if before_key else 1))
+    items = [(key, data) for key, data in result if key != before_key]
+    has_older = len(items) > page_size
+    items = items[-page_size:]
+    comments = [{"id": key, **data} for key, data in reversed(items)]
+    older_key = items[0][0] if has_older else None
+    return comments, older_key
+
+def get_comments_page(provinsi, wilayah, mux, before_key=None, page_size=COMMENTS_PAGE_SIZE):
+    """
+    Mengambil satu halaman komentar MUX, terbaru lebih dulu.
+
+    Push ID terurut kronologis, jadi halaman diambil dengan `order_by_key()`
+    dan `limit_to_last`. `before_key` adalah `older_key` dari halaman
+    sebelumnya untuk memuat komentar yang lebih lama. Mengembalikan (comments, older_key).
+    """
+    path = comments_path(provinsi, wilayah, mux)
+    return get_cached_query(
+        path, f"{before_key or 'latest'}:{page_size}",
+        lambda: _fetch_comments_page(path, before_key, page_size),
+    )
+
+def get_comment_counts(provinsi):
+    """Mengembalikan jumlah komentar per MUX di satu provinsi: {wilayah: {mux: jumlah}}."""
+    return get_cached(f"comment_counts/{provinsi}") or {}
+
+def new_comment_updates(provinsi, wilayah, mux, comment_data):
+    """Path multi-path update untuk menambah satu komentar beserta penghitungnya."""
+    return {
+        f"{comments_path(provinsi, wilayah, mux)}/{generate_push_id()}": comment_data,
+        comment_counts_path(provinsi, wilayah, mux): server_increment(1),
+    }
+
+def delete_mux_updates(provinsi, wilayah, mux):
+    """Path multi-path update untuk menghapus satu MUX beserta komentar dan penghitungnya."""
+    return {
+        f"siaran/{provinsi}/{wilayah}/{mux}": None,
+        comments_path(provinsi, wilayah, mux): None,
+        comment_counts_path(provinsi, wilayah, mux): None,
+    }
+
+def move_mux_updates(provinsi, wilayah, mux, new_wilayah, new_mux, fields=None):
+    """
+    Path multi-path update untuk memindahkan satu MUX ke wilayah/kunci baru beserta
+    komentar, penghitung komentar, dan metadatanya; `fields` menimpa field di node
+    tujuan (nilai None menghapus field). Data asal dibaca langsung dari database,
+    bukan dari cache. ValueError jika MUX tujuan sudah ada atau MUX asal sudah tidak ada.
+    """
+    backend = get_backend()
+    old_path, new_path = f"siaran/{provinsi}/{wilayah}/{mux}", f"siaran/{provinsi}/{new_wilayah}/{new_mux}"
+    if backend.exists(new_path):
+        raise ValueError(f"MUX {new_mux} di {new_wilayah} sudah ada. Edit data tersebut atau gunakan nama lain.")
+    mux_details = backend.read(old_path)
+    if mux_details is None:
+        raise ValueError(f"MUX {mux} di {wilayah} sudah tidak ada, mungkin baru saja dipindahkan atau dihapus.")
+    if not isinstance(mux_details, dict):
+        mux_details = {"siaran": mux_details}  # Format lama: daftar siaran saja
+
+    updates = delete_mux_updates(provinsi, wilayah, mux)
+    moved = {**mux_details, **(fields or {})}
+    updates[new_path] = {field: value for field, value in moved.items() if value is not None}
+    comments = backend.read(comments_path(provinsi, wilayah, mux))
+    if comments is not None:
+        updates[comments_path(provinsi, new_wilayah, new_mux)] = comments
+    comment_count = backend.read(comment_counts_path(provinsi, wilayah, mux))
+    if comment_count is not None:
+        updates[comment_counts_path(provinsi, new_wilayah, new_mux)] = comment_count
+    return updates
+
+def delete_mux(provinsi, wilayah, mux):
+    """Menghapus satu MUX beserta komentarnya dalam satu multi-path update."""
+    commit_updates(delete_mux_updates(provinsi, wilayah, mux))
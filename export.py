@@ -0,0 +1,117 @@
+"""
+Ekspor data siaran ke CSV, JSON Lines, dan Parquet.
+
+Pohon `siaran` diratakan menjadi satu baris per MUX oleh generator, lalu
+ditulis baris demi baris (Parquet: per batch) ke SpooledTemporaryFile yang
+pindah ke disk setelah melewati SPOOL_MAX_BYTES. Tidak ada salinan data
+dalam bentuk list/DataFrame, sehingga memori saat menyusun file tetap terbatas
+berapa pun ukurannya; satu-satunya salinan utuh adalah bytes yang diserahkan
+ke st.download_button.
+"""
+import csv
+import io
+import json
+import tempfile
+
+from siaran_index import uhf_channel
+from timestamps import format_wib, mux_updated_at
+
+EXPORT_COLUMNS = [
+    "provinsi", "wilayah", "mux", "uhf", "siaran",
+    "last_updated_by_name", "last_updated_at", "last_updated_wib",
+]
+# Nama format -> (ekstensi file, MIME type)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "JSON Lines": ("jsonl", "application/jsonl"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+SPOOL_MAX_BYTES = 8 * 1024 * 1024  # Di atas ukuran ini file ekspor ditulis ke disk
+PARQUET_BATCH_ROWS = 1000  # Jumlah baris per row group Parquet
+
+def iter_export_rows(siaran_tree, provinsi=None):
+    """
+    Meratakan pohon siaran menjadi satu dict per MUX (kolom EXPORT_COLUMNS).
+    Jika `provinsi` diisi, `siaran_tree` adalah subpohon provinsi tersebut.
+    """
+    provinces = {provinsi: siaran_tree} if provinsi else siaran_tree
+    for provinsi_name in sorted(provinces or {}):
+        wilayah_data = provinces[provinsi_name] or {}
+        for wilayah in sorted(wilayah_data):
+            mux_data = wilayah_data[wilayah] or {}
+            for mux in sorted(mux_data):
+                details = mux_data[mux]
+                if isinstance(details, list):
+                    details = {"siaran": details}
+                updated_at = mux_updated_at(details)
+                yield {
+                    "provinsi": provinsi_name,
+                    "wilayah": wilayah,
+                    "mux": mux,
+                    "uhf": uhf_channel(mux),
+                    "siaran": list(details.get("siaran", [])),
+                    "last_updated_by_name": details.get("last_updated_by_name", ""),
+                    "last_updated_at": updated_at,  # epoch milidetik, None jika belum pernah diperbarui
+                    "last_updated_wib": format_wib(updated_at, default=""),
+                }
+
+def iter_csv(rows):
+    """Baris CSV (dengan header) sebagai potongan teks. Siaran digabung dengan koma, sesuai format impor."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow([", ".join(row[column]) if column == "siaran" else row[column] for column in EXPORT_COLUMNS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.getvalue():
+        yield buffer.getvalue()
+
+def iter_jsonl(rows):
+    """Satu objek JSON per baris."""
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + "\n"
+
+def parquet_available():
+    """Parquet membutuhkan pyarrow, yang bersifat opsional."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def _write_parquet(rows, output):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("provinsi", pa.string()), ("wilayah", pa.string()), ("mux", pa.string()),
+        ("uhf", pa.int32()), ("siaran", pa.list_(pa.string())),
+        ("last_updated_by_name", pa.string()),
+        ("last_updated_at", pa.timestamp("ms", tz="UTC")), ("last_updated_wib", pa.string()),
+    ])
+    with pq.ParquetWriter(output, schema) as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= PARQUET_BATCH_ROWS:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+
+def write_export(rows, export_format):
+    """
+    Menulis `rows` dalam format `export_format` (kunci EXPORT_FORMATS) ke file
+    sementara dan mengembalikannya dalam posisi siap dibaca dari awal.
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    if export_format == "Parquet":
+        _write_parquet(rows, output)
+    else:
+        chunks = iter_csv(rows) if export_format == "CSV" else iter_jsonl(rows)
+        for chunk in chunks:
+            output.write(chunk.encode("utf-8"))
+    output.seek(0)
+    return output
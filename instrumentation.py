@@ -0,0 +1,289 @@
+"""
+Instrumentasi ringan untuk aplikasi KTVDI.
+
+Setiap panggilan database (lewat InstrumentedBackend) dan panggilan eksternal
+(Gemini, SMTP) diukur dengan `timed`, lalu dikumpulkan per rerun Streamlit
+dan per halaman. Hanya sebagian rerun yang di-sampling (`sample_rate`): untuk
+rerun tersebut setiap panggilan dicatat lengkap dengan path dan ukuran
+payload serta ditulis sebagai log JSON satu baris. Rerun lain hanya
+menjumlahkan waktu per jenis panggilan, sehingga aman dibiarkan aktif di
+produksi. Panggilan yang lebih lambat dari `slow_ms` selalu dicatat di log.
+
+Rerun pertama setiap proses ditandai sebagai cold start dan selalu dicatat,
+karena di situlah modul-modul berat pertama kali diimpor.
+"""
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+LOGGER = logging.getLogger("ktvdi.metrics")
+
+# Nilai bawaan, dapat ditimpa lewat bagian [INSTRUMENTATION] di Streamlit Secrets.
+DEFAULT_CONFIG = {
+    "sample_rate": 0.1,   # Bagian rerun yang dicatat lengkap (0..1)
+    "log": True,          # Tulis log JSON ke stderr
+    "slow_ms": 1000,      # Panggilan selambat ini selalu dicatat di log
+}
+MAX_CALLS_PER_RERUN = 200  # Batas panggilan yang disimpan per rerun yang di-sampling
+
+_config = dict(DEFAULT_CONFIG)
+_local = threading.local()  # Rerun yang sedang berjalan di thread skrip ini
+_lock = threading.Lock()
+_rerun_ids = itertools.count(1)
+_page_stats = {}  # halaman -> agregat waktu rerun
+_call_stats = {}  # (jenis, label) -> agregat panggilan yang di-sampling
+_startup = {}  # Rerun pertama proses ini: {"page", "ms", "phases"}
+_cold_start = True  # Rerun berikutnya adalah rerun pertama proses ini
+
+def configure(config=None):
+    """Menerapkan konfigurasi (dict dengan kunci DEFAULT_CONFIG) dan menyiapkan handler log."""
+    _config.update({key: value for key, value in dict(config or {}).items() if key in DEFAULT_CONFIG})
+    if _config["log"] and not LOGGER.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        LOGGER.addHandler(handler)
+        LOGGER.setLevel(logging.INFO)
+        LOGGER.propagate = False
+
+def path_label(path):
+    """Label agregasi untuk path database: 'siaran/Jawa Timur/x' -> 'siaran/*/*'."""
+    parts = [part for part in (path or "").strip("/").split("/") if part]
+    if not parts:
+        return "/"
+    return "/".join(parts[:1] + ["*"] * (len(parts) - 1))
+
+def payload_size(value):
+    """Perkiraan ukuran payload (byte JSON). Hanya dihitung untuk panggilan yang di-sampling."""
+    if value is None:
+        return 0
+    return len(json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8"))
+
+def _log(event):
+    if _config["log"]:
+        LOGGER.info(json.dumps(event, ensure_ascii=False, default=str))
+
+# --- PER RERUN ---
+
+def start_rerun(page, force_sample=False, started=None):
+    """
+    Memulai pencatatan satu rerun untuk thread saat ini dan mengembalikan catatannya.
+    `force_sample` membuat rerun selalu dicatat lengkap (misalnya untuk admin).
+    `started` (time.perf_counter) dipakai jika rerun sebenarnya sudah dimulai lebih awal.
+    """
+    global _cold_start
+    now = time.perf_counter()
+    started = now if started is None else started
+    with _lock:
+        cold, _cold_start = _cold_start, False
+    rerun = {
+        "id": next(_rerun_ids),
+        "page": page,
+        "cold": cold,
+        "sampled": cold or force_sample or random.random() < _config["sample_rate"],
+        "started": started,
+        "last_activity": now,
+        "phase_started": started,
+        "phases": {},
+        "kinds": {},  # jenis -> {"count", "ms"}
+        "calls": [],
+        "dropped_calls": 0,
+        "finished": False,
+    }
+    _local.rerun = rerun
+    return rerun
+
+def set_rerun_page(page):
+    """Mengganti halaman rerun yang sedang dicatat, jika halaman baru diketahui setelah rerun dimulai."""
+    rerun = current_rerun()
+    if rerun is not None:
+        rerun["page"] = page
+
+def current_rerun():
+    """Rerun yang sedang dicatat di thread ini, atau None."""
+    rerun = getattr(_local, "rerun", None)
+    return rerun if rerun and not rerun["finished"] else None
+
+def mark_phase(name):
+    """Menutup fase render `name` yang dimulai sejak akhir fase sebelumnya."""
+    rerun = current_rerun()
+    if rerun is None:
+        return
+    now = time.perf_counter()
+    rerun["phases"][name] = rerun["phases"].get(name, 0) + (now - rerun["phase_started"]) * 1000
+    rerun["phase_started"] = rerun["last_activity"] = now
+
+def finish_rerun(rerun, interrupted=False):
+    """
+    Menutup catatan rerun dan menambahkannya ke agregat halaman.
+    Rerun yang terputus (st.rerun/st.stop) dihitung sampai aktivitas terakhirnya.
+    """
+    if rerun is None or rerun["finished"]:
+        return rerun
+    end = rerun["last_activity"] if interrupted else time.perf_counter()
+    rerun["finished"] = True
+    rerun["interrupted"] = interrupted
+    rerun["total_ms"] = (end - rerun["started"]) * 1000
+    with _lock:
+        if rerun["cold"]:
+            _startup.update(page=rerun["page"], ms=rerun["total_ms"], phases=dict(rerun["phases"]))
+        stats = _page_stats.setdefault(rerun["page"], {"reruns": 0, "total_ms": 0.0, "max_ms": 0.0, "kinds": {}, "phases": {}})
+        stats["reruns"] += 1
+        stats["total_ms"] += rerun["total_ms"]
+        stats["max_ms"] = max(stats["max_ms"], rerun["total_ms"])
+        for name, ms in rerun["phases"].items():
+            stats["phases"][name] = stats["phases"].get(name, 0.0) + ms
+        for kind, kind_stats in rerun["kinds"].items():
+            page_kind = stats["kinds"].setdefault(kind, {"count": 0, "ms": 0.0})
+            page_kind["count"] += kind_stats["count"]
+            page_kind["ms"] += kind_stats["ms"]
+    if rerun["sampled"]:
+        _log({
+            "event": "rerun", "rerun": rerun["id"], "page": rerun["page"],
+            "ms": round(rerun["total_ms"], 1), "interrupted": interrupted, "cold": rerun["cold"],
+            "phases": {name: round(ms, 1) for name, ms in rerun["phases"].items()},
+            "kinds": {kind: {"count": s["count"], "ms": round(s["ms"], 1), "bytes": s.get("bytes", 0)}
+                      for kind, s in rerun["kinds"].items()},
+        })
+    return rerun
+
+# --- PER PANGGILAN ---
+
+@contextmanager
+def timed(kind, label, path=None):
+    """
+    Mengukur satu panggilan jenis `kind` ("db", "gemini", "smtp", ...).
+    Blok menerima dict `span`; jika `span["sampled"]` benar, isi `span["bytes"]`
+    dengan ukuran payload. Panggilan di luar rerun (thread latar belakang)
+    di-sampling sendiri dengan `sample_rate`.
+    """
+    rerun = current_rerun()
+    sampled = rerun["sampled"] if rerun else random.random() < _config["sample_rate"]
+    span = {"sampled": sampled, "bytes": 0, "error": None}
+    start = time.perf_counter()
+    try:
+        yield span
+    except Exception as e:
+        span["error"] = type(e).__name__
+        raise
+    finally:
+        end = time.perf_counter()
+        _record(rerun, kind, label, path, (end - start) * 1000, span, end)
+
+def _record(rerun, kind, label, path, ms, span, end):
+    if rerun is not None:
+        kind_stats = rerun["kinds"].setdefault(kind, {"count": 0, "ms": 0.0, "bytes": 0})
+        kind_stats["count"] += 1
+        kind_stats["ms"] += ms
+        kind_stats["bytes"] += span["bytes"]
+        rerun["last_activity"] = end
+
+    slow = ms >= _config["slow_ms"]
+    if not span["sampled"] and not slow:
+        return
+    call = {"kind": kind, "label": label, "path": path or label, "ms": round(ms, 2),
+            "bytes": span["bytes"], "error": span["error"]}
+    if span["sampled"]:
+        with _lock:
+            stats = _call_stats.setdefault((kind, label), {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "bytes": 0, "errors": 0})
+            stats["count"] += 1
+            stats["total_ms"] += ms
+            stats["max_ms"] = max(stats["max_ms"], ms)
+            stats["bytes"] += span["bytes"]
+            stats["errors"] += span["error"] is not None
+        if rerun is not None:
+            if len(rerun["calls"]) < MAX_CALLS_PER_RERUN:
+                rerun["calls"].append(call)
+            else:
+                rerun["dropped_calls"] += 1
+    _log(dict(call, event="slow_call" if slow else "call",
+              rerun=rerun["id"] if rerun else None, page=rerun["page"] if rerun else None))
+
+# --- RINGKASAN ---
+
+def page_stats():
+    """
+    Agregat per halaman: [{page, reruns, avg_ms, max_ms, <fase>_phase_ms, <jenis>_ms, <jenis>_calls}, ...].
+    Fase "imports" adalah overhead impor modul per rerun.
+    """
+    with _lock:
+        rows = []
+        for page, stats in sorted(_page_stats.items(), key=lambda item: str(item[0])):
+            row = {"page": page, "reruns": stats["reruns"],
+                   "avg_ms": stats["total_ms"] / stats["reruns"], "max_ms": stats["max_ms"]}
+            for name, ms in stats["phases"].items():
+                row[f"{name}_phase_ms"] = ms / stats["reruns"]
+            for kind, kind_stats in sorted(stats["kinds"].items()):
+                row[f"{kind}_ms"] = kind_stats["ms"] / stats["reruns"]
+                row[f"{kind}_calls"] = kind_stats["count"] / stats["reruns"]
+            rows.append(row)
+        return rows
+
+def startup_stats():
+    """Rerun pertama proses ini (cold start): {"page", "ms", "phases"}, atau dict kosong jika belum selesai."""
+    with _lock:
+        return dict(_startup)
+
+def call_stats():
+    """Agregat panggilan yang di-sampling per (jenis, label), paling lama total waktunya lebih dulu."""
+    with _lock:
+        rows = [
+            {"kind": kind, "label": label, "count": s["count"], "avg_ms": s["total_ms"] / s["count"],
+             "max_ms": s["max_ms"], "avg_bytes": s["bytes"] / s["count"], "errors": s["errors"]}
+            for (kind, label), s in _call_stats.items()
+        ]
+    return sorted(rows, key=lambda row: row["avg_ms"] * row["count"], reverse=True)
+
+# --- BACKEND TERINSTRUMENTASI ---
+
+class InstrumentedBackend:
+    """Membungkus backend (lihat backends.py) agar setiap operasi diukur dengan `timed`."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def read(self, path):
+        with timed("db", f"read {path_label(path)}", path) as span:
+            value = self.backend.read(path)
+            if span["sampled"]:
+                span["bytes"] = payload_size(value)
+            return value
+
+    def read_with_etag(self, path):
+        with timed("db", f"read {path_label(path)}", path) as span:
+            value, etag = self.backend.read_with_etag(path)
+            if span["sampled"]:
+                span["bytes"] = payload_size(value)
+            return value, etag
+
+    def read_if_changed(self, path, etag):
+        with timed("db", f"revalidate {path_label(path)}", path) as span:
+            changed, value, new_etag = self.backend.read_if_changed(path, etag)
+            if span["sampled"] and changed:
+                span["bytes"] = payload_size(value)
+            return changed, value, new_etag
+
+    def exists(self, path):
+        with timed("db", f"exists {path_label(path)}", path):
+            return self.backend.exists(path)
+
+    def query(self, path, order_by=None, start_at=None, end_at=None, limit_to_last=None, limit_to_first=None):
+        with timed("db", f"query {path_label(path)}", path) as span:
+            items = self.backend.query(path, order_by, start_at, end_at, limit_to_last, limit_to_first)
+            if span["sampled"]:
+                span["bytes"] = payload_size(dict(items))
+            return items
+
+    def update(self, updates):
+        labels = sorted({path_label(path) for path in updates})
+        with timed("db", f"update {','.join(labels)}", ",".join(sorted(updates))[:200]) as span:
+            if span["sampled"]:
+                span["bytes"] = payload_size(updates)
+            self.backend.update(updates)
+
+    def listen(self, path, callback):
+        # Event listener datang dari thread latar belakang dan tidak diukur per rerun
+        return self.backend.listen(path, callback)
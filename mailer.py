@@ -0,0 +1,192 @@
+"""
+Pengiriman email KTVDI di latar belakang.
+
+Email dimasukkan ke antrean terbatas dan dikirim oleh satu thread pekerja yang
+memakai ulang koneksi SMTP yang sudah login. Kegagalan dicoba ulang dengan
+jeda yang makin panjang, dan status setiap kiriman bisa dipantau lewat ID-nya.
+Alamat dengan huruf non-ASCII dikirim dengan SMTPUTF8 jika server mendukungnya.
+
+Untuk pengujian lokal, arahkan ke server SMTP tiruan, misalnya:
+
+    python -m aiosmtpd -n -l localhost:1025
+
+dengan `host = "localhost"`, `port = 1025`, `use_ssl = false` dan tanpa `app_password`.
+"""
+import itertools
+import queue
+import smtplib
+import threading
+import time
+from collections import OrderedDict
+from email.message import EmailMessage
+
+from instrumentation import timed
+
+# Nilai bawaan, dapat ditimpa lewat bagian [email] di Streamlit Secrets.
+DEFAULT_SMTP_CONFIG = {
+    "host": "smtp.gmail.com",
+    "port": 465,
+    "use_ssl": True,        # SMTP_SSL; jika False memakai SMTP biasa (+ STARTTLS bila `starttls`)
+    "starttls": False,
+    "timeout": 20,          # Detik untuk koneksi dan perintah SMTP
+    "queue_size": 100,      # Jumlah email maksimum yang menunggu dikirim
+    "max_attempts": 3,      # Jumlah percobaan per email
+    "retry_delay": 2.0,     # Jeda percobaan ulang pertama (detik), berlipat dua setiap percobaan
+    "idle_timeout": 60,     # Koneksi ditutup setelah sekian detik tanpa email
+}
+MAX_TRACKED_JOBS = 1000  # Jumlah status kiriman terakhir yang disimpan
+
+# Status kiriman email
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+def address_error(address):
+    """
+    Pesan kesalahan jika `address` bukan satu alamat email yang bisa dikirimi,
+    atau string kosong jika valid. Huruf non-ASCII diperbolehkan (lihat SMTPUTF8).
+    """
+    local, at, domain = address.rpartition("@")
+    if not at or not local or "." not in domain.strip("."):
+        return f"Alamat email tidak valid: {address!r}."
+    if any(char.isspace() or char in "<>,;\"" or ord(char) < 32 for char in address):
+        return f"Alamat email tidak boleh mengandung spasi atau karakter <>,;\": {address!r}."
+    return ""
+
+class Mailer:
+    """Antrean email dengan satu thread pekerja dan koneksi SMTP yang dipakai ulang."""
+
+    def __init__(self, sender, app_password="", **config):
+        self.sender = sender
+        self.app_password = app_password
+        self.config = dict(DEFAULT_SMTP_CONFIG)
+        self.config.update({key: value for key, value in config.items() if key in DEFAULT_SMTP_CONFIG})
+        self._queue = queue.Queue(maxsize=int(self.config["queue_size"]))
+        self._jobs = OrderedDict()
+        self._jobs_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._server = None
+        self._worker = threading.Thread(target=self._run, name="ktvdi-mailer", daemon=True)
+        self._worker.start()
+
+    @classmethod
+    def from_config(cls, email_config):
+        """Membuat Mailer dari bagian [email] Streamlit Secrets (sender, app_password, dan opsi SMTP)."""
+        email_config = dict(email_config)
+        return cls(email_config.pop("sender"), email_config.pop("app_password", ""), **email_config)
+
+    # --- Antarmuka untuk aplikasi ---
+
+    def submit(self, receiver, subject, body):
+        """
+        Memasukkan email ke antrean dan langsung kembali.
+        Mengembalikan ID kiriman, atau None jika antrean sedang penuh. Alamat yang
+        tidak valid tidak masuk antrean; kirimannya langsung berstatus FAILED.
+        """
+        job_id = next(self._ids)
+        receiver = str(receiver or "").strip()
+        job = {"id": job_id, "receiver": receiver, "subject": subject, "body": body,
+               "status": QUEUED, "attempts": 0, "error": ""}
+        with self._jobs_lock:
+            self._jobs[job_id] = job
+            while len(self._jobs) > MAX_TRACKED_JOBS:
+                self._jobs.popitem(last=False)
+        error = address_error(receiver)
+        if error:
+            self._set(job_id, status=FAILED, error=error)
+            return job_id
+        try:
+            self._queue.put_nowait(job_id)
+        except queue.Full:
+            self._set(job_id, status=FAILED, error="Antrean email penuh.")
+            return None
+        return job_id
+
+    def status(self, job_id):
+        """Mengembalikan salinan status kiriman (status, attempts, error), atau None jika tidak dikenal."""
+        with self._jobs_lock:
+            job = self._jobs.get(job_id)
+            return {key: job[key] for key in ("status", "attempts", "error")} if job else None
+
+    # --- Thread pekerja ---
+
+    def _set(self, job_id, **fields):
+        with self._jobs_lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def _run(self):
+        while True:
+            try:
+                job_id = self._queue.get(timeout=self.config["idle_timeout"])
+            except queue.Empty:
+                self._close()
+                continue
+            try:
+                self._deliver(job_id)
+            except Exception as e:
+                # Thread pekerja hanya satu: kiriman yang gagal tidak boleh menghentikan antrean
+                self._close()
+                self._set(job_id, status=FAILED, error=f"{type(e).__name__}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, job_id):
+        with self._jobs_lock:
+            job = dict(self._jobs.get(job_id) or {})
+        if not job:
+            return
+        message = EmailMessage()
+        message["Subject"] = job["subject"]
+        message["From"] = self.sender
+        message["To"] = job["receiver"]
+        message.set_content(job["body"])
+
+        for attempt in range(1, int(self.config["max_attempts"]) + 1):
+            self._set(job_id, status=SENDING, attempts=attempt)
+            try:
+                with timed("smtp", self.config["host"]) as span:
+                    span["bytes"] = len(message.as_bytes())
+                    # send_message memakai SMTPUTF8 untuk alamat non-ASCII, atau SMTPNotSupportedError
+                    # jika server tidak mendukungnya
+                    self._connection().send_message(message, self.sender, [job["receiver"]])
+                self._set(job_id, status=SENT, error="")
+                return
+            except (smtplib.SMTPException, OSError) as e:
+                # Koneksi mungkin sudah diputus server; buat baru pada percobaan berikutnya
+                self._close()
+                self._set(job_id, error=str(e))
+                if isinstance(e, (smtplib.SMTPRecipientsRefused, smtplib.SMTPNotSupportedError)):
+                    break
+                if attempt < self.config["max_attempts"]:
+                    time.sleep(self.config["retry_delay"] * 2 ** (attempt - 1))
+            except Exception as e:
+                # Kesalahan lain (misalnya alamat yang tidak bisa dikodekan) tidak akan
+                # berhasil jika dicoba ulang; koneksi ditutup karena transaksinya terpotong
+                self._close()
+                self._set(job_id, error=f"{type(e).__name__}: {e}")
+                break
+        self._set(job_id, status=FAILED)
+
+    def _connection(self):
+        if self._server is None:
+            host, port, timeout = self.config["host"], int(self.config["port"]), self.config["timeout"]
+            if self.config["use_ssl"]:
+                server = smtplib.SMTP_SSL(host, port, timeout=timeout)
+            else:
+                server = smtplib.SMTP(host, port, timeout=timeout)
+                if self.config["starttls"]:
+                    server.starttls()
+            if self.app_password:
+                server.login(self.sender, self.app_password)
+            self._server = server
+        return self._server
+
+    def _close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
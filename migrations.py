@@ -0,0 +1,167 @@
+"""
+Alat migrasi dan pemeliharaan data Firebase KTVDI.
+
+Dijalankan dari terminal dengan kredensial service account, contoh:
+
+    python migrations.py --credentials serviceAccount.json backfill-email-index
+"""
+import argparse
+
+import firebase_admin
+from firebase_admin import credentials, db
+
+from database import DATABASE_URL, email_key, name_key, directory_entry, comments_path, comment_counts_path
+from timestamps import LEGACY_MUX_FIELDS, is_epoch_ms, mux_updated_at, parse_legacy
+
+CHUNK_SIZE = 500  # Jumlah path maksimum per multi-path update
+
+def commit_in_chunks(updates, chunk_size=CHUNK_SIZE):
+    """Menulis `updates` (path -> nilai) ke root database dalam beberapa multi-path update."""
+    items = list(updates.items())
+    for start in range(0, len(items), chunk_size):
+        db.reference("/").update(dict(items[start:start + chunk_size]))
+        print(f"  {min(start + chunk_size, len(items))}/{len(items)} path ditulis")
+
+def backfill_email_index():
+    """Mengisi indeks `users_by_email` untuk semua pengguna yang sudah terdaftar."""
+    users = db.reference("users").get() or {}
+    updates = {}
+    for username, data in users.items():
+        email = (data or {}).get("email")
+        if not email:
+            continue
+        path = f"users_by_email/{email_key(email)}"
+        if path in updates:
+            print(f"Peringatan: email {email} dipakai oleh {updates[path]} dan {username}, dipakai yang pertama.")
+            continue
+        updates[path] = username
+    commit_in_chunks(updates)
+    print(f"Selesai: {len(updates)} entri indeks email.")
+
+def backfill_name_index():
+    """Mengisi direktori `users_by_name` untuk semua pengguna yang sudah terdaftar."""
+    users = db.reference("users").get() or {}
+    updates = {
+        f"users_by_name/{name_key((data or {}).get('nama', username), username)}": directory_entry(username, data or {})
+        for username, data in users.items()
+    }
+    commit_in_chunks(updates)
+    print(f"Selesai: {len(updates)} entri direktori pengguna.")
+
+def backfill_leaderboard():
+    """Membangun ulang node `leaderboard` dari poin semua pengguna."""
+    users = db.reference("users").get() or {}
+    updates = {
+        f"leaderboard/{username}": {"nama": data.get("nama", username), "points": data["points"]}
+        for username, data in users.items()
+        if (data or {}).get("points", 0) > 0
+    }
+    commit_in_chunks(updates)
+    print(f"Selesai: {len(updates)} entri leaderboard.")
+
+def move_comments():
+    """
+    Memindahkan komentar dari `siaran/.../{mux}/comments` ke pohon `comments`
+    dan mengisi `comment_counts`. Key komentar lama (push ID) dipertahankan
+    sehingga migrasi aman dijalankan ulang.
+    """
+    provinsi_list = (db.reference("siaran").get(shallow=True) or {}).keys()
+    total = 0
+    for provinsi in provinsi_list:
+        siaran_prov = db.reference(f"siaran/{provinsi}").get() or {}
+        updates = {}
+        for wilayah, mux_data in siaran_prov.items():
+            for mux, mux_details in (mux_data or {}).items():
+                old_comments = mux_details.get("comments") if isinstance(mux_details, dict) else None
+                if not old_comments:
+                    continue
+                new_path = comments_path(provinsi, wilayah, mux)
+                existing_keys = set((db.reference(new_path).get(shallow=True) or {}).keys())
+                for comment_id, comment in old_comments.items():
+                    updates[f"{new_path}/{comment_id}"] = comment
+                updates[comment_counts_path(provinsi, wilayah, mux)] = len(existing_keys | set(old_comments))
+                # Dihapus setelah salinannya, dalam urutan update yang sama
+                updates[f"siaran/{provinsi}/{wilayah}/{mux}/comments"] = None
+                total += len(old_comments)
+        if updates:
+            print(f"{provinsi}:")
+            commit_in_chunks(updates)
+    print(f"Selesai: {total} komentar dipindahkan.")
+
+def convert_timestamps():
+    """
+    Mengubah waktu berbentuk teks WIB menjadi epoch milidetik: field tanggal/jam
+    MUX menjadi `last_updated_at`, `timestamp` komentar, dan
+    `app_metadata/last_leaderboard_update_timestamp`. Nilai yang sudah berupa
+    angka dilewati, jadi migrasi aman dijalankan ulang atau dilanjutkan setelah
+    terputus. Teks yang formatnya tidak dikenal dibiarkan dan dilaporkan.
+    """
+    metadata_path = "app_metadata/last_leaderboard_update_timestamp"
+    metadata = db.reference(metadata_path).get()
+    if isinstance(metadata, str):
+        converted = parse_legacy(metadata)
+        if converted is None:
+            print(f"Peringatan: {metadata_path} tidak dikenal: {metadata!r}")
+        else:
+            db.reference(metadata_path).set(converted)
+
+    provinsi_list = sorted(
+        set((db.reference("siaran").get(shallow=True) or {}).keys())
+        | set((db.reference("comments").get(shallow=True) or {}).keys())
+    )
+    converted_mux = converted_comments = skipped = 0
+    for number, provinsi in enumerate(provinsi_list, 1):
+        updates = {}
+        for wilayah, mux_data in (db.reference(f"siaran/{provinsi}").get() or {}).items():
+            for mux, details in (mux_data or {}).items():
+                if not isinstance(details, dict) or not any(field in details for field in LEGACY_MUX_FIELDS):
+                    continue
+                updated_at = mux_updated_at(details)
+                if updated_at is None:
+                    print(f"Peringatan: waktu update {provinsi}/{wilayah}/{mux} tidak dikenal, dilewati.")
+                    skipped += 1
+                    continue
+                path = f"siaran/{provinsi}/{wilayah}/{mux}"
+                updates[f"{path}/last_updated_at"] = updated_at
+                updates.update({f"{path}/{field}": None for field in LEGACY_MUX_FIELDS})
+                converted_mux += 1
+
+        for wilayah, mux_comments in (db.reference(f"comments/{provinsi}").get() or {}).items():
+            for mux, comments in (mux_comments or {}).items():
+                for comment_id, comment in (comments or {}).items():
+                    timestamp = (comment or {}).get("timestamp")
+                    if timestamp is None or is_epoch_ms(timestamp):
+                        continue
+                    converted = parse_legacy(timestamp)
+                    if converted is None:
+                        print(f"Peringatan: timestamp komentar {comment_id} tidak dikenal: {timestamp!r}")
+                        skipped += 1
+                        continue
+                    updates[f"{comments_path(provinsi, wilayah, mux)}/{comment_id}/timestamp"] = converted
+                    converted_comments += 1
+
+        print(f"[{number}/{len(provinsi_list)}] {provinsi}: {len(updates)} path")
+        if updates:
+            commit_in_chunks(updates)
+    print(f"Selesai: {converted_mux} MUX dan {converted_comments} komentar dikonversi, {skipped} dilewati.")
+
+MIGRATIONS = {
+    "backfill-email-index": backfill_email_index,
+    "backfill-leaderboard": backfill_leaderboard,
+    "backfill-name-index": backfill_name_index,
+    "move-comments": move_comments,
+    "convert-timestamps": convert_timestamps,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Alat migrasi data Firebase KTVDI.")
+    parser.add_argument("--credentials", required=True, help="Path file JSON service account Firebase.")
+    parser.add_argument("--database-url", default=DATABASE_URL, help="URL Realtime Database.")
+    parser.add_argument("migration", choices=sorted(MIGRATIONS), help="Nama migrasi yang dijalankan.")
+    args = parser.parse_args()
+
+    firebase_admin.initialize_app(credentials.Certificate(args.credentials), {"databaseURL": args.database_url})
+    MIGRATIONS[args.migration]()
+
+if __name__ == "__main__":
+    main()
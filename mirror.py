@@ -0,0 +1,155 @@
+"""
+Salinan in-memory data referensi (`provinsi` dan `siaran`) per proses.
+
+Mirror mendengarkan perubahan lewat listener Realtime Database
+(`Reference.listen()`, atau padanannya di backend lokal) dan menerapkan
+event put/patch secara inkremental. Pembacaan path yang di-mirror lalu
+dilayani dari memori tanpa round-trip jaringan, sementara perubahan dari
+pengguna lain tetap masuk dalam hitungan detik.
+
+Pohon di mirror tidak pernah diubah di tempat: setiap event membuat salinan
+dangkal dari node-node di sepanjang path-nya (copy-on-write), sehingga sesi
+yang sedang membaca snapshot lama tidak terganggu. Setiap perubahan menaikkan
+nomor versi per provinsi, yang dipantau sesi untuk memuat ulang halaman.
+"""
+import logging
+import threading
+
+from backends import prune, resolve_server_values
+
+MIRRORED_PATHS = ("provinsi", "siaran")
+LOGGER = logging.getLogger("ktvdi")
+
+def _split(path):
+    return [part for part in (path or "").strip("/").split("/") if part]
+
+def _replace(tree, parts, value):
+    """Salinan `tree` dengan `value` di `parts` (None menghapus); node lain dipakai bersama."""
+    if not parts:
+        return value
+    node = dict(tree) if isinstance(tree, dict) else {}
+    child = _replace(node.get(parts[0]), parts[1:], value)
+    if child is None or child == {}:
+        node.pop(parts[0], None)
+    else:
+        node[parts[0]] = child
+    return node or None
+
+class Mirror:
+    """Mirror in-memory untuk path di `paths`, diisi dari `backend.listen()`."""
+
+    def __init__(self, backend, paths=MIRRORED_PATHS):
+        self._backend = backend
+        self._paths = tuple(paths)
+        self._trees = {}
+        self._synced = set()  # Path yang sudah menerima event awal
+        self._versions = {}  # "root" atau "root/anak" -> nomor perubahan terakhir
+        self._counter = 0
+        self._subscribers = []
+        self._registrations = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Memasang listener untuk setiap path. Event awal berisi seluruh isi path."""
+        for root in self._paths:
+            self._registrations.append(
+                self._backend.listen(root, lambda event_type, path, data, root=root: self._on_event(root, event_type, path, data))
+            )
+        return self
+
+    def close(self):
+        for registration in self._registrations:
+            registration.close()
+        self._registrations = []
+        with self._lock:
+            self._synced.clear()
+
+    def subscribe(self, callback):
+        """
+        `callback` dipanggil dengan dict path -> nilai (format yang sama dengan
+        multi-path update) untuk setiap perubahan, misalnya untuk indeks in-memory.
+        Callback yang gagal dicatat ke log dan tidak menghentikan mirror maupun
+        subscriber lain.
+        """
+        self._subscribers.append(callback)
+
+    def _on_event(self, root, event_type, path, data):
+        parts = _split(path)
+        if event_type == "put":
+            changes = {"/".join([root] + parts): data}
+        elif event_type == "patch":
+            changes = {"/".join([root] + parts + [key]): value for key, value in (data or {}).items()}
+        else:
+            return
+        with self._lock:
+            self._apply(root, changes)
+            self._synced.add(root)
+        for callback in self._subscribers:
+            # Event ini datang dari thread listener Firebase atau dari dalam `update`
+            # backend lokal; exception di sini akan mematikan listener atau membatalkan
+            # sisa commit penulis, jadi kegagalan subscriber cukup dicatat.
+            try:
+                callback(changes)
+            except Exception:
+                LOGGER.exception("Subscriber mirror gagal memproses perubahan %s", sorted(changes))
+
+    def apply_local(self, updates):
+        """
+        Menerapkan multi-path update yang baru saja ditulis proses ini (lihat
+        database.add_write_listener), agar penulisnya langsung melihat hasilnya
+        tanpa menunggu event listener. Nilai server diisi dengan waktu lokal
+        sampai event dari database menimpanya. Subscriber tidak dipanggil di sini;
+        mereka menerima perubahan yang sama lewat event listener.
+        """
+        changes = {}
+        with self._lock:
+            for path, value in updates.items():
+                parts = _split(path)
+                if not parts or parts[0] not in self._synced:
+                    continue
+                current = self._trees.get(parts[0])
+                for part in parts[1:]:
+                    current = current.get(part) if isinstance(current, dict) else None
+                changes["/".join(parts)] = prune(resolve_server_values(value, current))
+            for root in {_split(path)[0] for path in changes}:
+                self._apply(root, {path: value for path, value in changes.items() if _split(path)[0] == root})
+
+    def _apply(self, root, changes):
+        self._counter += 1
+        for change_path, value in changes.items():
+            change_parts = _split(change_path)[1:]
+            self._trees[root] = _replace(self._trees.get(root), change_parts, value)
+            # Perubahan di root (misalnya event awal) mengubah semua anak sekaligus
+            self._versions["/".join([root] + change_parts[:1])] = self._counter
+
+    def get(self, path):
+        """
+        Mengembalikan (True, nilai) jika `path` dilayani mirror yang sudah sinkron,
+        atau (False, None) jika harus dibaca dari database. Nilai dipakai bersama, jangan dimodifikasi.
+        """
+        parts = _split(path)
+        if not parts or parts[0] not in self._paths:
+            return False, None
+        with self._lock:
+            if parts[0] not in self._synced:
+                return False, None
+            node = self._trees.get(parts[0])
+        for part in parts[1:]:
+            if not isinstance(node, dict):
+                return True, None
+            node = node.get(part)
+        return True, node
+
+    def version(self, path):
+        """Nomor versi data di `path` (tingkat root atau anak pertama), naik setiap kali berubah."""
+        parts = _split(path)
+        if not parts:
+            return None
+        with self._lock:
+            root_version = self._versions.get(parts[0], 0)
+            child_version = self._versions.get("/".join(parts[:2]), 0) if len(parts) > 1 else 0
+            if len(parts) == 1:
+                # Versi root mencakup perubahan pada anak mana pun
+                prefix = parts[0] + "/"
+                child_version = max((v for key, v in self._versions.items() if key.startswith(prefix)), default=0)
+        return max(root_version, child_version)
@@ -0,0 +1,321 @@
+"""
+Indeks in-memory atas pohon `siaran` (provinsi -> wilayah -> MUX -> daftar siaran).
+
+Indeks dibangun sekali dari snapshot cache, lalu diperbarui secara inkremental
+setiap kali aplikasi menulis data siaran, sehingga pencarian "siaran X ada di
+MUX mana" tidak perlu membaca Firebase maupun memanggil LLM. Indeks terbalik
+token -> nama siaran melayani kotak pencarian (awalan dan toleran salah ketik).
+"""
+import bisect
+import re
+import threading
+import time
+from collections import defaultdict
+
+from database import get_cached, add_write_listener
+
+INDEX_TTL = 300  # Detik; indeks dibangun ulang agar ikut perubahan dari proses lain
+MAX_MENTION_WORDS = 6  # Panjang n-gram maksimum saat mencari nama di dalam kalimat
+MIN_NAME_LENGTH = 3  # Nama siaran yang lebih pendek tidak dicocokkan di dalam kalimat
+SEARCH_LIMIT = 10  # Jumlah nama siaran maksimum per hasil pencarian
+
+# Bobot kecocokan token kueri terhadap token nama siaran.
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.8
+FUZZY_SCORE = 0.6
+
+def normalize_name(text):
+    """Menyeragamkan nama: huruf kecil, hanya huruf/angka, dipisah satu spasi."""
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+def uhf_channel(mux):
+    """Mengambil nomor kanal UHF dari nama MUX ('UHF 27 - Metro TV' -> 27)."""
+    match = re.match(r"\s*UHF\s*(\d{1,3})", mux, re.IGNORECASE)
+    return int(match.group(1)) if match else None
+
+def max_typos(token):
+    """Jumlah salah ketik yang ditoleransi untuk satu token kueri."""
+    if len(token) < 4:
+        return 0
+    return 1 if len(token) < 8 else 2
+
+def within_distance(a, b, limit):
+    """True jika jarak edit `a` dan `b` (dengan pertukaran dua huruf bersebelahan) paling banyak `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    before, previous = None, list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if before and i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        before, previous = previous, current
+    return previous[-1] <= limit
+
+def _siaran_list(mux_details):
+    # Node MUX lama berupa daftar; node baru berupa dict dengan field `siaran`
+    if isinstance(mux_details, dict):
+        mux_details = mux_details.get("siaran")
+    if not isinstance(mux_details, list):
+        return []
+    return [name for name in mux_details if isinstance(name, str)]
+
+def _children(node):
+    return node.items() if isinstance(node, dict) else ()
+
+class SiaranIndex:
+    """Indeks siaran -> lokasi (provinsi, wilayah, MUX, UHF) beserta nama wilayah dan provinsi."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.built_at = None
+        self._clear()
+
+    def _clear(self):
+        self.entries = {}                          # (provinsi, wilayah, mux) -> daftar siaran
+        self.by_channel = defaultdict(set)         # nama siaran (normal) -> {(provinsi, wilayah, mux)}
+        self.channel_names = defaultdict(set)      # nama siaran (normal) -> nama asli
+        self.by_wilayah = defaultdict(set)         # (provinsi, wilayah) -> {mux}
+        self.by_token = defaultdict(set)           # token -> {nama siaran (normal)}
+        self._sorted_tokens = None                 # Daftar token terurut untuk pencarian awalan
+
+    # --- Pembaruan ---
+
+    def build(self, tree):
+        """Membangun ulang seluruh indeks dari snapshot pohon `siaran`."""
+        with self._lock:
+            self._clear()
+            for provinsi, wilayah_data in _children(tree):
+                self._add_provinsi(provinsi, wilayah_data)
+            self.built_at = time.monotonic()
+
+    def _add_provinsi(self, provinsi, wilayah_data):
+        for wilayah, mux_data in _children(wilayah_data):
+            for mux, mux_details in _children(mux_data):
+                self._add_mux(provinsi, wilayah, mux, _siaran_list(mux_details))
+
+    def _add_mux(self, provinsi, wilayah, mux, siaran_list):
+        key = (provinsi, wilayah, mux)
+        self.entries[key] = list(siaran_list)
+        self.by_wilayah[(provinsi, wilayah)].add(mux)
+        for name in siaran_list:
+            normalized = normalize_name(name)
+            if normalized not in self.by_channel:
+                self._index_tokens(normalized)
+            self.by_channel[normalized].add(key)
+            self.channel_names[normalized].add(name)
+
+    def _remove_mux(self, provinsi, wilayah, mux):
+        key = (provinsi, wilayah, mux)
+        for name in self.entries.pop(key, []):
+            normalized = normalize_name(name)
+            self.by_channel[normalized].discard(key)
+            if not self.by_channel[normalized]:
+                del self.by_channel[normalized]
+                self.channel_names.pop(normalized, None)
+                self._unindex_tokens(normalized)
+        muxes = self.by_wilayah.get((provinsi, wilayah))
+        if muxes is not None:
+            muxes.discard(mux)
+            if not muxes:
+                del self.by_wilayah[(provinsi, wilayah)]
+
+    def _index_tokens(self, normalized):
+        for token in normalized.split():
+            if token not in self.by_token:
+                self._sorted_tokens = None
+            self.by_token[token].add(normalized)
+
+    def _unindex_tokens(self, normalized):
+        for token in normalized.split():
+            names = self.by_token.get(token)
+            if names is None:
+                continue
+            names.discard(normalized)
+            if not names:
+                del self.by_token[token]
+                self._sorted_tokens = None
+
+    def _remove_prefix(self, parts):
+        for key in [key for key in self.entries if key[:len(parts)] == tuple(parts)]:
+            self._remove_mux(*key)
+
+    def update_mux(self, provinsi, wilayah, mux, siaran_list):
+        """Mengganti daftar siaran satu MUX di indeks."""
+        with self._lock:
+            self._remove_mux(provinsi, wilayah, mux)
+            self._add_mux(provinsi, wilayah, mux, siaran_list)
+
+    def remove_mux(self, provinsi, wilayah, mux):
+        """Menghapus satu MUX dari indeks."""
+        with self._lock:
+            self._remove_mux(provinsi, wilayah, mux)
+
+    def apply_updates(self, updates):
+        """
+        Menerapkan multi-path update (path -> nilai) yang menyentuh pohon `siaran`.
+
+        Path sampai tingkat MUX diterapkan langsung dari nilainya. Path field di
+        dalam MUX (misalnya `.../{mux}/siaran` atau `.../{mux}/last_updated_at`)
+        hanya berisi sebagian node, jadi MUX tersebut dibaca ulang setelah semua
+        path lain diterapkan.
+        """
+        stale_muxes = set()
+        with self._lock:
+            if self.built_at is None:
+                return
+            for path, value in updates.items():
+                parts = [part for part in path.strip("/").split("/") if part]
+                if not parts or parts[0] != "siaran":
+                    continue
+                parts = parts[1:]
+                if len(parts) > 3:
+                    stale_muxes.add(tuple(parts[:3]))
+                elif len(parts) == 3:
+                    self._remove_mux(*parts)
+                    if value is not None:
+                        self._add_mux(*parts, _siaran_list(value))
+                elif len(parts) == 2:
+                    self._remove_prefix(parts)
+                    for mux, mux_details in _children(value):
+                        self._add_mux(*parts, mux, _siaran_list(mux_details))
+                elif len(parts) == 1:
+                    self._remove_prefix(parts)
+                    self._add_provinsi(parts[0], value)
+                else:
+                    self.build(value)
+
+        # Dibaca di luar lock; cache sudah diinvalidasi (atau mirror sudah diperbarui) sebelum listener dipanggil
+        for provinsi, wilayah, mux in sorted(stale_muxes):
+            mux_details = get_cached(f"siaran/{provinsi}/{wilayah}/{mux}")
+            if mux_details is None:
+                self.remove_mux(provinsi, wilayah, mux)
+            else:
+                self.update_mux(provinsi, wilayah, mux, _siaran_list(mux_details))
+
+    # --- Pencarian ---
+
+    def _row(self, key):
+        provinsi, wilayah, mux = key
+        return {
+            "provinsi": provinsi,
+            "wilayah": wilayah,
+            "mux": mux,
+            "uhf": uhf_channel(mux),
+            "siaran": self.entries.get(key, []),
+        }
+
+    def rows_for_channel(self, name, provinsi=None):
+        """Semua MUX yang membawa siaran `name`, opsional dibatasi satu provinsi."""
+        with self._lock:
+            keys = self.by_channel.get(normalize_name(name), set())
+            return [self._row(key) for key in sorted(keys) if provinsi is None or key[0] == provinsi]
+
+    def rows_for_wilayah(self, provinsi, wilayah):
+        """Semua MUX di satu wilayah layanan."""
+        with self._lock:
+            muxes = self.by_wilayah.get((provinsi, wilayah), set())
+            return [self._row((provinsi, wilayah, mux)) for mux in sorted(muxes)]
+
+    def rows_for_provinsi(self, provinsi):
+        """Semua MUX di satu provinsi."""
+        with self._lock:
+            return [self._row(key) for key in sorted(self.entries) if key[0] == provinsi]
+
+    def find_mentions(self, text):
+        """
+        Mencari nama siaran, wilayah, dan provinsi yang disebut di `text`.
+
+        Dicocokkan lewat n-gram kata sehingga biayanya sebanding dengan panjang
+        teks, bukan jumlah data. Mengembalikan dict berisi daftar "channels"
+        (nama normal), "wilayah" dan "provinsi" ((provinsi, wilayah) / provinsi).
+        """
+        with self._lock:
+            wilayah_names = {normalize_name(wilayah): (provinsi, wilayah) for provinsi, wilayah in self.by_wilayah}
+            provinsi_names = {normalize_name(provinsi): provinsi for provinsi, _ in self.by_wilayah}
+            words = normalize_name(text).split()
+            mentions = {"channels": [], "wilayah": [], "provinsi": []}
+            for size in range(min(MAX_MENTION_WORDS, len(words)), 0, -1):
+                for start in range(len(words) - size + 1):
+                    gram = " ".join(words[start:start + size])
+                    if gram in wilayah_names and wilayah_names[gram] not in mentions["wilayah"]:
+                        mentions["wilayah"].append(wilayah_names[gram])
+                    elif gram in provinsi_names and provinsi_names[gram] not in mentions["provinsi"]:
+                        mentions["provinsi"].append(provinsi_names[gram])
+                    elif len(gram) >= MIN_NAME_LENGTH and gram in self.by_channel and gram not in mentions["channels"]:
+                        mentions["channels"].append(gram)
+            # Provinsi yang hanya muncul sebagai bagian dari nama wilayah tidak dihitung dua kali
+            mentioned_wilayah_provinsi = {provinsi for provinsi, _ in mentions["wilayah"]}
+            mentions["provinsi"] = [p for p in mentions["provinsi"] if p not in mentioned_wilayah_provinsi]
+            return mentions
+
+    def _token_matches(self, query_token):
+        """Skor terbaik per nama siaran untuk satu token kueri (tepat, awalan, atau mirip)."""
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self.by_token)
+        tokens = self._sorted_tokens
+        scores = {}
+
+        def add(token, score):
+            for name in self.by_token[token]:
+                if score > scores.get(name, 0.0):
+                    scores[name] = score
+
+        start = bisect.bisect_left(tokens, query_token)
+        for token in tokens[start:]:
+            if not token.startswith(query_token):
+                break
+            add(token, EXACT_SCORE if token == query_token else PREFIX_SCORE)
+
+        limit = max_typos(query_token)
+        if limit:
+            for token in tokens:
+                if token[0] == query_token[0] and within_distance(query_token, token[:len(query_token) + limit], limit):
+                    add(token, FUZZY_SCORE)
+        return scores
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """
+        Mencari nama siaran di seluruh provinsi. Semua token kueri harus cocok
+        (token terakhir boleh berupa awalan, token lain boleh salah ketik).
+        Mengembalikan daftar {"name", "score", "rows"} terurut dari skor tertinggi.
+        """
+        query_tokens = normalize_name(query).split()
+        if not query_tokens:
+            return []
+        with self._lock:
+            totals = None
+            for query_token in query_tokens:
+                scores = self._token_matches(query_token)
+                if totals is None:
+                    totals = scores
+                else:
+                    totals = {name: totals[name] + score for name, score in scores.items() if name in totals}
+                if not totals:
+                    return []
+            ranked = sorted(totals.items(), key=lambda item: (-item[1], len(item[0]), item[0]))[:limit]
+            return [
+                {
+                    "name": self.display_name(name),
+                    "score": score / len(query_tokens),
+                    "rows": self.rows_for_channel(name),
+                }
+                for name, score in ranked
+            ]
+
+    def display_name(self, normalized):
+        """Nama asli siaran dari bentuk normalnya (yang pertama secara alfabet)."""
+        with self._lock:
+            names = self.channel_names.get(normalized)
+            return sorted(names)[0] if names else normalized
+
+_index = SiaranIndex()
+add_write_listener(_index.apply_updates)
+
+def get_siaran_index():
+    """Mengembalikan indeks siaran tingkat proses, dibangun ulang jika sudah lebih tua dari TTL."""
+    if _index.built_at is None or time.monotonic() - _index.built_at > INDEX_TTL:
+        _index.build(get_cached("siaran"))
+    return _index
@@ -0,0 +1,150 @@
+"""
+Pembuat data sintetis KTVDI dengan skema yang sama seperti Realtime Database.
+
+Data dibuat deterministik dari `seed`, sehingga benchmark (bench.py) dan uji
+lokal selalu memakai isi yang sama. Hasilnya bisa disimpan sebagai JSON dan
+dipakai sebagai `seed` backend lokal (lihat bagian [DATABASE] di README):
+
+    python synthetic.py --scale medium --out seed.json
+"""
+import argparse
+import hashlib
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+from database import email_key, name_key, directory_entry, generate_push_id
+
+PROVINSI_NAMES = [
+    "Aceh", "Sumatera Utara", "Sumatera Barat", "Riau", "Kepulauan Riau", "Jambi",
+    "Sumatera Selatan", "Kepulauan Bangka Belitung", "Bengkulu", "Lampung",
+    "DKI Jakarta", "Jawa Barat", "Banten", "Jawa Tengah", "DI Yogyakarta", "Jawa Timur",
+    "Bali", "Nusa Tenggara Barat", "Nusa Tenggara Timur", "Kalimantan Barat",
+    "Kalimantan Tengah", "Kalimantan Selatan", "Kalimantan Timur", "Kalimantan Utara",
+    "Sulawesi Utara", "Gorontalo", "Sulawesi Tengah", "Sulawesi Barat", "Sulawesi Selatan",
+    "Sulawesi Tenggara", "Maluku", "Maluku Utara", "Papua", "Papua Barat", "Papua Selatan",
+    "Papua Tengah", "Papua Pegunungan", "Papua Barat Daya",
+]
+MUX_OPERATORS = [
+    "TVRI", "Metro TV", "Trans TV", "SCTV", "RCTI", "Indosiar", "ANTV", "Tvone",
+    "Kompas TV", "NET", "Rajawali TV", "iNews", "MNCTV", "GTV", "BTV", "RTV",
+]
+CHANNEL_NAMES = [
+    "TVRI Nasional", "TVRI Daerah", "TVRI World", "TVRI Sport", "Metro TV", "Magna Channel",
+    "BN Channel", "Trans TV", "Trans7", "CNN Indonesia", "CNBC Indonesia", "SCTV", "Indosiar",
+    "Mentari TV", "Moji", "RCTI", "MNCTV", "GTV", "iNews", "ANTV", "Tvone", "Kompas TV",
+    "NET", "RTV", "Rajawali TV", "BTV", "Jak TV", "Nusantara TV", "Garuda TV", "Daai TV",
+]
+FIRST_NAMES = ["Budi", "Ani", "Siti", "Agus", "Dewi", "Rudi", "Sri", "Eko", "Wahyu", "Rina",
+               "Andi", "Putri", "Joko", "Nur", "Hadi", "Lestari", "Bayu", "Intan", "Fajar", "Yuni"]
+LAST_NAMES = ["Santoso", "Wijaya", "Saputra", "Hidayat", "Kusuma", "Pratama", "Lubis",
+              "Siregar", "Nasution", "Gunawan", "Halim", "Setiawan", "Rahman", "Utami"]
+COMMENT_TEXTS = ["Sinyal bagus", "Mantap, sudah bisa ditangkap", "Kadang putus saat hujan",
+                 "Di tempat saya belum ada", "Gambar jernih", "Perlu antena luar", "Terima kasih infonya"]
+
+# Ukuran data per skala
+SCALES = {
+    "small": {"users": 200, "provinsi": 10, "wilayah": 3, "mux": 4, "comments": 3, "hot_comments": 200},
+    "medium": {"users": 2000, "provinsi": 38, "wilayah": 6, "mux": 6, "comments": 5, "hot_comments": 1000},
+    "large": {"users": 10000, "provinsi": 38, "wilayah": 15, "mux": 8, "comments": 8, "hot_comments": 5000},
+}
+PASSWORD = "password"  # Password semua pengguna sintetis
+START_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+HOT_MUX = ("DKI Jakarta", "DKI Jakarta-1")  # Wilayah yang salah satu MUX-nya berisi sangat banyak komentar
+
+def generate_dataset(scale="small", seed=0):
+    """
+    Membuat pohon data lengkap (users, users_by_email, users_by_name, leaderboard, provinsi,
+    siaran, comments, comment_counts, app_metadata) untuk skala di SCALES.
+    MUX pertama di HOT_MUX (jika provinsinya ikut dibuat) mendapat `hot_comments` komentar.
+    """
+    size = SCALES[scale]
+    rng = random.Random(seed)
+    password_hash = hashlib.sha256(PASSWORD.encode()).hexdigest()
+
+    users, users_by_email, users_by_name, leaderboard = {}, {}, {}, {}
+    for i in range(size["users"]):
+        username = f"user{i:05d}"
+        nama = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        email = f"{username}@contoh.id"
+        # Sebagian besar pengguna berpoin kecil, banyak yang sama (seperti data asli)
+        points = min(int(rng.paretovariate(1.2)) - 1, 5000) if rng.random() < 0.7 else 0
+        users[username] = {"nama": nama, "email": email, "password": password_hash, "points": points}
+        users_by_email[email_key(email)] = username
+        users_by_name[name_key(nama, username)] = directory_entry(username, users[username])
+        if points > 0:
+            leaderboard[username] = {"nama": nama, "points": points}
+    usernames = sorted(users)
+
+    provinsi_names = PROVINSI_NAMES[:size["provinsi"]]
+    if HOT_MUX[0] not in provinsi_names:
+        provinsi_names[-1] = HOT_MUX[0]
+    provinsi = {f"p{i:02d}": name for i, name in enumerate(provinsi_names)}
+
+    siaran, comments, comment_counts = {}, {}, {}
+    for provinsi_name in provinsi_names:
+        for w in range(1, size["wilayah"] + 1):
+            wilayah = f"{provinsi_name}-{w}"
+            channels = rng.sample(range(22, 49), size["mux"])
+            for channel in channels:
+                mux = f"UHF {channel} - {rng.choice(MUX_OPERATORS)}"
+                updater = rng.choice(usernames)
+                updated_at = START_TIME + timedelta(minutes=rng.randrange(60 * 24 * 365))
+                siaran.setdefault(provinsi_name, {}).setdefault(wilayah, {})[mux] = {
+                    "siaran": sorted(rng.sample(CHANNEL_NAMES, rng.randint(3, 8))),
+                    "last_updated_by_username": updater,
+                    "last_updated_by_name": users[updater]["nama"],
+                    "last_updated_at": _epoch_ms(updated_at),
+                }
+                hot = (provinsi_name, wilayah) == HOT_MUX and channel == channels[0]
+                count = size["hot_comments"] if hot else rng.randint(0, size["comments"])
+                mux_comments = _generate_comments(rng, users, usernames, count)
+                if mux_comments:
+                    comments.setdefault(provinsi_name, {}).setdefault(wilayah, {})[mux] = mux_comments
+                    comment_counts.setdefault(provinsi_name, {}).setdefault(wilayah, {})[mux] = count
+
+    return {
+        "users": users,
+        "users_by_email": users_by_email,
+        "users_by_name": users_by_name,
+        "leaderboard": leaderboard,
+        "provinsi": provinsi,
+        "siaran": siaran,
+        "comments": comments,
+        "comment_counts": comment_counts,
+        "app_metadata": {"last_leaderboard_update_timestamp": _epoch_ms(START_TIME + timedelta(days=366))},
+    }
+
+def _epoch_ms(moment):
+    return int(moment.timestamp() * 1000)
+
+def _generate_comments(rng, users, usernames, count):
+    times = sorted(rng.randrange(60 * 60 * 24 * 365) for _ in range(count))
+    result = {}
+    for offset in times:
+        username = rng.choice(usernames)
+        created = START_TIME + timedelta(seconds=offset)
+        # Bagian acak push ID tidak deterministik; pakai urutan agar key tetap unik dan stabil
+        key = generate_push_id(_epoch_ms(created))[:8] + f"{len(result):012d}"
+        result[key] = {
+            "username": username,
+            "nama_pengguna": users[username]["nama"],
+            "timestamp": _epoch_ms(created),
+            "text": rng.choice(COMMENT_TEXTS),
+        }
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Membuat data sintetis KTVDI sebagai file JSON.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="seed.json", help="File JSON keluaran")
+    args = parser.parse_args()
+    data = generate_dataset(args.scale, args.seed)
+    with open(args.out, "w", encoding="utf-8") as out_file:
+        json.dump(data, out_file, ensure_ascii=False)
+    print(f"{args.out}: {len(data['users'])} pengguna, {len(data['provinsi'])} provinsi, "
+          f"{sum(len(w) for p in data['siaran'].values() for w in p.values())} MUX")
+
+if __name__ == "__main__":
+    main()
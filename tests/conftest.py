@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+# Modul aplikasi berada di root repositori (tanpa paket)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import MemoryBackend, SQLiteBackend  # noqa: E402
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_backend(request):
+    """Fungsi pembuat backend lokal berisi `seed`; setiap tes berjalan di MemoryBackend dan SQLiteBackend."""
+    def make(seed=None):
+        if request.param == "memory":
+            return MemoryBackend(seed)
+        return SQLiteBackend(":memory:", seed)
+    return make
@@ -0,0 +1,137 @@
+import random
+
+import pytest
+
+import database
+from backends import MemoryBackend
+
+@pytest.fixture
+def use_backend(make_backend):
+    """Mengembalikan fungsi yang memasang backend lokal berisi `seed` (cache ikut dikosongkan)."""
+    def configure(seed):
+        backend = make_backend(seed)
+        database.configure_backend(backend)
+        return backend
+    database.set_mirror(None)
+    yield configure
+    database.configure_backend(MemoryBackend())
+
+def all_leaderboard_pages(page_size):
+    rows, cursor = database.get_leaderboard_page(page_size=page_size)
+    pages = [rows]
+    while cursor:
+        rows, cursor = database.get_leaderboard_page(cursor, page_size=page_size)
+        pages.append(rows)
+    return pages
+
+def expected_order(leaderboard):
+    ranked = [(data["points"], username) for username, data in leaderboard.items() if data["points"] > 0]
+    return [username for _, username in sorted(ranked, reverse=True)]
+
+@pytest.mark.parametrize("page_size", [1, 2, 3, 5])
+def test_leaderboard_pages_split_ties_without_skipping_or_repeating(use_backend, page_size):
+    # Tujuh pengguna berpoin sama memastikan batas halaman jatuh di tengah poin kembar
+    leaderboard = {f"user{i}": {"nama": f"User {i}", "points": 50} for i in range(7)}
+    leaderboard.update({"atas": {"nama": "Atas", "points": 90}, "bawah": {"nama": "Bawah", "points": 10}, "nol": {"nama": "Nol", "points": 0}})
+    use_backend({"leaderboard": leaderboard})
+
+    pages = all_leaderboard_pages(page_size)
+    rows = [row for page in pages for row in page]
+
+    assert all(len(page) == page_size for page in pages[:-1])
+    assert [row["username"] for row in rows] == expected_order(leaderboard)
+    assert [row["rank"] for row in rows] == list(range(1, len(rows) + 1))
+
+def test_leaderboard_pages_match_sorted_order_with_random_ties(use_backend):
+    rng = random.Random(7)
+    leaderboard = {f"u{i:03d}": {"nama": f"U{i}", "points": rng.randint(0, 6)} for i in range(80)}
+    use_backend({"leaderboard": leaderboard})
+    rows = [row for page in all_leaderboard_pages(7) for row in page]
+    assert [row["username"] for row in rows] == expected_order(leaderboard)
+
+def test_leaderboard_cursor_survives_new_entries_above_it(use_backend):
+    leaderboard = {f"user{i}": {"nama": f"User {i}", "points": 50} for i in range(6)}
+    backend = use_backend({"leaderboard": leaderboard})
+    first, cursor = database.get_leaderboard_page(page_size=3)
+    assert [row["username"] for row in first] == ["user5", "user4", "user3"]
+
+    # Entri baru di atas cursor memperbesar hasil query; halaman berikutnya tetap benar
+    backend.update({f"leaderboard/zz{i}": {"nama": "Baru", "points": 50} for i in range(5)})
+    database.invalidate_cache("leaderboard")
+    second, cursor = database.get_leaderboard_page(cursor, page_size=3)
+    assert [row["username"] for row in second] == ["user2", "user1", "user0"]
+    assert [row["rank"] for row in second] == [4, 5, 6]
+    assert cursor is None
+
+def test_user_rank_matches_leaderboard_pages(use_backend):
+    rng = random.Random(11)
+    leaderboard = {f"u{i:03d}": {"nama": f"U{i}", "points": rng.randint(0, 5)} for i in range(40)}
+    use_backend({"leaderboard": leaderboard})
+    rows = [row for page in all_leaderboard_pages(6) for row in page]
+    # Peringkat yang sama dengan tabel, termasuk urutan poin kembar
+    assert [database.get_user_rank(row["username"]) for row in rows] == [(row["rank"], row["points"]) for row in rows]
+    zero = [username for username, data in leaderboard.items() if data["points"] == 0]
+    assert zero and all(database.get_user_rank(username) is None for username in zero)
+    assert database.get_user_rank("tidak_ada") is None
+
+def test_user_rank_reads_a_bounded_number_of_entries(use_backend, monkeypatch):
+    use_backend({"leaderboard": {f"u{i:02d}": {"nama": f"U{i}", "points": 10} for i in range(20)}})
+    monkeypatch.setattr(database, "RANK_SCAN_LIMIT", 5)
+    assert database.get_user_rank("u19") == (1, 10)
+    assert database.get_user_rank("u15") == (5, 10)
+    assert database.get_user_rank("u14") == (None, 10)
+
+def test_comment_pages_are_newest_first_across_identical_timestamps(use_backend):
+    # Push ID dengan waktu sama tetap terurut lewat bagian acaknya
+    keys = [database.generate_push_id(1_700_000_000_000) for _ in range(11)]
+    use_backend({"comments": {"Jawa Timur": {"Jawa Timur-1": {"UHF 27 - Metro TV": {
+        key: {"text": f"komentar {i}"} for i, key in enumerate(keys)
+    }}}}})
+    assert keys == sorted(keys)
+
+    seen, before_key = [], None
+    while True:
+        comments, before_key = database.get_comments_page("Jawa Timur", "Jawa Timur-1", "UHF 27 - Metro TV", before_key, page_size=4)
+        seen.append([comment["id"] for comment in comments])
+        if before_key is None:
+            break
+    assert [len(page) for page in seen] == [4, 4, 3]
+    assert [key for page in seen for key in page] == list(reversed(keys))
+    assert database.get_comments_page("Bali", "Bali-1", "UHF 30 - TVRI") == ([], None)
+
+def test_user_directory_pages_by_prefix(use_backend):
+    names = {"ani": "Ani", "anita": "Anita", "andi": "Andi Saputra", "andi2": "andi saputra", "budi": "Budi"}
+    use_backend({"users_by_name": {
+        database.name_key(nama, username): database.directory_entry(username, {"nama": nama})
+        for username, nama in names.items()
+    }})
+
+    seen, after_key = [], None
+    while True:
+        entries, after_key = database.search_user_directory("AN", after_key, page_size=2)
+        seen.extend(entry["username"] for entry in entries)
+        if after_key is None:
+            break
+    # Halaman mengikuti urutan key; nama kembar tetap unik dan berurutan menurut username
+    expected = sorted((database.name_key(names[u], u), u) for u in ["ani", "anita", "andi", "andi2"])
+    assert seen == [username for _, username in expected]
+    assert seen[:2] == ["andi", "andi2"]
+    assert database.search_user_directory("budi")[0] == [{"username": "budi", "nama": "Budi"}]
+    assert database.search_user_directory("c") == ([], None)
+
+def test_cache_is_bounded_and_evicts_least_recently_used(use_backend, monkeypatch):
+    use_backend({"users_by_name": {database.name_key("Budi", "budi"): {"username": "budi", "nama": "Budi"}}})
+    monkeypatch.setattr(database, "CACHE_MAX_ENTRIES", 50)
+    evicted = database.cache_stats()["evicted"]
+
+    database.search_user_directory("bu")
+    for i in range(200):
+        database.search_user_directory(f"awalan{i}")
+        database.search_user_directory("bu")  # Tetap dipakai, jadi tidak dibuang
+
+    stats = database.cache_stats()
+    assert stats["entries"] == 50
+    assert stats["evicted"] - evicted == 151
+    hits = stats["hit"]
+    database.search_user_directory("bu")
+    assert database.cache_stats()["hit"] == hits + 1
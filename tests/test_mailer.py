@@ -0,0 +1,193 @@
+"""Mailer diuji terhadap server SMTP tiruan yang berjalan di proses yang sama."""
+import socketserver
+import threading
+import time
+import types
+
+import pytest
+
+import mailer
+from mailer import Mailer, FAILED, SENT, address_error
+
+class SMTPStub(socketserver.ThreadingTCPServer):
+    """Server SMTP minimal: mencatat koneksi dan pesan, dan bisa menolak DATA beberapa kali."""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.connections = 0
+        self.messages = []
+        self.data_failures = 0  # Jumlah DATA berikutnya yang dijawab 451
+        self.reject_recipients = False
+        self.smtputf8 = False  # Mengiklankan ekstensi SMTPUTF8 di jawaban EHLO
+        self.lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 stub ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250-stub\r\n250 SMTPUTF8" if server.smtputf8 else "250 stub")
+            elif command.startswith("MAIL"):
+                self.reply("250 OK")
+            elif command.startswith("RCPT"):
+                self.reply("550 No such user" if server.reject_recipients else "250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while (data_line := self.rfile.readline()) not in (b".\r\n", b""):
+                    lines.append(data_line.decode())
+                with server.lock:
+                    failed = server.data_failures > 0
+                    if failed:
+                        server.data_failures -= 1
+                    else:
+                        server.messages.append("".join(lines))
+                self.reply("451 Try again later" if failed else "250 Queued")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+@pytest.fixture
+def smtp_stub():
+    server = SMTPStub()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Jeda percobaan ulang dicatat, bukan benar-benar ditunggu."""
+    recorded = []
+    monkeypatch.setattr(mailer, "time", types.SimpleNamespace(sleep=recorded.append))
+    return recorded
+
+def make_mailer(smtp_stub, **config):
+    return Mailer("ktvdi@example.com", host="127.0.0.1", port=smtp_stub.port, use_ssl=False, **config)
+
+def wait_for(mail, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = mail.status(job_id)
+        if job["status"] in (SENT, FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Kiriman {job_id} belum selesai: {mail.status(job_id)}")
+
+def test_sends_and_reuses_connection(smtp_stub, sleeps):
+    mail = make_mailer(smtp_stub)
+    first = mail.submit("a@example.com", "OTP", "Kode 123456")
+    second = mail.submit("b@example.com", "OTP", "Kode 654321")
+
+    assert wait_for(mail, first)["status"] == SENT
+    assert wait_for(mail, second)["status"] == SENT
+    assert len(smtp_stub.messages) == 2
+    assert "Kode 654321" in smtp_stub.messages[1]
+    assert smtp_stub.connections == 1
+    assert sleeps == []
+
+def test_retries_with_backoff_on_new_connection(smtp_stub, sleeps):
+    smtp_stub.data_failures = 2
+    mail = make_mailer(smtp_stub, max_attempts=3, retry_delay=0.5)
+    job_id = mail.submit("a@example.com", "OTP", "Kode 123456")
+
+    job = wait_for(mail, job_id)
+    assert job["status"] == SENT
+    assert job["attempts"] == 3
+    assert sleeps == [0.5, 1.0]
+    # Setiap kegagalan menutup koneksi; percobaan berikutnya membuka koneksi baru
+    assert smtp_stub.connections == 3
+    assert len(smtp_stub.messages) == 1
+
+def test_gives_up_after_max_attempts(smtp_stub, sleeps):
+    smtp_stub.data_failures = 5
+    mail = make_mailer(smtp_stub, max_attempts=2, retry_delay=1)
+    job = wait_for(mail, mail.submit("a@example.com", "OTP", "Kode"))
+
+    assert job["status"] == FAILED
+    assert job["attempts"] == 2
+    assert "Try again later" in job["error"]
+    assert sleeps == [1]
+
+def test_refused_recipient_is_not_retried(smtp_stub, sleeps):
+    smtp_stub.reject_recipients = True
+    mail = make_mailer(smtp_stub, max_attempts=3)
+    job = wait_for(mail, mail.submit("nobody@example.com", "OTP", "Kode"))
+
+    assert job["status"] == FAILED
+    assert job["attempts"] == 1
+    assert sleeps == []
+
+def test_idle_connection_is_closed(smtp_stub, sleeps):
+    mail = make_mailer(smtp_stub, idle_timeout=0.05)
+    assert wait_for(mail, mail.submit("a@example.com", "OTP", "Kode"))["status"] == SENT
+    time.sleep(0.2)
+    assert mail._server is None
+    assert wait_for(mail, mail.submit("b@example.com", "OTP", "Kode"))["status"] == SENT
+    assert smtp_stub.connections == 2
+
+def test_non_ascii_address_uses_smtputf8(smtp_stub, sleeps):
+    smtp_stub.smtputf8 = True
+    mail = make_mailer(smtp_stub)
+    assert wait_for(mail, mail.submit("müller@example.com", "OTP", "Kode 123456"))["status"] == SENT
+    assert "To: müller@example.com" in smtp_stub.messages[0]
+
+def test_unsupported_address_fails_without_stopping_the_worker(smtp_stub, sleeps):
+    mail = make_mailer(smtp_stub, max_attempts=3)
+    job = wait_for(mail, mail.submit("müller@example.com", "OTP", "Kode"))
+    assert job["status"] == FAILED
+    assert job["attempts"] == 1
+    assert "SMTPUTF8" in job["error"]
+
+    assert wait_for(mail, mail.submit("a@example.com", "OTP", "Kode"))["status"] == SENT
+    assert mail._worker.is_alive()
+    assert sleeps == []
+
+def test_unexpected_error_fails_only_that_job(smtp_stub, sleeps):
+    mail = make_mailer(smtp_stub)
+    broken = mail.submit("a@example.com", "OTP", None)  # Isi bukan teks: gagal sebelum SMTP
+    job = wait_for(mail, broken)
+    assert job["status"] == FAILED
+    assert job["error"]
+
+    assert wait_for(mail, mail.submit("b@example.com", "OTP", "Kode"))["status"] == SENT
+    assert mail._worker.is_alive()
+
+def test_invalid_address_is_rejected_before_queueing(smtp_stub, sleeps):
+    mail = make_mailer(smtp_stub)
+    job = mail.status(mail.submit("a@example.com\r\nBcc: x@example.com", "OTP", "Kode"))
+    assert job["status"] == FAILED
+    assert job["attempts"] == 0
+    assert smtp_stub.connections == 0
+
+@pytest.mark.parametrize("address, valid", [
+    ("budi@example.com", True),
+    ("müller@exämple.com", True),
+    ("budi", False),
+    ("@example.com", False),
+    ("budi@localhost", False),
+    ("budi @example.com", False),
+    ("a@example.com, b@example.com", False),
+])
+def test_address_error(address, valid):
+    assert (address_error(address) == "") == valid
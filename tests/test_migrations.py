@@ -0,0 +1,91 @@
+import pytest
+
+import migrations
+from timestamps import parse_legacy
+
+class LocalReference:
+    """Pengganti `db.reference(path)` firebase_admin di atas backend lokal."""
+
+    def __init__(self, backend, path, updates):
+        self._backend = backend
+        self._path = path.strip("/")
+        self._updates = updates  # Setiap multi-path update dicatat di sini
+
+    def get(self, shallow=False):
+        value = self._backend.read(self._path)
+        if shallow and isinstance(value, dict):
+            return {key: True for key in value}
+        return value
+
+    def set(self, value):
+        self._backend.update({self._path: value})
+
+    def update(self, updates):
+        self._updates.append(dict(updates))
+        prefix = f"{self._path}/" if self._path else ""
+        self._backend.update({prefix + path: value for path, value in updates.items()})
+
+class LocalDb:
+    def __init__(self, backend):
+        self.backend = backend
+        self.updates = []
+
+    def reference(self, path="/"):
+        return LocalReference(self.backend, path, self.updates)
+
+SEED = {
+    "app_metadata": {"last_leaderboard_update_timestamp": "2024-05-01 10:00:00"},
+    "siaran": {
+        "Jawa Timur": {"Jawa Timur-1": {
+            "UHF 27 - Metro TV": {"siaran": ["Metro TV"], "last_updated_date": "01-05-2024", "last_updated_time": "09:30:00 WIB"},
+            "UHF 30 - TVRI": {"siaran": ["TVRI Nasional"], "last_updated_at": 1714530600000},
+            "UHF 33 - SCTV": ["SCTV"],
+            "UHF 41 - Rusak": {"siaran": ["X"], "last_updated_date": "kemarin"},
+        }},
+    },
+    "comments": {
+        "Jawa Timur": {"Jawa Timur-1": {"UHF 27 - Metro TV": {
+            "-Nabc": {"text": "Sinyal bagus", "timestamp": "2024-05-01 11:00:00"},
+            "-Nabd": {"text": "Sudah dikonversi", "timestamp": 1714536000000},
+        }}},
+        # Provinsi yang hanya punya komentar tetap ikut diproses
+        "Bali": {"Bali-1": {"UHF 30 - TVRI": {"-Nxyz": {"text": "Halo", "timestamp": "2024-05-02 08:00:00 WIB"}}}},
+    },
+}
+
+@pytest.fixture
+def local_db(make_backend, monkeypatch):
+    fake = LocalDb(make_backend(SEED))
+    monkeypatch.setattr(migrations, "db", fake)
+    return fake
+
+def test_convert_timestamps_converts_legacy_text(local_db, capsys):
+    migrations.convert_timestamps()
+    backend = local_db.backend
+
+    assert backend.read("app_metadata/last_leaderboard_update_timestamp") == parse_legacy("2024-05-01 10:00:00")
+    metro = backend.read("siaran/Jawa Timur/Jawa Timur-1/UHF 27 - Metro TV")
+    assert metro == {"siaran": ["Metro TV"], "last_updated_at": parse_legacy("01-05-2024 09:30:00")}
+    assert backend.read("siaran/Jawa Timur/Jawa Timur-1/UHF 30 - TVRI/last_updated_at") == 1714530600000
+    assert backend.read("comments/Jawa Timur/Jawa Timur-1/UHF 27 - Metro TV/-Nabc/timestamp") == parse_legacy("2024-05-01 11:00:00")
+    assert backend.read("comments/Bali/Bali-1/UHF 30 - TVRI/-Nxyz/timestamp") == parse_legacy("2024-05-02 08:00:00")
+    # Format yang tidak dikenal dibiarkan apa adanya
+    assert backend.read("siaran/Jawa Timur/Jawa Timur-1/UHF 41 - Rusak/last_updated_date") == "kemarin"
+    assert "Selesai: 1 MUX dan 2 komentar dikonversi, 1 dilewati." in capsys.readouterr().out
+
+def test_convert_timestamps_twice_changes_nothing_the_second_time(local_db, capsys):
+    migrations.convert_timestamps()
+    after_first = {root: local_db.backend.read(root) for root in ("app_metadata", "siaran", "comments")}
+    local_db.updates.clear()
+    capsys.readouterr()
+
+    migrations.convert_timestamps()
+
+    assert local_db.updates == []
+    assert {root: local_db.backend.read(root) for root in ("app_metadata", "siaran", "comments")} == after_first
+    assert "Selesai: 0 MUX dan 0 komentar dikonversi, 1 dilewati." in capsys.readouterr().out
+
+def test_commit_in_chunks_splits_updates(local_db):
+    migrations.commit_in_chunks({f"users_by_email/e{i}": f"u{i}" for i in range(5)}, chunk_size=2)
+    assert [len(update) for update in local_db.updates] == [2, 2, 1]
+    assert len(local_db.backend.read("users_by_email")) == 5
@@ -0,0 +1,135 @@
+import pytest
+
+from mirror import Mirror
+
+SEED = {
+    "provinsi": {"p1": "Jawa Timur", "p2": "Bali"},
+    "siaran": {
+        "Jawa Timur": {"Jawa Timur-1": {"UHF 27 - Metro TV": {"siaran": ["Metro TV"]}}},
+        "Bali": {"Bali-1": {"UHF 30 - TVRI": ["TVRI Nasional"]}},
+    },
+    "users": {"budi": {"points": 10}},
+}
+
+class _Registration:
+    def close(self):
+        pass
+
+class ScriptedBackend:
+    """Backend yang menyimpan callback listener agar event put/patch bisa dikirim manual."""
+
+    def __init__(self, seed):
+        self.seed = seed
+        self.callbacks = {}
+
+    def listen(self, path, callback):
+        self.callbacks[path] = callback
+        callback("put", "/", self.seed.get(path))
+        return _Registration()
+
+    def emit(self, root, event_type, path, data):
+        self.callbacks[root](event_type, path, data)
+
+@pytest.fixture
+def backend(make_backend):
+    return make_backend(SEED)
+
+def test_initial_snapshot_is_served_for_mirrored_paths_only(backend):
+    mirror = Mirror(backend).start()
+    assert mirror.get("siaran/Jawa Timur/Jawa Timur-1/UHF 27 - Metro TV/siaran") == (True, ["Metro TV"])
+    assert mirror.get("siaran/Jawa Timur/Tidak Ada") == (True, None)
+    assert mirror.get("users/budi") == (False, None)
+    mirror.close()
+    assert mirror.get("provinsi") == (False, None)
+
+def test_backend_update_is_copy_on_write_and_bumps_only_touched_province(backend):
+    mirror = Mirror(backend).start()
+    received = []
+    mirror.subscribe(received.append)
+    snapshot = mirror.get("siaran")[1]
+    jatim, bali = mirror.version("siaran/Jawa Timur"), mirror.version("siaran/Bali")
+
+    backend.update({"siaran/Jawa Timur/Jawa Timur-1/UHF 41 - Baru/siaran": ["Baru TV"], "users/budi/points": 20})
+
+    assert mirror.get("siaran/Jawa Timur/Jawa Timur-1/UHF 41 - Baru/siaran") == (True, ["Baru TV"])
+    assert "UHF 41 - Baru" not in snapshot["Jawa Timur"]["Jawa Timur-1"]
+    assert snapshot["Bali"] is mirror.get("siaran/Bali")[1]
+    assert mirror.version("siaran/Jawa Timur") > jatim
+    assert mirror.version("siaran/Bali") == bali
+    assert mirror.version("siaran") == mirror.version("siaran/Jawa Timur")
+    assert received == [{"siaran/Jawa Timur/Jawa Timur-1/UHF 41 - Baru/siaran": ["Baru TV"]}]
+
+def test_deleting_last_child_removes_empty_ancestors(backend):
+    mirror = Mirror(backend).start()
+    bali = mirror.version("siaran/Bali")
+    backend.update({"siaran/Bali/Bali-1/UHF 30 - TVRI": None})
+    assert mirror.get("siaran/Bali") == (True, None)
+    assert "Bali" not in mirror.get("siaran")[1]
+    assert mirror.version("siaran/Bali") > bali
+
+def test_put_replaces_subtree_and_patch_merges_children():
+    backend = ScriptedBackend(SEED)
+    mirror = Mirror(backend).start()
+    received = []
+    mirror.subscribe(received.append)
+
+    backend.emit("siaran", "patch", "/Jawa Timur/Jawa Timur-1", {"UHF 41 - Baru": {"siaran": ["Baru TV"]}, "UHF 27 - Metro TV": None})
+    assert mirror.get("siaran/Jawa Timur/Jawa Timur-1") == (True, {"UHF 41 - Baru": {"siaran": ["Baru TV"]}})
+    assert received[-1] == {
+        "siaran/Jawa Timur/Jawa Timur-1/UHF 41 - Baru": {"siaran": ["Baru TV"]},
+        "siaran/Jawa Timur/Jawa Timur-1/UHF 27 - Metro TV": None,
+    }
+
+    backend.emit("siaran", "put", "/Jawa Timur", {"Jawa Timur-2": {"UHF 33 - SCTV": ["SCTV"]}})
+    assert mirror.get("siaran/Jawa Timur") == (True, {"Jawa Timur-2": {"UHF 33 - SCTV": ["SCTV"]}})
+    assert received[-1] == {"siaran/Jawa Timur": {"Jawa Timur-2": {"UHF 33 - SCTV": ["SCTV"]}}}
+
+    # Event root (misalnya setelah koneksi pulih) mengganti semua anak sekaligus
+    before = mirror.version("siaran/Bali")
+    backend.emit("siaran", "put", "/", {"Bali": {"Bali-2": {"UHF 35 - Kompas TV": ["Kompas TV"]}}})
+    assert mirror.get("siaran") == (True, {"Bali": {"Bali-2": {"UHF 35 - Kompas TV": ["Kompas TV"]}}})
+    assert mirror.version("siaran/Bali") > before
+
+def test_apply_local_resolves_server_values_without_notifying_subscribers():
+    backend = ScriptedBackend(SEED)
+    mirror = Mirror(backend).start()
+    received = []
+    mirror.subscribe(received.append)
+    jatim, bali = mirror.version("siaran/Jawa Timur"), mirror.version("siaran/Bali")
+
+    mirror.apply_local({
+        "siaran/Jawa Timur/Jawa Timur-1/UHF 27 - Metro TV": {"siaran": ["Metro TV", "Magna Channel"], "last_updated_at": {".sv": "timestamp"}},
+        "users/budi/points": {".sv": {"increment": 10}},
+    })
+
+    hit, value = mirror.get("siaran/Jawa Timur/Jawa Timur-1/UHF 27 - Metro TV")
+    assert hit and value["siaran"] == ["Metro TV", "Magna Channel"]
+    assert isinstance(value["last_updated_at"], int)
+    assert mirror.get("users/budi") == (False, None)
+    assert mirror.version("siaran/Jawa Timur") > jatim
+    assert mirror.version("siaran/Bali") == bali
+    assert received == []
+
+def test_apply_local_ignores_roots_that_are_not_synced_yet():
+    mirror = Mirror(ScriptedBackend(SEED), paths=("siaran",))
+    mirror.apply_local({"siaran/Bali/Bali-1/UHF 30 - TVRI": None})
+    mirror.start()
+    assert mirror.get("siaran/Bali/Bali-1/UHF 30 - TVRI") == (True, ["TVRI Nasional"])
+
+def test_failing_subscriber_is_logged_and_does_not_stop_the_mirror(backend, caplog):
+    mirror = Mirror(backend).start()
+    received = []
+    def broken(changes):
+        raise AttributeError("subscriber rusak")
+    mirror.subscribe(broken)
+    mirror.subscribe(received.append)
+
+    # Penulis tetap selesai walaupun subscriber pertama gagal di dalam `update`
+    backend.update({"siaran/Bali/Bali-1/UHF 30 - TVRI": ["TVRI Bali"], "users/budi/points": 20})
+    backend.update({"siaran/Bali/Bali-2/UHF 35 - Kompas TV": ["Kompas TV"]})
+
+    assert backend.read("users/budi/points") == 20
+    assert mirror.get("siaran/Bali/Bali-2/UHF 35 - Kompas TV") == (True, ["Kompas TV"])
+    assert len(received) == 2
+    assert [record.levelname for record in caplog.records] == ["ERROR", "ERROR"]
+    assert "subscriber rusak" in caplog.text
@@ -0,0 +1,158 @@
+import pytest
+
+import database
+from backends import MemoryBackend
+from mirror import Mirror
+from siaran_index import SiaranIndex, get_siaran_index, within_distance
+
+JATIM_1 = "siaran/Jawa Timur/Jawa Timur-1"
+
+SEED = {
+    "siaran": {
+        "Jawa Timur": {
+            "Jawa Timur-1": {
+                "UHF 27 - Metro TV": {"siaran": ["Metro TV", "Magna Channel"], "last_updated_date": "01-05-2024"},
+                "UHF 30 - TVRI": ["TVRI Nasional", "TVRI Jatim"],
+            },
+            "Jawa Timur-2": {"UHF 33 - SCTV": {"siaran": ["SCTV", "Indosiar"]}},
+        },
+        "Bali": {"Bali-1": {"UHF 35 - Kompas TV": {"siaran": ["Kompas TV"]}}},
+    },
+    "users": {"budi": {"nama": "Budi", "points": 0}},
+}
+
+@pytest.fixture
+def index(make_backend):
+    """Indeks tingkat proses yang dibangun dari backend lokal berisi SEED."""
+    database.set_mirror(None)
+    database.configure_backend(make_backend(SEED))
+    index = get_siaran_index()
+    index.build(database.get_cached("siaran"))
+    yield index
+    database.set_mirror(None)
+    database.configure_backend(MemoryBackend())
+    index.build(None)
+
+def locations(index, name):
+    return [(row["provinsi"], row["wilayah"], row["mux"]) for row in index.rows_for_channel(name)]
+
+def test_field_level_edit_reindexes_the_mux(index):
+    path = f"{JATIM_1}/UHF 27 - Metro TV"
+    database.commit_contribution("budi", "Budi", 5, {
+        f"{path}/siaran": ["Metro TV", "Metro Xinwen"],
+        f"{path}/last_updated_by_name": "Budi",
+        f"{path}/last_updated_at": database.server_timestamp(),
+        f"{path}/last_updated_date": None,
+    })
+
+    assert locations(index, "Metro Xinwen") == [("Jawa Timur", "Jawa Timur-1", "UHF 27 - Metro TV")]
+    assert locations(index, "Magna Channel") == []
+    assert database.get_cached("users/budi/points") == 5
+    # MUX lain tidak ikut terhapus
+    assert locations(index, "Kompas TV") == [("Bali", "Bali-1", "UHF 35 - Kompas TV")]
+    assert len(index.rows_for_provinsi("Jawa Timur")) == 3
+
+def test_metadata_only_edit_keeps_channels(index):
+    database.commit_updates({
+        f"{JATIM_1}/UHF 27 - Metro TV/last_updated_by_name": "Budi",
+        f"{JATIM_1}/UHF 27 - Metro TV/last_updated_date": None,
+    })
+    assert locations(index, "Magna Channel") == [("Jawa Timur", "Jawa Timur-1", "UHF 27 - Metro TV")]
+
+def test_rename_moves_the_mux(index):
+    database.commit_updates(database.move_mux_updates(
+        "Jawa Timur", "Jawa Timur-1", "UHF 30 - TVRI", "Jawa Timur-2", "UHF 31 - TVRI", {"siaran": ["TVRI Nasional"]},
+    ))
+    assert locations(index, "TVRI Nasional") == [("Jawa Timur", "Jawa Timur-2", "UHF 31 - TVRI")]
+    assert locations(index, "TVRI Jatim") == []
+    assert [row["mux"] for row in index.rows_for_wilayah("Jawa Timur", "Jawa Timur-1")] == ["UHF 27 - Metro TV"]
+
+def test_delete_removes_only_that_mux(index):
+    database.delete_mux("Jawa Timur", "Jawa Timur-2", "UHF 33 - SCTV")
+    assert locations(index, "SCTV") == []
+    assert index.rows_for_wilayah("Jawa Timur", "Jawa Timur-2") == []
+    assert len(index.rows_for_provinsi("Jawa Timur")) == 2
+
+def test_field_edit_with_mirror_commits_and_invalidates_cache(index):
+    backend = database.get_backend()
+    mirror = Mirror(backend).start()
+    mirror.subscribe(index.apply_updates)
+    database.set_mirror(mirror)
+    assert database.get_cached("users/budi/points") == 0
+
+    path = f"{JATIM_1}/UHF 27 - Metro TV"
+    database.commit_contribution("budi", "Budi", 5, {f"{path}/siaran": ["Metro TV"], f"{path}/last_updated_date": None})
+
+    assert database.get_cached("users/budi/points") == 5
+    assert locations(index, "Magna Channel") == []
+    assert locations(index, "Metro TV") == [("Jawa Timur", "Jawa Timur-1", "UHF 27 - Metro TV")]
+    mirror.close()
+
+def test_malformed_values_do_not_wipe_the_index(index):
+    index.apply_updates({
+        f"{JATIM_1}/UHF 30 - TVRI": {"siaran": "TVRI Nasional"},
+        "siaran/Jawa Timur/Jawa Timur-2": ["bukan", "dict"],
+    })
+    assert index.rows_for_wilayah("Jawa Timur", "Jawa Timur-1")[1]["siaran"] == []
+    assert index.rows_for_wilayah("Jawa Timur", "Jawa Timur-2") == []
+    assert locations(index, "Kompas TV") == [("Bali", "Bali-1", "UHF 35 - Kompas TV")]
+
+def names(results):
+    return [result["name"] for result in results]
+
+@pytest.fixture
+def built():
+    """Indeks lepas (tanpa database) yang dibangun dari pohon siaran SEED."""
+    index = SiaranIndex()
+    index.build(SEED["siaran"])
+    return index
+
+def test_search_exact_and_prefix(built):
+    assert names(built.search("tvri")) == ["TVRI Jatim", "TVRI Nasional"]
+    assert names(built.search("met")) == ["Metro TV"]
+    assert built.search("met")[0]["score"] < built.search("metro")[0]["score"]
+    # Token yang cocok tepat diurutkan sebelum token yang hanya cocok awalan
+    assert names(built.search("tv")) == ["Metro TV", "Kompas TV", "TVRI Jatim", "TVRI Nasional"]
+
+def test_search_tolerates_typos(built):
+    assert names(built.search("idosiar")) == ["Indosiar"]
+    assert names(built.search("kompsa")) == ["Kompas TV"]
+    assert names(built.search("sctb")) == ["SCTV"]
+    # Token di bawah empat huruf tidak diberi toleransi salah ketik
+    assert built.search("tvx") == []
+    assert built.search("xyz") == []
+
+def test_search_requires_every_token(built):
+    assert names(built.search("tvri jat")) == ["TVRI Jatim"]
+    assert names(built.search("ma ch")) == ["Magna Channel"]
+    assert built.search("metro indosiar") == []
+    assert built.search("  ") == []
+
+def test_search_rows_point_to_every_location(built):
+    (result,) = built.search("metro tv")
+    assert result["rows"] == [{
+        "provinsi": "Jawa Timur", "wilayah": "Jawa Timur-1", "mux": "UHF 27 - Metro TV", "uhf": 27,
+        "siaran": ["Metro TV", "Magna Channel"],
+    }]
+
+def test_within_distance_counts_edits_and_transpositions():
+    assert within_distance("kompsa", "kompas", 1)
+    assert within_distance("indosar", "indosiar", 1)
+    assert not within_distance("metro", "mnc", 1)
+
+def test_search_follows_add_edit_rename_and_delete(index):
+    database.commit_updates({f"{JATIM_1}/UHF 41 - RCTI": {"siaran": ["RCTI", "MNCTV"]}})
+    assert names(index.search("rcti")) == ["RCTI"]
+
+    database.commit_updates({f"{JATIM_1}/UHF 41 - RCTI/siaran": ["RCTI", "GTV"]})
+    assert names(index.search("gtv")) == ["GTV"]
+    assert index.search("mnctv") == []
+
+    database.commit_updates(database.move_mux_updates("Jawa Timur", "Jawa Timur-1", "UHF 41 - RCTI", "Jawa Timur-2", "UHF 42 - RCTI"))
+    assert [(row["wilayah"], row["uhf"]) for row in index.search("rcti")[0]["rows"]] == [("Jawa Timur-2", 42)]
+
+    database.delete_mux("Jawa Timur", "Jawa Timur-2", "UHF 42 - RCTI")
+    assert index.search("rcti") == []
+    assert index.search("gtv") == []
+    # Token yang tidak lagi dipakai ikut hilang dari indeks awalan
+    assert "rcti" not in index.by_token
@@ -0,0 +1,43 @@
+import pytest
+
+from validators import diff_import_rows, parse_siaran, validate_import_rows, validate_siaran_entry
+
+PROVINSI = ["Jawa Timur", "DKI Jakarta"]
+
+def row(mux="UHF 27 - Metro TV", siaran="Metro TV, Magna Channel", wilayah="Jawa Timur-1", provinsi="Jawa Timur"):
+    return {"provinsi": provinsi, "wilayah": wilayah, "mux": mux, "siaran": siaran}
+
+def test_parse_siaran_accepts_text_and_list():
+    assert parse_siaran(" Metro TV, ,Magna Channel ") == ["Metro TV", "Magna Channel"]
+    assert parse_siaran(["Metro TV", " "]) == ["Metro TV"]
+
+@pytest.mark.parametrize("value", [5, None, {"a": "b"}, ["Metro TV", None], ["Metro TV", 7]])
+def test_parse_siaran_rejects_other_types(value):
+    with pytest.raises(ValueError):
+        parse_siaran(value)
+
+@pytest.mark.parametrize("siaran", [5, None, ["Metro TV", None]])
+def test_bad_siaran_types_become_row_errors(siaran):
+    accepted, errors = validate_import_rows([row(siaran=siaran), row(mux="UHF 30 - TVRI")], PROVINSI)
+    assert [r["mux"] for r in accepted] == ["UHF 30 - TVRI"]
+    assert [number for number, _ in errors] == [1]
+
+@pytest.mark.parametrize("mux", ["UHF 27 - X/evil", "UHF 30 - Trans Media Corp.", "UHF 31 - A#B", "UHF 32 - $x", "UHF 33 - [a]"])
+def test_mux_with_forbidden_key_characters_is_rejected(mux):
+    _, errors = validate_siaran_entry("Jawa Timur", "Jawa Timur-1", mux, "Metro TV")
+    assert len(errors) == 1 and "tidak boleh mengandung" in errors[0]
+
+def test_diff_import_rows():
+    accepted, _ = validate_import_rows([
+        row(mux="UHF 27 - Metro TV", siaran="Magna Channel, Metro TV"),
+        row(mux="UHF 30 - TVRI", siaran="TVRI Nasional"),
+        row(mux="UHF 41 - Baru", siaran="Baru TV"),
+    ], PROVINSI)
+    current = {"Jawa Timur": {"Jawa Timur-1": {
+        "UHF 27 - Metro TV": {"siaran": ["Metro TV", "Magna Channel"], "last_updated_by_name": "Budi"},
+        "UHF 30 - TVRI": ["TVRI Nasional", "TVRI Jatim"],
+    }}}
+    new, changed, unchanged = diff_import_rows(accepted, current)
+    assert [r["mux"] for r in new] == ["UHF 41 - Baru"]
+    assert [r["mux"] for r in changed] == ["UHF 30 - TVRI"]
+    assert [r["mux"] for r in unchanged] == ["UHF 27 - Metro TV"]
@@ -0,0 +1,69 @@
+"""
+Waktu di database KTVDI.
+
+Semua waktu disimpan sebagai epoch milidetik (nilai server `{".sv": "timestamp"}`)
+sehingga bisa diurutkan dan di-query per rentang oleh database, lalu baru
+diformat ke WIB saat ditampilkan. Data lama masih berupa teks WIB sampai
+migrasi `convert-timestamps` dijalankan; fungsi di sini menerima keduanya.
+"""
+from datetime import datetime
+
+from pytz import timezone
+
+WIB = timezone("Asia/Jakarta")
+DATE_FORMAT = "%d-%m-%Y"
+TIME_FORMAT = "%H:%M:%S WIB"
+DATETIME_FORMAT = "%d-%m-%Y %H:%M:%S WIB"
+
+# Field tanggal/jam MUX lama yang digantikan `last_updated_at`
+LEGACY_MUX_FIELDS = ("last_updated_date", "last_updated_time")
+# Format teks lama (tanpa akhiran " WIB")
+LEGACY_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",  # timestamp komentar dan app_metadata
+    "%d-%m-%Y %H:%M:%S",  # last_updated_date + last_updated_time
+)
+
+def is_epoch_ms(value):
+    """Benar jika `value` adalah epoch milidetik (angka, bukan boolean)."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def to_wib(timestamp_ms):
+    """Epoch milidetik -> datetime WIB."""
+    return datetime.fromtimestamp(timestamp_ms / 1000, WIB)
+
+def parse_legacy(text):
+    """Teks waktu WIB lama -> epoch milidetik, atau None jika formatnya tidak dikenal."""
+    text = str(text or "").strip()
+    if text.endswith("WIB"):
+        text = text[:-3].strip()
+    for fmt in LEGACY_FORMATS:
+        try:
+            return int(WIB.localize(datetime.strptime(text, fmt)).timestamp() * 1000)
+        except ValueError:
+            continue
+    return None
+
+def format_wib(value, fmt=DATETIME_FORMAT, default="N/A"):
+    """
+    Memformat waktu untuk tampilan. Epoch milidetik diformat ke WIB dengan `fmt`;
+    teks lama yang belum dimigrasi ikut diformat ulang jika formatnya dikenal,
+    dan dikembalikan apa adanya jika tidak.
+    """
+    if isinstance(value, str) and value:
+        parsed = parse_legacy(value)
+        return value if parsed is None else to_wib(parsed).strftime(fmt)
+    if is_epoch_ms(value):
+        return to_wib(value).strftime(fmt)
+    return default
+
+def mux_updated_at(mux_details):
+    """Waktu update terakhir MUX (epoch milidetik), dari `last_updated_at` atau field tanggal/jam lama."""
+    if not isinstance(mux_details, dict):
+        return None
+    updated_at = mux_details.get("last_updated_at")
+    if is_epoch_ms(updated_at):
+        return updated_at
+    date, time_text = mux_details.get("last_updated_date"), mux_details.get("last_updated_time")
+    if date and time_text:
+        return parse_legacy(f"{date} {time_text}")
+    return None
@@ -0,0 +1,157 @@
+"""
+Validasi data siaran yang dipakai bersama oleh form tambah, form edit, dan impor massal.
+
+Semua pola dikompilasi sekali saat modul dimuat.
+"""
+import csv
+import io
+import json
+import re
+
+WILAYAH_PATTERN = re.compile(r"^[a-zA-Z\s]+-\d+$")
+MUX_PATTERN = re.compile(r"^UHF\s+\d{1,3}\s*-\s*.+$", re.IGNORECASE)
+SIARAN_PATTERN = re.compile(r"^[a-zA-Z0-9\s&()_.,'-]+$")
+DASH_PATTERN = re.compile(r"\s*-\s*")
+# Karakter yang tidak boleh ada di key Realtime Database (wilayah dan MUX dipakai sebagai key)
+FORBIDDEN_KEY_PATTERN = re.compile(r"[.$#\[\]/\x00-\x1f\x7f]")
+
+IMPORT_COLUMNS = ("provinsi", "wilayah", "mux", "siaran")
+MAX_IMPORT_ROWS = 5000  # Batas baris per file impor
+
+def normalize_wilayah(wilayah):
+    """'Jawa Timur - 1' -> 'Jawa Timur-1'."""
+    return DASH_PATTERN.sub("-", wilayah.strip())
+
+def parse_siaran(siaran):
+    """
+    Daftar siaran dari teks dipisah koma atau dari list teks, tanpa entri kosong.
+    Melempar ValueError untuk tipe lain atau list yang berisi selain teks.
+    """
+    if isinstance(siaran, str):
+        items = siaran.split(",")
+    elif isinstance(siaran, list):
+        if not all(isinstance(item, str) for item in siaran):
+            raise ValueError("Setiap nama di **Siaran** harus berupa teks.")
+        items = siaran
+    else:
+        raise ValueError("**Siaran** harus berupa teks dipisah koma atau daftar nama siaran.")
+    return [item.strip() for item in items if item.strip()]
+
+def validate_siaran_entry(provinsi, wilayah, mux, siaran):
+    """
+    Memvalidasi satu data MUX. `siaran` boleh berupa teks dipisah koma atau list.
+    Mengembalikan (data bersih, daftar pesan kesalahan); data bersih berisi
+    provinsi, wilayah, mux, dan siaran (terurut) dan hanya berarti jika tidak ada kesalahan.
+    """
+    wilayah_clean = normalize_wilayah(wilayah or "")
+    mux_clean = (mux or "").strip()
+    errors = []
+    try:
+        siaran_list, siaran_error = parse_siaran(siaran), None
+    except ValueError as e:
+        siaran_list, siaran_error = [], str(e)
+
+    if not WILAYAH_PATTERN.fullmatch(wilayah_clean):
+        errors.append("Format **Wilayah Layanan** tidak valid. Harap gunakan format 'Nama Provinsi-Angka'. Contoh: 'Jawa Timur-1', 'DKI Jakarta-2'.")
+    else:
+        provinsi_from_wilayah = wilayah_clean.rsplit("-", 1)[0].strip()
+        if provinsi_from_wilayah.lower() != provinsi.lower():
+            errors.append(f"Nama provinsi '{provinsi_from_wilayah}' dalam **Wilayah Layanan** tidak cocok dengan **Provinsi** yang dipilih ('{provinsi}').")
+
+    if not MUX_PATTERN.fullmatch(mux_clean):
+        errors.append("Format **Penyelenggara MUX** tidak valid. Harap gunakan format 'UHF XX - Nama MUX'. Contoh: 'UHF 27 - Metro TV'.")
+    elif FORBIDDEN_KEY_PATTERN.search(mux_clean):
+        errors.append("**Penyelenggara MUX** tidak boleh mengandung karakter . $ # [ ] / atau karakter kontrol.")
+
+    if siaran_error:
+        errors.append(siaran_error)
+    elif not siaran_list:
+        errors.append("Daftar **Siaran** tidak boleh kosong.")
+    else:
+        for name in siaran_list:
+            if not SIARAN_PATTERN.fullmatch(name):
+                errors.append(f"Nama siaran '{name}' tidak valid. Hanya boleh huruf, angka, spasi, dan karakter '&()_.,'-'.")
+                break
+
+    cleaned = {"provinsi": provinsi, "wilayah": wilayah_clean, "mux": mux_clean, "siaran": sorted(siaran_list)}
+    return cleaned, errors
+
+# --- IMPOR MASSAL ---
+
+def parse_import_file(filename, content):
+    """
+    Membaca file impor menjadi daftar baris (dict dengan kolom IMPORT_COLUMNS).
+
+    Format yang didukung:
+    - CSV dengan header provinsi,wilayah,mux,siaran (siaran dipisah koma di dalam satu sel),
+    - JSON berupa list objek, atau JSON Lines (satu objek per baris).
+    Melempar ValueError jika file tidak bisa dibaca.
+    """
+    text = content.decode("utf-8-sig") if isinstance(content, bytes) else content
+    name = filename.lower()
+    try:
+        if name.endswith(".csv"):
+            reader = csv.DictReader(io.StringIO(text))
+            missing = [column for column in IMPORT_COLUMNS if column not in (reader.fieldnames or [])]
+            if missing:
+                raise ValueError(f"Kolom CSV tidak lengkap, tidak ada: {', '.join(missing)}.")
+            rows = list(reader)
+        elif name.endswith(".jsonl"):
+            rows = [json.loads(line) for line in text.splitlines() if line.strip()]
+        elif name.endswith(".json"):
+            rows = json.loads(text)
+        else:
+            raise ValueError("Format file harus .csv, .json, atau .jsonl.")
+    except (json.JSONDecodeError, csv.Error, UnicodeDecodeError) as e:
+        raise ValueError(f"File tidak dapat dibaca: {e}") from e
+
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ValueError("Isi file harus berupa daftar objek dengan kolom provinsi, wilayah, mux, dan siaran.")
+    if len(rows) > MAX_IMPORT_ROWS:
+        raise ValueError(f"File berisi {len(rows)} baris, maksimum {MAX_IMPORT_ROWS} baris per impor.")
+    return rows
+
+def validate_import_rows(rows, provinsi_list):
+    """
+    Memvalidasi semua baris impor. Nama provinsi dicocokkan tanpa membedakan
+    huruf besar/kecil dengan `provinsi_list`, dan MUX yang sama tidak boleh muncul dua kali.
+    Mengembalikan (baris yang diterima, daftar (nomor baris, pesan kesalahan)).
+    Nomor baris dimulai dari 1 (untuk CSV, baris data pertama setelah header).
+    """
+    provinsi_by_name = {provinsi.lower(): provinsi for provinsi in provinsi_list}
+    accepted, errors, seen = [], [], {}
+    for number, row in enumerate(rows, 1):
+        provinsi = provinsi_by_name.get(str(row.get("provinsi") or "").strip().lower())
+        if provinsi is None:
+            errors.append((number, f"Provinsi '{row.get('provinsi', '')}' tidak dikenal."))
+            continue
+        cleaned, row_errors = validate_siaran_entry(
+            provinsi, str(row.get("wilayah") or ""), str(row.get("mux") or ""), row.get("siaran")
+        )
+        key = (cleaned["provinsi"], cleaned["wilayah"], cleaned["mux"].lower())
+        if not row_errors and key in seen:
+            row_errors = [f"MUX ini sudah ada di baris {seen[key]}."]
+        if row_errors:
+            errors.extend((number, message) for message in row_errors)
+            continue
+        seen[key] = number
+        accepted.append(cleaned)
+    return accepted, errors
+
+def diff_import_rows(rows, current_by_provinsi):
+    """
+    Membandingkan baris impor yang sudah divalidasi dengan data saat ini
+    (`current_by_provinsi`: provinsi -> pohon `siaran/{provinsi}`).
+    Mengembalikan (baru, berubah, sama): baris MUX yang belum ada, yang daftar
+    siarannya berbeda, dan yang daftar siarannya sudah sama.
+    """
+    new, changed, unchanged = [], [], []
+    for row in rows:
+        wilayah_data = (current_by_provinsi.get(row["provinsi"]) or {}).get(row["wilayah"]) or {}
+        current = wilayah_data.get(row["mux"])
+        if current is None:
+            new.append(row)
+            continue
+        current_siaran = current if isinstance(current, list) else current.get("siaran") or []
+        (unchanged if sorted(current_siaran) == row["siaran"] else changed).append(row)
+    return new, changed, unchanged